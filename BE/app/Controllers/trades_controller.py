@@ -1,10 +1,19 @@
 # app/Controllers/trades_controller.py
 # Controller per i TRADES:
-# - lista filtrata (richiede user_id in query)
+# - lista filtrata (richiede user_id in query), con metriche MAE/MFE/R per trade
 # - get singolo trade per id (pubblico, senza user_id in query)
 # - create/update/delete (richiedono user_id in query per scoping)
-# - calendar data (per user_id)
-# - vantage score (per user_id)
+# - calendar data (per user_id): intervallo di date o tile mensili con ETag
+# - riepilogo di un giorno / una settimana ISO (una query indicizzata con window function)
+# - vantage score (per user_id) + batch classificato su più utenti
+# - metriche complete della dashboard (per user_id, stessi filtri della lista + date)
+#   o solo le statistiche scelte (`stats`, calcolo del solo sottografo necessario)
+# - metriche su finestre mobili (rolling) come serie temporali
+# - simulazione Monte Carlo (bande di equity, drawdown, probabilità di rovina)
+# - breakdown per categoria (setup, simbolo, direzione, stato emotivo, tag, errori)
+# - distribuzioni (quantili, istogrammi, VaR) da sketch t-digest mantenuti in scrittura
+# - statistiche per periodo (settimana/mese/trimestre/anno) e confronto col periodo precedente
+# - profiling opzionale per fase (METRICS_PROFILING; header X-Metrics-Profile se consentito)
 #
 # NOTA IMPORTANTE:
 # Per evitare MissingGreenlet quando Pydantic legge campi lazy del modello ORM,
@@ -13,16 +22,42 @@
 
 from __future__ import annotations
 
-from typing import List, Optional
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Literal, Optional
 from uuid import UUID
 
-from fastapi import Depends, HTTPException, Query
+from fastapi import Depends, Header, HTTPException, Path, Query
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.Infrastructure.db import get_db
 from app.Repositories.trade_repository import TradeRepository
-from app.Schemas.trade import TradeCreate, TradeUpdate, TradeRead
+from app.Schemas.dashboard_filters import DashboardFilters
+from app.Schemas.trade import (
+    TradeCreate,
+    TradeUpdate,
+    TradeRead,
+    TradeReadEnriched,
+    VantageScoreBatchRequest,
+)
+from app.Services.metrics.breakdown import GROUP_FIELDS, GROUP_STATS
+from app.Services.metrics.compute_service import compute_service, pack_user_rows
+from app.Services.metrics.downsampling import downsample_charts
+from app.Services.metrics.metrics_accumulator import (
+    MetricsAccumulator,
+    get_accumulator,
+    store_accumulator,
+)
+from app.Services.metrics.metrics_cache import get_or_compute
 from app.Services.metrics.metrics_calculator import MetricsCalculator
+from app.Services.metrics.period_stats import PERIODS
+from app.Services.metrics.profiling import stage, start_profiler
+from app.Services.metrics.quantile_sketch import DEFAULT_QUANTILES, QuantileSketch, describe
+from app.Services.metrics.stat_graph import STAT_NAMES
+from app.Services.metrics.trade_enricher import ENRICHED_FIELDS, enrich_trade, enrich_trades_batch
+from app.Services.metrics.trade_frame import TradeFrame, from_fixed
+from app.Utils.serialization import etag_matches, json_etag, to_json_safe
 
 
 class TradesController:
@@ -65,6 +100,68 @@ class TradesController:
             "tags": tag_names or [],
         }
 
+    @classmethod
+    def _rows_to_frame(cls, rows, computed_filters: Optional[dict] = None) -> TradeFrame:
+        """Tuple (Trade, tag_names) già caricate -> TradeFrame, poi filtri calcolati (durata, R)."""
+        trades_as_dicts = [cls._to_trade_read_dict(trade, tag_names) for trade, tag_names in rows]
+        return MetricsCalculator.filter_trades(TradeFrame.from_records(trades_as_dicts), computed_filters)
+
+    async def _load_filtered_frame(self, db: AsyncSession, user_id: UUID, filters: DashboardFilters) -> TradeFrame:
+        """
+        Trade dell'utente (filtri SQL) -> TradeFrame filtrato. La conversione
+        delle righe (CPU, ~1 s a 200k trade) gira fuori dall'event loop.
+        """
+        rows = await TradeRepository(db).list_with_filters(user_id, **filters.db_filters())
+        return await compute_service.run_blocking(
+            len(rows), self._rows_to_frame, rows, filters.computed_filters()
+        )
+
+    @staticmethod
+    def _start_profiler(pipeline: str, x_metrics_profile: Optional[str]):
+        """Profiler della richiesta secondo i setting (l'header vale solo se consentito)."""
+        return start_profiler(
+            pipeline,
+            x_metrics_profile,
+            enabled=settings.METRICS_PROFILING,
+            allow_header=settings.METRICS_PROFILING_ALLOW_HEADER,
+        )
+
+    @staticmethod
+    async def _cached(db: AsyncSession, kind: str, user_id: UUID, params: Optional[dict], compute):
+        """
+        get_or_compute con la versione persistita dei trade dell'utente, letta
+        prima della ricerca: le scritture servite da altri worker invalidano la cache.
+        """
+        version = await TradeRepository(db).versions.get(user_id)
+        return await get_or_compute(kind, user_id, params, compute, version)
+
+    @staticmethod
+    def _profiled_metrics(frame: TradeFrame, profiler, stat_names: Optional[List[str]]) -> dict:
+        """Calcolo nel processo corrente, con le fasi interne del MetricsCalculator misurate."""
+        calculator = MetricsCalculator(frame, profiler)
+        if stat_names is None:
+            metrics = calculator.calculate_all_metrics(include_trades=False)
+        else:
+            metrics = {"stats": calculator.calculate_stats(stat_names)}
+        with profiler.stage("json_safe"):
+            return to_json_safe(metrics)
+
+    @staticmethod
+    def _to_enriched_reads(payloads: List[dict]) -> List[TradeReadEnriched]:
+        """
+        Arricchisce in blocco (vettoriale) i DTO e li valida con TradeReadEnriched.
+        Le colonne calcolate vengono agganciate ai dict senza ricalcoli per-trade.
+        """
+        if not payloads:
+            return []
+        columns = enrich_trades_batch(payloads)
+        values = [columns[field].tolist() for field in ENRICHED_FIELDS]
+        out: List[TradeReadEnriched] = []
+        for payload, enriched in zip(payloads, zip(*values)):
+            payload.update(zip(ENRICHED_FIELDS, enriched))
+            out.append(TradeReadEnriched.model_validate(payload))
+        return out
+
     # --------------------------
     # LIST
     # --------------------------
@@ -82,7 +179,7 @@ class TradesController:
         max_size: Optional[float] = Query(None),
         tags: Optional[List[str]] = Query(None),
         db: AsyncSession = Depends(get_db),
-    ) -> List[TradeRead]:
+    ) -> List[TradeReadEnriched]:
         repo = TradeRepository(db)
         rows = await repo.list_with_filters(
             user_id=user_id,
@@ -95,11 +192,8 @@ class TradesController:
             max_size=max_size,
             tags=tags,
         )
-        out: List[TradeRead] = []
-        for trade, tag_names in rows:
-            payload = self._to_trade_read_dict(trade, tag_names)
-            out.append(TradeRead.model_validate(payload))
-        return out
+        payloads = [self._to_trade_read_dict(trade, tag_names) for trade, tag_names in rows]
+        return self._to_enriched_reads(payloads)
 
     # --------------------------
     # GET by ID (senza user_id)
@@ -108,14 +202,16 @@ class TradesController:
         self,
         trade_id: UUID,
         db: AsyncSession = Depends(get_db),
-    ) -> TradeRead:
+    ) -> TradeReadEnriched:
         repo = TradeRepository(db)
         row = await repo.get_by_trade_id_with_tags(trade_id)
         if not row:
             raise HTTPException(status_code=404, detail="Trade non trovato")
         trade, tag_names = row
         payload = self._to_trade_read_dict(trade, tag_names)
-        return TradeRead.model_validate(payload)
+        # un solo trade: percorso scalare, senza costruire un TradeFrame
+        payload.update(enrich_trade(payload))
+        return TradeReadEnriched.model_validate(payload)
 
     # --------------------------
     # CREATE
@@ -177,10 +273,103 @@ class TradesController:
     async def calendar_data(
         self,
         user_id: UUID = Query(..., description="ID utente"),
+        start_date: Optional[date] = Query(None, description="Dal giorno (incluso)"),
+        end_date: Optional[date] = Query(None, description="Al giorno (incluso)"),
         db: AsyncSession = Depends(get_db),
     ) -> list[dict]:
+        """
+        P&L, numero di trade, vincenti, perdenti e volume per giorno (UTC),
+        solo per i giorni con trade nell'intervallo richiesto.
+        """
+        if start_date is not None and end_date is not None and start_date > end_date:
+            raise HTTPException(status_code=422, detail="start_date deve precedere end_date")
         repo = TradeRepository(db)
-        return await repo.get_calendar_data(user_id)
+        return await repo.get_calendar_data(user_id, start_date=start_date, end_date=end_date)
+
+    @staticmethod
+    def _calendar_tile(month_start: date, month_end: date, days: List[dict]) -> dict:
+        """Tile mensile: giorni con trade + totali del mese."""
+        return {
+            "month": month_start.strftime("%Y-%m"),
+            "start": month_start.isoformat(),
+            "end": month_end.isoformat(),
+            "days": days,
+            "totals": {
+                "pnl": sum(d["pnl"] for d in days),
+                "trade_count": sum(d["trade_count"] for d in days),
+                "wins": sum(d["wins"] for d in days),
+                "losses": sum(d["losses"] for d in days),
+                "volume": sum(d["volume"] for d in days),
+                "trading_days": len(days),
+                "winning_days": sum(1 for d in days if d["pnl"] > 0),
+                "losing_days": sum(1 for d in days if d["pnl"] < 0),
+            },
+        }
+
+    async def calendar_month(
+        self,
+        month: str = Path(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Mese (YYYY-MM)"),
+        user_id: UUID = Query(..., description="ID utente"),
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_db),
+    ) -> Response:
+        """
+        Tile di un mese del calendario, con ETag sul contenuto: cambiando mese
+        il client scarica solo il nuovo tile, e rivalidando un mese non
+        modificato (If-None-Match) riceve 304 senza corpo.
+        """
+        month_start = date(int(month[:4]), int(month[5:7]), 1)
+        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+        async def compute() -> dict:
+            repo = TradeRepository(db)
+            days = await repo.get_calendar_data(user_id, start_date=month_start, end_date=month_end)
+            tile = self._calendar_tile(month_start, month_end, days)
+            return {"tile": tile, "etag": json_etag(tile)}
+
+        cached = await self._cached(db, "calendar_month", user_id, {"month": month}, compute)
+        headers = {"ETag": cached["etag"], "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, cached["etag"]):
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(cached["tile"], headers=headers)
+
+    # --------------------------
+    # RIEPILOGHI (giorno / settimana ISO)
+    # --------------------------
+    async def day_summary(
+        self,
+        day: date = Path(..., description="Giorno (UTC di created_at)"),
+        user_id: UUID = Query(..., description="ID utente"),
+        db: AsyncSession = Depends(get_db),
+    ) -> dict:
+        """
+        Trade del giorno (solo le colonne mostrate), P&L cumulato intraday,
+        miglior/peggior trade, win rate e totali, da una sola query.
+        """
+        async def compute() -> dict:
+            repo = TradeRepository(db)
+            return to_json_safe(await repo.get_day_summary(user_id, day))
+
+        return await self._cached(db, "day_summary", user_id, {"day": day.isoformat()}, compute)
+
+    async def week_summary(
+        self,
+        week: str = Path(..., pattern=r"^\d{4}-W\d{2}$", description="Settimana ISO (YYYY-Www)"),
+        user_id: UUID = Query(..., description="ID utente"),
+        db: AsyncSession = Depends(get_db),
+    ) -> dict:
+        """Come day_summary, per una settimana ISO (lunedì-domenica) con il riepilogo per giorno."""
+        year, number = int(week[:4]), int(week[6:8])
+        try:
+            date.fromisocalendar(year, number, 1)
+        except ValueError:
+            raise HTTPException(status_code=422, detail=f"Settimana ISO inesistente: {week}")
+
+        async def compute() -> dict:
+            repo = TradeRepository(db)
+            return to_json_safe(await repo.get_week_summary(user_id, year, number))
+
+        return await self._cached(db, "week_summary", user_id, {"week": week}, compute)
 
     # --------------------------
     # VANTAGE SCORE
@@ -188,15 +377,393 @@ class TradesController:
     async def vantage_score(
         self,
         user_id: UUID = Query(..., description="ID utente"),
+        x_metrics_profile: Optional[str] = Header(
+            None,
+            description="1 = breakdown dei tempi per fase in `_profile` (senza cache); "
+            "solo con METRICS_PROFILING_ALLOW_HEADER",
+        ),
         db: AsyncSession = Depends(get_db),
     ) -> dict:
+        profiler = self._start_profiler("vantage_score", x_metrics_profile)
+        repo = TradeRepository(db)
+        # versione persistita letta PRIMA della cache: chiave del risultato in
+        # cache e validazione dell'accumulatore usano la stessa, quindi anche un
+        # hit riflette le scritture servite da altri worker
+        with stage(profiler, "version"):
+            version = await repo.versions.get(user_id)
+
+        async def compute() -> dict:
+            # Stato incrementale aggiornato dalle scritture: il ricalcolo completo
+            # avviene al primo accesso, dopo una modifica fuori ordine o se la
+            # versione persistita è cambiata (scrittura servita da un altro worker).
+            acc = get_accumulator(user_id, version)
+            if acc is None:
+                with stage(profiler, "db"):
+                    rows = await repo.list_with_filters(user_id)
+
+                with stage(profiler, "frame"):
+                    acc = await compute_service.run_blocking(
+                        len(rows), lambda: MetricsAccumulator.from_frame(self._rows_to_frame(rows))
+                    )
+                store_accumulator(user_id, acc, version)
+            with stage(profiler, "scoring"):
+                return acc.vantage_score()
+
+        if profiler is not None and profiler.detailed:
+            payload = await compute()
+        else:
+            payload = await get_or_compute("vantage_score", user_id, None, compute, version)
+        if profiler is not None:
+            payload = {**payload, "_profile": profiler.emit()}
+        return payload
+
+    async def vantage_score_batch(
+        self,
+        payload: VantageScoreBatchRequest,
+        db: AsyncSession = Depends(get_db),
+    ) -> List[dict]:
+        """
+        Vantage Score per più utenti, classificato (rank 1 = score più alto).
+        - utenti con accumulatore valido (versione persistita invariata, UNA
+          query per tutti): O(1), nessuna lettura dei trade
+        - gli altri: UNA query in streaming per tutti, calcolo in parallelo
+          sui worker del compute_service (shared memory)
+        """
+        user_ids = list(dict.fromkeys(payload.user_ids))
         repo = TradeRepository(db)
-        rows = await repo.list_with_filters(user_id)
+        versions = await repo.versions.get_many(user_ids)
+        scores: dict = {}
+        trade_counts: dict = {}
+        missing = []
+        for user_id in user_ids:
+            acc = get_accumulator(user_id, versions[user_id])
+            if acc is None:
+                missing.append(user_id)
+            else:
+                scores[user_id] = to_json_safe(acc.vantage_score())
+                trade_counts[user_id] = acc.trade_count
+
+        if missing:
+            loaded = {user_id: [] for user_id in missing}
+            async for user_id, rows in repo.stream_pnl_by_user(missing):
+                loaded[user_id] = rows
+
+            created_us, pnl, offsets = pack_user_rows(list(loaded.values()))
+            batch = await compute_service.score_users(created_us, pnl, offsets)
+            scores.update(zip(loaded, batch))
+            trade_counts.update((user_id, len(rows)) for user_id, rows in loaded.items())
+
+        ranked = sorted(user_ids, key=lambda u: -(scores[u]["vantage_score"] or 0))
+        return [
+            {"user_id": user_id, "rank": rank, "trade_count": trade_counts[user_id], **scores[user_id]}
+            for rank, user_id in enumerate(ranked, start=1)
+        ]
+
+    # --------------------------
+    # PERFORMANCE METRICS (dashboard)
+    # --------------------------
+    async def performance_metrics(
+        self,
+        user_id: UUID = Query(..., description="ID utente"),
+        filters: DashboardFilters = Depends(),
+        max_points: Optional[int] = Query(
+            None, ge=10, le=100_000, description="Punti massimi per serie dei grafici (LTTB)"
+        ),
+        stats: Optional[List[str]] = Query(
+            None, description="Solo queste statistiche (es. stats=profit_factor,win_rate), senza grafici"
+        ),
+        x_metrics_profile: Optional[str] = Header(
+            None,
+            description="1 = breakdown dei tempi per fase in `_profile` (senza cache); "
+            "solo con METRICS_PROFILING_ALLOW_HEADER",
+        ),
+        db: AsyncSession = Depends(get_db),
+    ) -> dict:
+        """
+        Statistiche, equity curve e grafici calcolati lato server, SENZA la lista
+        dei trade: il payload non cresce con la lunghezza dello storico.
+        Con `max_points` equity curve e P&L giornaliero sono ridotti (LTTB)
+        mantenendo sempre picco e minimo del max drawdown.
+        Con `stats` (ripetuto o separato da virgole) la risposta è solo
+        {"stats": {...}} e vengono calcolati solo i nodi da cui dipendono.
+        """
+        stat_names = None
+        if stats:
+            stat_names = list(dict.fromkeys(
+                name.strip() for value in stats for name in value.split(",") if name.strip()
+            ))
+            unknown = [name for name in stat_names if name not in STAT_NAMES]
+            if unknown:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Statistiche sconosciute: {unknown}; disponibili: {list(STAT_NAMES)}",
+                )
+
+        kind = "all_metrics" if stat_names is None else "stats"
+        profiler = self._start_profiler(kind, x_metrics_profile)
+        detailed = profiler is not None and profiler.detailed
+
+        async def compute() -> dict:
+            with stage(profiler, "db"):
+                frame = await self._load_filtered_frame(db, user_id, filters)
+            if detailed:
+                # fasi interne misurate in questo processo (in un thread se l'input è grande)
+                return await compute_service.run_blocking(
+                    len(frame), self._profiled_metrics, frame, profiler, stat_names
+                )
+            # input grandi -> pool di processi, così l'event loop resta libero
+            with stage(profiler, "compute"):
+                if stat_names is None:
+                    return await compute_service.run("all_metrics", frame)
+                return {"stats": await compute_service.run("stats", frame, stat_names)}
+
+        if detailed:
+            payload = await compute()
+        else:
+            params = filters.cache_params()
+            if stat_names is not None:
+                params["stats"] = sorted(stat_names)
+            payload = await self._cached(db, kind, user_id, params, compute)
+        if profiler is not None:
+            payload = {**payload, "_profile": profiler.emit()}
+        if stat_names is not None:
+            return payload
+        return downsample_charts(payload, max_points)
+
+    async def performance_rolling(
+        self,
+        user_id: UUID = Query(..., description="ID utente"),
+        window: int = Query(20, ge=1, le=10_000, description="Ampiezza della finestra"),
+        unit: Literal["trades", "days"] = Query("trades", description="Finestra in trade o in giorni"),
+        filters: DashboardFilters = Depends(),
+        db: AsyncSession = Depends(get_db),
+    ) -> dict:
+        """
+        Serie temporali di Sharpe, win rate, profit factor ed expectancy su
+        finestre mobili di `window` trade o giorni (un solo passaggio O(n)).
+        """
+
+        async def compute() -> dict:
+            frame = await self._load_filtered_frame(db, user_id, filters)
+            return await compute_service.run("rolling_metrics", frame, window, unit)
+
+        return await self._cached(
+            db,
+            "rolling_metrics",
+            user_id,
+            filters.cache_params(window=window, unit=unit),
+            compute,
+        )
+
+    async def performance_monte_carlo(
+        self,
+        user_id: UUID = Query(..., description="ID utente"),
+        n_paths: int = Query(10_000, ge=100, le=100_000, description="Numero di percorsi simulati"),
+        horizon: Optional[int] = Query(
+            None, ge=1, le=10_000, description="Trade per percorso (default: numero di trade storici)"
+        ),
+        mode: Literal["pnl", "r"] = Query("pnl", description="Ricampiona P&L o R-multiple"),
+        starting_capital: float = Query(10_000, gt=0, description="Capitale iniziale"),
+        ruin_pct: float = Query(50, gt=0, le=100, description="Perdita (% del capitale) che definisce la rovina"),
+        risk_pct: float = Query(1, gt=0, le=100, description="Rischio per trade (% del capitale), solo mode=r"),
+        seed: Optional[int] = Query(None, ge=0, description="Seed per risultati riproducibili"),
+        filters: DashboardFilters = Depends(),
+        db: AsyncSession = Depends(get_db),
+    ) -> dict:
+        """
+        Simulazione Monte Carlo (bootstrap) dei risultati storici filtrati:
+        bande dell'equity finale, percentili del max drawdown e probabilità di
+        rovina. Senza `seed` il risultato non è riproducibile e non va in cache.
+        """
+
+        async def compute() -> dict:
+            frame = await self._load_filtered_frame(db, user_id, filters)
+            increments = await compute_service.run(
+                "monte_carlo_increments", frame, mode, starting_capital, risk_pct
+            )
+            if not increments.size:
+                raise HTTPException(status_code=422, detail="Nessun risultato storico da simulare")
+            result = await compute_service.simulate(
+                increments,
+                n_paths=n_paths,
+                horizon=horizon or increments.size,
+                starting_capital=starting_capital,
+                ruin_pct=ruin_pct,
+                seed=seed,
+            )
+            return to_json_safe({"mode": mode, **result})
+
+        if seed is None:
+            return await compute()
+        return await self._cached(
+            db,
+            "monte_carlo",
+            user_id,
+            filters.cache_params(
+                n_paths=n_paths, horizon=horizon, mode=mode,
+                starting_capital=starting_capital, ruin_pct=ruin_pct,
+                risk_pct=risk_pct, seed=seed,
+            ),
+            compute,
+        )
+
+    async def performance_breakdown(
+        self,
+        user_id: UUID = Query(..., description="ID utente"),
+        by: Optional[List[Literal["setup", "symbol", "direction", "emotional_state", "tags", "mistakes"]]] = Query(
+            None, description="Campi per cui scomporre (default: tutti)"
+        ),
+        sort_by: str = Query("total_pl", description="Statistica di ordinamento (decrescente)"),
+        top_n: Optional[int] = Query(None, ge=1, le=1000, description="Solo i primi N gruppi per campo"),
+        min_trades: int = Query(1, ge=1, description="Trade minimi perché un gruppo sia mostrato"),
+        filters: DashboardFilters = Depends(),
+        db: AsyncSession = Depends(get_db),
+    ) -> dict:
+        """
+        Statistiche per categoria (win rate, profit factor, expectancy, R medio,
+        conteggi) per le card di breakdown, tutti i campi in un solo calcolo.
+        """
+        if sort_by not in GROUP_STATS:
+            raise HTTPException(status_code=422, detail=f"sort_by deve essere uno tra {list(GROUP_STATS)}")
+        by = by or list(GROUP_FIELDS)
+
+        async def compute() -> dict:
+            frame = await self._load_filtered_frame(db, user_id, filters)
+            # legge anche i dict originali (simbolo, tag, ...): thread, non pool di processi
+            return await compute_service.run_blocking(
+                len(frame),
+                lambda: to_json_safe(
+                    MetricsCalculator(frame).calculate_breakdown(by, sort_by, top_n, min_trades)
+                ),
+            )
+
+        return await self._cached(
+            db,
+            "breakdown",
+            user_id,
+            filters.cache_params(by=by, sort_by=sort_by, top_n=top_n, min_trades=min_trades),
+            compute,
+        )
+
+    async def performance_distribution(
+        self,
+        user_id: UUID = Query(..., description="ID utente"),
+        metric: Literal["pnl", "realized_rr", "hold_minutes", "daily_pnl"] = Query(
+            "pnl", description="Distribuzione da descrivere"
+        ),
+        quantiles: Optional[List[float]] = Query(None, description="Quantili in [0, 1]"),
+        bins: Optional[List[float]] = Query(None, description="Bordi dei bin dell'istogramma (crescenti)"),
+        n_bins: int = Query(20, ge=1, le=500, description="Bin uguali tra min e max se `bins` manca"),
+        start_date: Optional[date] = Query(None, description="Dal giorno (mese intero per le metriche per trade)"),
+        end_date: Optional[date] = Query(None, description="Al giorno (mese intero per le metriche per trade)"),
+        db: AsyncSession = Depends(get_db),
+    ) -> dict:
+        """
+        Quantili, mediana, istogramma con bin arbitrari e (per P&L) VaR/CVaR al 95%,
+        senza leggere lo storico: le metriche per trade usano i t-digest mensili
+        mantenuti in scrittura, `daily_pnl` i rollup giornalieri.
+        I filtri della dashboard non si applicano (sketch per utente).
+        """
+        quantiles = quantiles or list(DEFAULT_QUANTILES)
+        if any(not 0 <= q <= 1 for q in quantiles):
+            raise HTTPException(status_code=422, detail="I quantili devono essere in [0, 1]")
+        if bins is not None and (len(bins) < 2 or any(b >= a for a, b in zip(bins[1:], bins))):
+            raise HTTPException(status_code=422, detail="bins: almeno due bordi strettamente crescenti")
+
+        async def compute() -> dict:
+            repo = TradeRepository(db)
+            if metric == "daily_pnl":
+                days = await repo.rollups.list_days(user_id, start_date=start_date, end_date=end_date)
+                sketch = QuantileSketch.from_values([from_fixed(int(d.pnl_sum)) for d in days])
+            else:
+                sketch = await repo.sketches.load(
+                    [user_id], metric, start_date=start_date, end_date=end_date
+                )
+            return to_json_safe({
+                "metric": metric,
+                **describe(sketch, quantiles, bins, n_bins, tail_risk=metric in ("pnl", "daily_pnl")),
+            })
+
+        return await self._cached(
+            db,
+            "distribution",
+            user_id,
+            {
+                "metric": metric, "quantiles": quantiles, "bins": bins, "n_bins": n_bins,
+                "start_date": start_date, "end_date": end_date,
+            },
+            compute,
+        )
+
+    async def performance_periods(
+        self,
+        user_id: UUID = Query(..., description="ID utente"),
+        periods: Optional[List[Literal["week", "month", "quarter", "year"]]] = Query(
+            None, description="Periodi da calcolare (default: tutti)"
+        ),
+        as_of: Optional[date] = Query(None, description="Giorno del periodo corrente (default: oggi UTC)"),
+        filters: DashboardFilters = Depends(),
+        db: AsyncSession = Depends(get_db),
+    ) -> dict:
+        """
+        Tabelle P&L per settimana / mese / trimestre / anno (statistiche core per
+        periodo) e confronto periodo corrente vs precedente, in un solo calcolo.
+        """
+        # il giorno di riferimento fa parte della chiave di cache (cambia a mezzanotte UTC)
+        as_of = as_of or datetime.now(timezone.utc).date()
+        periods = periods or list(PERIODS)
+
+        async def compute() -> dict:
+            frame = await self._load_filtered_frame(db, user_id, filters)
+            return await compute_service.run("period_stats", frame, periods, as_of)
+
+        return await self._cached(
+            db,
+            "period_stats",
+            user_id,
+            filters.cache_params(periods=periods, as_of=as_of),
+            compute,
+        )
+
+    async def performance_daily(
+        self,
+        user_id: UUID = Query(..., description="ID utente"),
+        filters: DashboardFilters = Depends(),
+        max_points: Optional[int] = Query(
+            None, ge=10, le=100_000, description="Punti massimi per serie dei grafici (LTTB)"
+        ),
+        x_metrics_profile: Optional[str] = Header(
+            None,
+            description="1 = breakdown dei tempi per fase in `_profile` (senza cache); "
+            "solo con METRICS_PROFILING_ALLOW_HEADER",
+        ),
+        db: AsyncSession = Depends(get_db),
+    ) -> dict:
+        """
+        Metriche giornaliere (Sharpe, Sortino, VaR, giorni vinti/persi, ...) e
+        breakdown per giorno della settimana / ora, aggregati direttamente in
+        Postgres: nessun trade viene caricato in memoria.
+        Supporta solo i filtri SQL (niente durata / R-multiple).
+        Con `max_points` il P&L giornaliero è ridotto (LTTB) mantenendo il
+        giorno migliore e il peggiore.
+        """
+        if filters.has_computed_filters():
+            raise HTTPException(
+                status_code=422, detail="Metriche giornaliere: solo filtri SQL (niente durata / R-multiple)"
+            )
+
+        profiler = self._start_profiler("daily_metrics", x_metrics_profile)
 
-        # trasformiamo le tuple (Trade, tag_names) in dizionari flat per il calcolatore
-        trades_as_dicts = []
-        for trade, tag_names in rows:
-            trades_as_dicts.append(self._to_trade_read_dict(trade, tag_names))
+        async def compute() -> dict:
+            with stage(profiler, "db"):
+                aggregates = await TradeRepository(db).get_pnl_aggregates(user_id, **filters.db_filters())
+            with stage(profiler, "daily_stats"):
+                return to_json_safe(MetricsCalculator.calculate_daily_metrics(aggregates))
 
-        calc = MetricsCalculator(trades_as_dicts)
-        return calc.calculate_vantage_score()
+        if profiler is not None and profiler.detailed:
+            payload = await compute()
+        else:
+            payload = await self._cached(db, "daily_metrics", user_id, filters.db_filters(), compute)
+        if profiler is not None:
+            payload = {**payload, "_profile": profiler.emit()}
+        return downsample_charts(payload, max_points)
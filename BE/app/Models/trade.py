@@ -33,6 +33,8 @@ class Trade(Base):
     __table_args__ = (
         UniqueConstraint("id", "user_id", name="trades_id_user_id_key"),
         Index("idx_trades_user", "user_id"),
+        # range scan per giorno/settimana (riepiloghi) in ordine di created_at
+        Index("idx_trades_user_created_at", "user_id", "created_at"),
         {"schema": "public"},
     )
 
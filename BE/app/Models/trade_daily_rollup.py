@@ -0,0 +1,39 @@
+# app/Models/trade_daily_rollup.py
+# Modello SQLAlchemy per la tabella public.trade_daily_rollups
+# (aggregati giornalieri per utente, mantenuti dal TradeRepository ad ogni scrittura)
+
+from __future__ import annotations
+
+import uuid
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, Float, ForeignKey, Integer, Numeric, PrimaryKeyConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.Infrastructure.db import Base
+
+
+class TradeDailyRollup(Base):
+    __tablename__ = "trade_daily_rollups"
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "day", name="trade_daily_rollups_pkey"),
+        {"schema": "public"},
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("auth.users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    # giorno (UTC) di created_at, come nel MetricsCalculator
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+
+    # P&L in punto fisso (unità di 1/MONEY_SCALE, vedi trade_frame): somme di
+    # delta interi, esatte; pnl_sq_sum è la somma dei quadrati delle unità
+    pnl_sum: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    pnl_sq_sum: Mapped[int] = mapped_column(Numeric, nullable=False, default=0)
+    trade_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    win_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    loss_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    volume: Mapped[float] = mapped_column(Float, nullable=False, default=0)
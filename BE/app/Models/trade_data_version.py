@@ -0,0 +1,28 @@
+# app/Models/trade_data_version.py
+# Modello SQLAlchemy per la tabella public.trade_data_versions
+# (versione dei trade per utente, incrementata dal TradeRepository ad ogni scrittura)
+
+from __future__ import annotations
+
+import uuid
+
+from sqlalchemy import BigInteger, ForeignKey, PrimaryKeyConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.Infrastructure.db import Base
+
+
+class TradeDataVersion(Base):
+    __tablename__ = "trade_data_versions"
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", name="trade_data_versions_pkey"),
+        {"schema": "public"},
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("auth.users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
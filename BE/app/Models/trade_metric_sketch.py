@@ -0,0 +1,36 @@
+# app/Models/trade_metric_sketch.py
+# Modello SQLAlchemy per la tabella public.trade_metric_sketches
+# (t-digest per utente / mese / metrica, mantenuti dal TradeRepository ad ogni scrittura)
+
+from __future__ import annotations
+
+import uuid
+from datetime import date
+
+from sqlalchemy import Boolean, Date, ForeignKey, PrimaryKeyConstraint, String
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.Infrastructure.db import Base
+
+
+class TradeMetricSketch(Base):
+    __tablename__ = "trade_metric_sketches"
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "month", "metric", name="trade_metric_sketches_pkey"),
+        {"schema": "public"},
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("auth.users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    # primo giorno del mese (UTC) di created_at
+    month: Mapped[date] = mapped_column(Date, nullable=False)
+    metric: Mapped[str] = mapped_column(String(32), nullable=False)
+
+    # QuantileSketch.to_dict()
+    sketch: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
+    # True se il digest va ricostruito dai trade del mese (dopo update/delete)
+    stale: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
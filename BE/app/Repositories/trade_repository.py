@@ -5,16 +5,37 @@
 
 from __future__ import annotations
 
-from typing import Iterable, List, Optional, Sequence, Tuple
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import AsyncIterator, Iterable, List, Optional, Sequence, Tuple
 from uuid import UUID
 
-from sqlalchemy import delete, func, select, update
+from sqlalchemy import delete, func, literal_column, select, tuple_, update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.Models.trade import Trade
 from app.Models.tag import Tag
 from app.Models.trades_tags import TradesTags
+from app.Repositories.trade_rollup_repository import TradeRollupRepository, pnl_units
+from app.Repositories.trade_sketch_repository import TradeSketchRepository
+from app.Repositories.trade_version_repository import TradeVersionRepository
+from app.Services.metrics import metrics_accumulator
+from app.Services.metrics.pnl_aggregates import PnlAggregates
+from app.Services.metrics.trade_frame import from_fixed
+
+
+# Colonne dei trade nei riepiloghi giorno/settimana (solo quelle mostrate)
+_SUMMARY_FIELDS = (
+    "id", "created_at", "symbol", "direction", "setup", "p_l", "position_size",
+    "entry_price", "exit_price", "stop_loss_price", "take_profit_price",
+    "entry_timestamp", "exit_timestamp",
+)
+
+
+def _plain(value):
+    """Numeric (Decimal) -> float; gli altri valori restano invariati."""
+    return float(value) if isinstance(value, Decimal) else value
 
 
 class TradeRepository:
@@ -22,6 +43,9 @@ class TradeRepository:
 
     def __init__(self, db: AsyncSession) -> None:
         self.db = db
+        self.rollups = TradeRollupRepository(db)
+        self.sketches = TradeSketchRepository(db)
+        self.versions = TradeVersionRepository(db)
 
     # ──────────────────────────────────────────────────────────────────────
     # HELPERS
@@ -147,32 +171,27 @@ class TradeRepository:
     # ──────────────────────────────────────────────────────────────────────
     # LIST + FILTRI
     # ──────────────────────────────────────────────────────────────────────
-    async def list_with_filters(
-        self,
+    @staticmethod
+    def _apply_filters(
+        base,
         user_id: UUID,
         *,
         symbol: Optional[str] = None,
         direction: Optional[str] = None,
         setups: Optional[List[str]] = None,
         mistakes: Optional[List[str]] = None,
-        days_of_week: Optional[List[int]] = None,  # 1..7 (ISO)
+        days_of_week: Optional[List[int]] = None,
         min_size: Optional[float] = None,
         max_size: Optional[float] = None,
         tags: Optional[List[str]] = None,
-    ) -> List[Tuple[Trade, List[str]]]:
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ):
         """
-        Ritorna una lista di tuple (Trade, [tag_names]) filtrate per user_id e criteri opzionali.
-
-        NOTE filtri:
-          - symbol: ILIKE "%symbol%"
-          - direction: ==
-          - setups: IN
-          - mistakes: array contiene tutti? (qui usiamo "contains" Postgres -> @>, basta che contenga l'insieme passato)
-          - days_of_week: func.extract('isodow', entry_timestamp).in_(days_of_week)
-          - min/max_size: range su position_size
-          - tags: deve contenere TUTTI i tag passati (subquery con count(distinct) == len(tags))
+        Applica a una select su Trade lo scope per user_id e i filtri opzionali
+        (semantica descritta in list_with_filters).
         """
-        base = select(Trade).where(Trade.user_id == user_id)
+        base = base.where(Trade.user_id == user_id)
 
         if symbol:
             base = base.where(Trade.symbol.ilike(f"%{symbol}%"))
@@ -191,6 +210,10 @@ class TradeRepository:
             base = base.where(Trade.position_size >= min_size)
         if max_size is not None:
             base = base.where(Trade.position_size <= max_size)
+        if start_date is not None:
+            base = base.where(Trade.created_at >= start_date)
+        if end_date is not None:
+            base = base.where(Trade.created_at < end_date + timedelta(days=1))
 
         # Filtra per TAGS (tutti presenti) con subquery:
         if tags:
@@ -204,6 +227,50 @@ class TradeRepository:
             )
             base = base.where(Trade.id.in_(tag_subq))
 
+        return base
+
+    async def list_with_filters(
+        self,
+        user_id: UUID,
+        *,
+        symbol: Optional[str] = None,
+        direction: Optional[str] = None,
+        setups: Optional[List[str]] = None,
+        mistakes: Optional[List[str]] = None,
+        days_of_week: Optional[List[int]] = None,  # 1..7 (ISO)
+        min_size: Optional[float] = None,
+        max_size: Optional[float] = None,
+        tags: Optional[List[str]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> List[Tuple[Trade, List[str]]]:
+        """
+        Ritorna una lista di tuple (Trade, [tag_names]) filtrate per user_id e criteri opzionali.
+
+        NOTE filtri:
+          - symbol: ILIKE "%symbol%"
+          - direction: ==
+          - setups: IN
+          - mistakes: array contiene tutti? (qui usiamo "contains" Postgres -> @>, basta che contenga l'insieme passato)
+          - days_of_week: func.extract('isodow', entry_timestamp).in_(days_of_week)
+          - min/max_size: range su position_size
+          - tags: deve contenere TUTTI i tag passati (subquery con count(distinct) == len(tags))
+          - start_date/end_date: intervallo (estremi inclusi) sul giorno di created_at
+        """
+        base = self._apply_filters(
+            select(Trade),
+            user_id,
+            symbol=symbol,
+            direction=direction,
+            setups=setups,
+            mistakes=mistakes,
+            days_of_week=days_of_week,
+            min_size=min_size,
+            max_size=max_size,
+            tags=tags,
+            start_date=start_date,
+            end_date=end_date,
+        )
         base = base.order_by(
             Trade.entry_timestamp.desc().nullslast(), Trade.created_at.desc()
         )
@@ -214,6 +281,36 @@ class TradeRepository:
 
         return [(t, tag_map.get(t.id, [])) for t in trades]
 
+    async def stream_pnl_by_user(
+        self, user_ids: Sequence[UUID], *, chunk_size: int = 10_000
+    ) -> AsyncIterator[Tuple[UUID, List[Tuple[datetime, Optional[float]]]]]:
+        """
+        Una sola query in streaming (server-side cursor) per più utenti:
+        produce (user_id, [(created_at, p_l), ...]) per ogni utente con almeno
+        un trade, con i trade in ordine cronologico. Carica solo le colonne
+        necessarie al Vantage Score.
+        """
+        if not user_ids:
+            return
+        q = (
+            select(Trade.user_id, Trade.created_at, Trade.p_l)
+            .where(Trade.user_id.in_(list(user_ids)))
+            .order_by(Trade.user_id, Trade.created_at)
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await self.db.stream(q)
+
+        current, rows = None, []
+        async for partition in result.partitions():
+            for user_id, created_at, p_l in partition:
+                if user_id != current:
+                    if rows:
+                        yield current, rows
+                    current, rows = user_id, []
+                rows.append((created_at, p_l))
+        if rows:
+            yield current, rows
+
     # ──────────────────────────────────────────────────────────────────────
     # GET (scoped per utente) + GET (solo per trade_id)
     # ──────────────────────────────────────────────────────────────────────
@@ -261,6 +358,14 @@ class TradeRepository:
         trade = Trade(user_id=user_id, **data)
         self.db.add(trade)
         await self.db.flush()   # ottieni id immediatamente
+        await self.db.refresh(trade, ["created_at"])  # default lato server
+
+        # 1b) versione dei trade, rollup giornalieri e sketch dei quantili (stessa transazione)
+        version = await self.versions.bump(user_id)
+        await self.rollups.apply(
+            user_id, added=[(trade.created_at, trade.p_l, trade.position_size)]
+        )
+        await self.sketches.add(user_id, [trade])
 
         # 2) gestisci Tags (se forniti)
         if tag_names:
@@ -270,6 +375,7 @@ class TradeRepository:
         await self.db.commit()
         # refresh opzionale
         await self.db.refresh(trade)
+        metrics_accumulator.on_trade_saved(user_id, version, trade.id, trade.created_at, trade.p_l)
         return trade
 
     # ──────────────────────────────────────────────────────────────────────
@@ -288,7 +394,19 @@ class TradeRepository:
         Ritorna la Trade aggiornata o None se non trovata.
         """
         # 1) Aggiorna i campi (se patch è vuota, salta update)
+        version = None  # nuova versione dei trade, solo se trade o tag sono cambiati
         if patch:
+            # valori precedenti (con lock di riga) per il delta sui rollup
+            res = await self.db.execute(
+                select(Trade.created_at, Trade.p_l, Trade.position_size)
+                .where(Trade.id == trade_id, Trade.user_id == user_id)
+                .with_for_update()
+            )
+            previous = res.first()
+            if previous is None:
+                await self.db.rollback()
+                return None
+
             stmt = (
                 update(Trade)
                 .where(Trade.id == trade_id, Trade.user_id == user_id)
@@ -300,6 +418,13 @@ class TradeRepository:
             if not trade:
                 await self.db.rollback()
                 return None
+            version = await self.versions.bump(user_id)
+            await self.rollups.apply(
+                user_id,
+                added=[(trade.created_at, trade.p_l, trade.position_size)],
+                removed=[tuple(previous)],
+            )
+            await self.sketches.invalidate(user_id, [previous.created_at, trade.created_at])
         else:
             # Se non ci sono campi da aggiornare, ricarica il trade (per coerenza con output)
             res = await self.db.execute(
@@ -309,13 +434,18 @@ class TradeRepository:
             if not trade:
                 return None
 
-        # 2) Se tag_names è presente, sostituisci i link
+        # 2) Se tag_names è presente, sostituisci i link (i filtri per tag
+        #    cambiano risultato: anche un aggiornamento solo dei tag è una nuova versione)
         if tag_names is not None:
+            if version is None:
+                version = await self.versions.bump(user_id)
             tag_ids = await self._ensure_tags_and_get_ids(user_id, tag_names)
             await self._replace_trade_tag_links(user_id, trade_id, tag_ids)
 
         await self.db.commit()
         await self.db.refresh(trade)
+        if version is not None:
+            metrics_accumulator.on_trade_saved(user_id, version, trade.id, trade.created_at, trade.p_l)
         return trade
 
     # ──────────────────────────────────────────────────────────────────────
@@ -326,32 +456,219 @@ class TradeRepository:
         Elimina il Trade (scoped per user_id). Ritorna True se almeno una riga è stata cancellata.
         Le righe nella tabella ponte vengono eliminate per ON DELETE CASCADE a livello DB.
         """
-        stmt = delete(Trade).where(Trade.id == trade_id, Trade.user_id == user_id)
-        res = await self.db.execute(stmt)
+        stmt = (
+            delete(Trade)
+            .where(Trade.id == trade_id, Trade.user_id == user_id)
+            .returning(Trade.created_at, Trade.p_l, Trade.position_size)
+        )
+        removed = [tuple(row) for row in (await self.db.execute(stmt)).all()]
+        deleted = len(removed) > 0
+        version = await self.versions.bump(user_id) if deleted else None
+        await self.rollups.apply(user_id, removed=removed)
+        await self.sketches.invalidate(user_id, [created_at for created_at, _, _ in removed])
         await self.db.commit()
-        return (res.rowcount or 0) > 0
+        if deleted:
+            metrics_accumulator.on_trade_deleted(user_id, version, trade_id)
+        return deleted
 
     # ──────────────────────────────────────────────────────────────────────
     # CALENDAR DATA
     # ──────────────────────────────────────────────────────────────────────
-    async def get_calendar_data(self, user_id: UUID) -> List[dict]:
+    async def get_calendar_data(
+        self,
+        user_id: UUID,
+        *,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> List[dict]:
+        """
+        Restituisce [{date: 'YYYY-MM-DD', pnl, trade_count, wins, losses, volume}, ...]
+        per i giorni con trade in [start_date, end_date] (estremi inclusi, opzionali),
+        letti da trade_daily_rollups: range scan sulla chiave primaria (user_id, day).
+        Il giorno è quello (UTC) di created_at, lo stesso delle metriche giornaliere.
+        """
+        rollups = await self.rollups.list_days(user_id, start_date=start_date, end_date=end_date)
+        return [
+            {
+                "date": r.day.isoformat(),
+                "pnl": from_fixed(int(r.pnl_sum or 0)),
+                "trade_count": int(r.trade_count),
+                "wins": int(r.win_count),
+                "losses": int(r.loss_count),
+                "volume": float(r.volume or 0),
+            }
+            for r in rollups
+        ]
+
+    # ──────────────────────────────────────────────────────────────────────
+    # RIEPILOGO DI UN GIORNO / UNA SETTIMANA ISO (modali di riepilogo)
+    # ──────────────────────────────────────────────────────────────────────
+    async def get_day_summary(self, user_id: UUID, day: date) -> dict:
+        """Riepilogo dei trade di un giorno (UTC di created_at), vedi _period_summary."""
+        return await self._period_summary(user_id, day, day)
+
+    async def get_week_summary(self, user_id: UUID, year: int, week: int) -> dict:
+        """Riepilogo di una settimana ISO (lunedì-domenica); ValueError se la settimana non esiste."""
+        start = date.fromisocalendar(year, week, 1)
+        return await self._period_summary(user_id, start, start + timedelta(days=6))
+
+    async def _period_summary(self, user_id: UUID, start: date, end: date) -> dict:
+        """
+        Trade dei giorni [start, end] (colonne di _SUMMARY_FIELDS) con P&L cumulato
+        (sull'intervallo e nel giorno), miglior/peggior trade, totali e riepilogo per
+        giorno, in UNA query: range scan su (user_id, created_at) + window function.
+        """
+        lo = datetime.combine(start, time.min, tzinfo=timezone.utc)
+        hi = datetime.combine(end + timedelta(days=1), time.min, tzinfo=timezone.utc)
+        pnl = func.coalesce(Trade.p_l, 0)
+        # literal (non parametro): stessa espressione in SELECT e PARTITION BY
+        day = func.date(func.timezone(literal_column("'UTC'"), Trade.created_at))
+        chrono = (Trade.created_at, Trade.id)
+        running = (None, 0)  # ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+
+        q = (
+            select(
+                *(getattr(Trade, field) for field in _SUMMARY_FIELDS),
+                day.label("day"),
+                func.sum(pnl).over(order_by=chrono, rows=running).label("cumulative_pnl"),
+                func.sum(pnl).over(partition_by=day, order_by=chrono, rows=running).label("day_cumulative_pnl"),
+                func.sum(pnl).over(partition_by=day).label("day_pnl"),
+                func.count().over(partition_by=day).label("day_trades"),
+                func.count().filter(Trade.p_l > 0).over(partition_by=day).label("day_wins"),
+                func.count().filter(Trade.p_l < 0).over(partition_by=day).label("day_losses"),
+                func.row_number().over(order_by=(Trade.p_l.desc().nulls_last(), *chrono)).label("best_rank"),
+                func.row_number().over(order_by=(Trade.p_l.asc().nulls_last(), *chrono)).label("worst_rank"),
+                func.count().over().label("trade_count"),
+                func.count().filter(Trade.p_l > 0).over().label("wins"),
+                func.count().filter(Trade.p_l < 0).over().label("losses"),
+                func.coalesce(func.sum(Trade.p_l).filter(Trade.p_l > 0).over(), 0).label("gross_profit"),
+                func.coalesce(-func.sum(Trade.p_l).filter(Trade.p_l < 0).over(), 0).label("gross_loss"),
+                func.sum(func.coalesce(Trade.position_size, 0)).over().label("volume"),
+            )
+            .where(Trade.user_id == user_id, Trade.created_at >= lo, Trade.created_at < hi)
+            .order_by(*chrono)
+        )
+        rows = [r._mapping for r in (await self.db.execute(q)).all()]
+
+        trades, days = [], {}
+        best = worst = None
+        for m in rows:
+            trade = {field: _plain(m[field]) for field in _SUMMARY_FIELDS}
+            trade["cumulative_pnl"] = float(m["cumulative_pnl"])
+            trade["day_cumulative_pnl"] = float(m["day_cumulative_pnl"])
+            trades.append(trade)
+            days[m["day"]] = {
+                "date": m["day"].isoformat(),
+                "pnl": float(m["day_pnl"]),
+                "trade_count": int(m["day_trades"]),
+                "wins": int(m["day_wins"]),
+                "losses": int(m["day_losses"]),
+            }
+            if m["p_l"] is not None:
+                if m["best_rank"] == 1:
+                    best = trade
+                if m["worst_rank"] == 1:
+                    worst = trade
+
+        totals = rows[0] if rows else None
+        trade_count = int(totals["trade_count"]) if totals else 0
+        wins = int(totals["wins"]) if totals else 0
+        losses = int(totals["losses"]) if totals else 0
+        gross_profit = float(totals["gross_profit"]) if totals else 0.0
+        gross_loss = float(totals["gross_loss"]) if totals else 0.0
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "trades": trades,
+            "cumulative_pnl": [
+                {"time": t["created_at"], "pnl": t["cumulative_pnl"]} for t in trades
+            ],
+            "best_trade": best,
+            "worst_trade": worst,
+            "days": list(days.values()),
+            "stats": {
+                "trade_count": trade_count,
+                "wins": wins,
+                "losses": losses,
+                "breakeven": trade_count - wins - losses,
+                "win_rate": wins / trade_count * 100 if trade_count else 0.0,
+                "total_pnl": trades[-1]["cumulative_pnl"] if trades else 0.0,
+                "gross_profit": gross_profit,
+                "gross_loss": gross_loss,
+                "profit_factor": gross_profit / gross_loss if gross_loss > 0 else float("inf"),
+                "volume": float(totals["volume"]) if totals else 0.0,
+            },
+        }
+
+    # ──────────────────────────────────────────────────────────────────────
+    # AGGREGATI P&L (giorno / giorno della settimana / ora)
+    # ──────────────────────────────────────────────────────────────────────
+    async def get_pnl_aggregates(self, user_id: UUID, **filters) -> PnlAggregates:
         """
-        Restituisce [{date: 'YYYY-MM-DD', pnl: float}, ...] aggregando per giorno (entry_timestamp)
-        i P&L (p_l) dei trades dell'utente. Esclude i trade senza entry_timestamp.
+        Aggrega in Postgres, con un'unica query GROUPING SETS, i P&L dei trade
+        filtrati (stessi filtri di list_with_filters):
+          - per giorno di created_at: sum(p_l), sum(position_size), count(*)
+          - per giorno della settimana ISO e per ora di entry_timestamp: sum(p_l)
+        I bucket sono calcolati in UTC, come in MetricsCalculator; i P&L sono
+        sommati in punto fisso (pnl_units), esatti come nel TradeFrame.
+        Ritorna una riga per giorno + 7 + 24 invece di una per trade.
+
+        Senza filtri (a parte start_date/end_date) la serie giornaliera è letta
+        da trade_daily_rollups (O(giorni)); dai trade si aggregano solo dow/ora.
         """
-        day_alias = func.date_trunc("day", Trade.entry_timestamp).label("day")
+        use_rollups = all(
+            value in (None, []) for key, value in filters.items()
+            if key not in ("start_date", "end_date")
+        )
+
+        # 1) bucket per trade (sotto-query filtrata), 2) GROUPING SETS sui bucket:
+        #    raggruppare su colonne semplici evita di ripetere le espressioni
+        #    parametrizzate nel GROUP BY.
+        buckets = self._apply_filters(
+            select(
+                func.date_trunc("day", func.timezone("UTC", Trade.created_at)).label("day"),
+                func.extract("isodow", func.timezone("UTC", Trade.entry_timestamp)).label("dow"),
+                func.extract("hour", func.timezone("UTC", Trade.entry_timestamp)).label("hour"),
+                pnl_units(Trade.p_l).label("pnl_units"),
+                Trade.position_size,
+            ),
+            user_id,
+            **filters,
+        ).subquery()
+        day, dow, hour = buckets.c.day, buckets.c.dow, buckets.c.hour
+
+        # grouping(day, dow, hour) è una bitmask delle colonne NON raggruppate:
+        #   0b011 -> per giorno, 0b101 -> per dow, 0b110 -> per ora
         q = (
-            select(day_alias, func.sum(Trade.p_l).label("daily_pnl"))
-            .where(Trade.user_id == user_id)
-            .where(Trade.entry_timestamp.is_not(None))
-            .group_by(day_alias)
-            .order_by(day_alias.asc())
+            select(
+                func.grouping(day, dow, hour).label("grouping_id"),
+                day,
+                dow,
+                hour,
+                func.sum(buckets.c.pnl_units).label("pnl"),
+                func.sum(buckets.c.position_size).label("volume"),
+                func.count().label("trade_count"),
+            )
+            .group_by(
+                func.grouping_sets(
+                    *([] if use_rollups else [tuple_(day)]), tuple_(dow), tuple_(hour)
+                )
+            )
+            .order_by(day.asc())
         )
         res = await self.db.execute(q)
-        rows = res.all()
 
-        out = []
-        for day, pnl in rows:
-            # day è un datetime (00:00); serializza in 'YYYY-MM-DD'
-            out.append({"date": day.date().isoformat(), "pnl": float(pnl or 0)})
-        return out
+        daily_rows, weekday_rows, hour_rows = [], [], []
+        if use_rollups:
+            rollups = await self.rollups.list_days(
+                user_id, start_date=filters.get("start_date"), end_date=filters.get("end_date")
+            )
+            daily_rows = [(r.day, r.pnl_sum, r.volume, r.trade_count) for r in rollups]
+        for grouping_id, d, w, h, pnl, volume, count in res.all():
+            if grouping_id == 0b011:
+                daily_rows.append((d.date(), pnl, volume, count))
+            elif grouping_id == 0b101 and w is not None:
+                weekday_rows.append((w, pnl))
+            elif grouping_id == 0b110 and h is not None:
+                hour_rows.append((h, pnl))
+        return PnlAggregates.from_rows(daily_rows, weekday_rows, hour_rows)
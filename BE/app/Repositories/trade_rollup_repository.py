@@ -0,0 +1,160 @@
+# app/Repositories/trade_rollup_repository.py
+# Repository asincrono per la tabella TRADE_DAILY_ROLLUPS (aggregati giornalieri per utente).
+# Le scritture sono delta additivi (INSERT ... ON CONFLICT DO UPDATE) eseguiti sulla
+# stessa sessione del TradeRepository: il commit è quello della scrittura sul trade.
+
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import BigInteger, Numeric, delete, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.trade import Trade
+from app.Models.trade_daily_rollup import TradeDailyRollup
+from app.Services.metrics.trade_frame import MONEY_SCALE, money_to_fixed
+
+# Contributo di un trade ai rollup: (created_at, p_l, position_size)
+TradeContribution = Tuple[datetime, Optional[float], Optional[float]]
+
+_SUMMED_COLUMNS = ("pnl_sum", "pnl_sq_sum", "trade_count", "win_count", "loss_count", "volume")
+
+
+def pnl_units(column):
+    """Espressione SQL: P&L in punto fisso (NULL = 0), arrotondato come to_fixed."""
+    return func.round(func.coalesce(column, 0) * MONEY_SCALE).cast(BigInteger)
+
+
+def rollup_day(created_at: datetime) -> date:
+    """Giorno UTC di created_at (naive = già UTC), come nel MetricsCalculator."""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+
+def rollup_deltas(
+    added: Iterable[TradeContribution] = (),
+    removed: Iterable[TradeContribution] = (),
+) -> Dict[date, dict]:
+    """
+    Delta per giorno delle colonne sommate (contributi `added` meno `removed`).
+    I giorni i cui delta si annullano (es. modifica di campi non rilevanti) sono omessi.
+    pnl_sum / pnl_sq_sum sono interi in punto fisso: le somme restano esatte e un
+    giorno 0.1 + 0.2 - 0.3 è in pareggio come nel TradeFrame.
+    """
+    deltas: Dict[date, dict] = {}
+    for sign, contributions in ((1, added), (-1, removed)):
+        for created_at, p_l, position_size in contributions:
+            pnl = money_to_fixed(p_l)
+            row = deltas.setdefault(rollup_day(created_at), dict.fromkeys(_SUMMED_COLUMNS, 0))
+            row["pnl_sum"] += sign * pnl
+            row["pnl_sq_sum"] += sign * pnl * pnl
+            row["trade_count"] += sign
+            row["win_count"] += sign * (pnl > 0)
+            row["loss_count"] += sign * (pnl < 0)
+            row["volume"] += sign * float(position_size or 0)
+    return {d: row for d, row in deltas.items() if any(row.values())}
+
+
+class TradeRollupRepository:
+    """Incapsula l’accesso a TradeDailyRollup (async)."""
+
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+
+    # ──────────────────────────────────────────────────────────────────────
+    # MANUTENZIONE INCREMENTALE (chiamata dal TradeRepository, senza commit)
+    # ──────────────────────────────────────────────────────────────────────
+    async def apply(
+        self,
+        user_id: UUID,
+        added: Iterable[TradeContribution] = (),
+        removed: Iterable[TradeContribution] = (),
+    ) -> None:
+        """
+        Aggiunge i contributi `added` e sottrae quelli `removed`.
+        I delta sono fusi per giorno; i giorni rimasti senza trade vengono eliminati.
+        """
+        deltas = rollup_deltas(added, removed)
+        if not deltas:
+            return
+
+        stmt = insert(TradeDailyRollup).values(
+            [{"user_id": user_id, "day": d, **row} for d, row in deltas.items()]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TradeDailyRollup.user_id, TradeDailyRollup.day],
+            set_={
+                col: getattr(TradeDailyRollup, col) + getattr(stmt.excluded, col)
+                for col in _SUMMED_COLUMNS
+            },
+        )
+        await self.db.execute(stmt)
+
+        emptied = [d for d, row in deltas.items() if row["trade_count"] < 0]
+        if emptied:
+            await self.db.execute(
+                delete(TradeDailyRollup).where(
+                    TradeDailyRollup.user_id == user_id,
+                    TradeDailyRollup.day.in_(emptied),
+                    TradeDailyRollup.trade_count <= 0,
+                )
+            )
+
+    # ──────────────────────────────────────────────────────────────────────
+    # REBUILD (backfill)
+    # ──────────────────────────────────────────────────────────────────────
+    async def rebuild(self, user_id: Optional[UUID] = None) -> int:
+        """
+        Ricalcola da zero i rollup dai trade (di un utente o di tutti) e fa commit.
+        Ritorna il numero di righe (utente, giorno) scritte.
+        """
+        # literal (non parametro): l'espressione deve coincidere tra SELECT e GROUP BY
+        day = func.date(func.timezone(literal_column("'UTC'"), Trade.created_at))
+        pnl = pnl_units(Trade.p_l)
+        source = (
+            select(
+                Trade.user_id,
+                day,
+                func.sum(pnl),
+                func.sum(pnl.cast(Numeric) * pnl),
+                func.count(),
+                func.count().filter(pnl > 0),
+                func.count().filter(pnl < 0),
+                func.sum(func.coalesce(Trade.position_size, 0)),
+            )
+            .group_by(Trade.user_id, day)
+        )
+        clear = delete(TradeDailyRollup)
+        if user_id is not None:
+            source = source.where(Trade.user_id == user_id)
+            clear = clear.where(TradeDailyRollup.user_id == user_id)
+
+        await self.db.execute(clear)
+        res = await self.db.execute(
+            insert(TradeDailyRollup).from_select(["user_id", "day", *_SUMMED_COLUMNS], source)
+        )
+        await self.db.commit()
+        return res.rowcount or 0
+
+    # ──────────────────────────────────────────────────────────────────────
+    # LETTURA
+    # ──────────────────────────────────────────────────────────────────────
+    async def list_days(
+        self,
+        user_id: UUID,
+        *,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> List[TradeDailyRollup]:
+        """Rollup dell'utente in ordine di giorno (estremi inclusi)."""
+        q = select(TradeDailyRollup).where(TradeDailyRollup.user_id == user_id)
+        if start_date is not None:
+            q = q.where(TradeDailyRollup.day >= start_date)
+        if end_date is not None:
+            q = q.where(TradeDailyRollup.day <= end_date)
+        q = q.order_by(TradeDailyRollup.day.asc())
+        return (await self.db.execute(q)).scalars().all()
@@ -0,0 +1,238 @@
+# app/Repositories/trade_sketch_repository.py
+# Repository asincrono per la tabella TRADE_METRIC_SKETCHES (t-digest per utente,
+# mese UTC e metrica). Le scritture sono eseguite sulla stessa sessione del
+# TradeRepository (il commit è quello della scrittura sul trade):
+#   - create -> i valori del trade vengono aggiunti al digest del suo mese
+#   - update/delete -> il mese è marcato `stale` (un digest non può togliere valori)
+# In lettura i mesi `stale` vengono ricostruiti dai soli trade di quel mese e
+# salvati con UN upsert in una transazione breve e separata (la sessione della
+# richiesta non viene committata). Il salvataggio avviene solo se la versione dei
+# trade dell'utente (trade_data_versions) è ancora quella letta prima della
+# ricostruzione: con una scrittura concorrente il mese resta `stale`.
+# Backfill iniziale: python -m app.Services.metrics.rebuild_sketches.
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Infrastructure.db import SessionLocal
+from app.Models.trade import Trade
+from app.Models.trade_metric_sketch import TradeMetricSketch
+from app.Repositories.trade_rollup_repository import rollup_day
+from app.Repositories.trade_version_repository import TradeVersionRepository
+from app.Services.metrics.quantile_sketch import QuantileSketch
+from app.Services.metrics.trade_frame import TradeFrame
+
+# Metriche per-trade con un digest (nomi usati nella colonna `metric`)
+SKETCH_METRICS = ("pnl", "realized_rr", "hold_minutes")
+
+# Campi del trade necessari a TradeFrame per calcolare le metriche
+_TRADE_FIELDS = (
+    "created_at", "p_l", "entry_price", "exit_price", "stop_loss_price", "take_profit_price",
+    "position_size", "lowest_price_during_trade", "highest_price_during_trade",
+    "direction", "setup", "entry_timestamp", "exit_timestamp",
+)
+
+
+def sketch_month(created_at: datetime) -> date:
+    """Primo giorno del mese UTC di created_at."""
+    return rollup_day(created_at).replace(day=1)
+
+
+def metric_values(frame: TradeFrame) -> Dict[str, np.ndarray]:
+    """Valori delle metriche per trade (NaN dove non disponibili, ignorati dai digest)."""
+    return {
+        "pnl": frame.pnl_filled(),
+        "realized_rr": frame.realized_rr(),
+        "hold_minutes": frame.hold_minutes(),
+    }
+
+
+def monthly_sketches(records: Sequence[dict]) -> Dict[date, Dict[str, QuantileSketch]]:
+    """Digest per mese e metrica dai trade (dict con i campi di _TRADE_FIELDS)."""
+    if not records:
+        return {}
+    frame = TradeFrame.from_records(records)
+    months, month_index = np.unique(frame.created_at.astype("datetime64[M]"), return_inverse=True)
+    values = metric_values(frame)
+    out: Dict[date, Dict[str, QuantileSketch]] = {}
+    for i, month in enumerate(months.astype("datetime64[D]").tolist()):
+        in_month = month_index == i
+        out[month] = {
+            metric: QuantileSketch.from_values(column[in_month]) for metric, column in values.items()
+        }
+    return out
+
+
+class TradeSketchRepository:
+    """Incapsula l’accesso a TradeMetricSketch (async)."""
+
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+
+    # ──────────────────────────────────────────────────────────────────────
+    # MANUTENZIONE INCREMENTALE (chiamata dal TradeRepository, senza commit)
+    # ──────────────────────────────────────────────────────────────────────
+    async def add(self, user_id: UUID, trades: Iterable[Trade]) -> None:
+        """Aggiunge i valori dei nuovi trade ai digest dei rispettivi mesi."""
+        records = [{field: getattr(t, field) for field in _TRADE_FIELDS} for t in trades]
+        sketches = monthly_sketches(records)
+        if not sketches:
+            return
+
+        res = await self.db.execute(
+            select(TradeMetricSketch)
+            .where(
+                TradeMetricSketch.user_id == user_id,
+                TradeMetricSketch.month.in_(list(sketches)),
+            )
+            .with_for_update()
+        )
+        existing = {(row.month, row.metric): row for row in res.scalars().all()}
+
+        new_rows = []
+        for month, by_metric in sketches.items():
+            for metric, sketch in by_metric.items():
+                row = existing.get((month, metric))
+                if row is None:
+                    new_rows.append({
+                        "user_id": user_id, "month": month, "metric": metric,
+                        "sketch": sketch.to_dict(), "stale": False,
+                    })
+                elif not row.stale:  # i mesi stale verranno comunque ricostruiti
+                    row.sketch = QuantileSketch.from_dict(row.sketch).merge(sketch).to_dict()
+
+        if new_rows:
+            stmt = insert(TradeMetricSketch).values(new_rows)
+            # riga creata nel frattempo da un'altra scrittura: si ricostruisce in lettura
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[TradeMetricSketch.user_id, TradeMetricSketch.month, TradeMetricSketch.metric],
+                set_={"stale": True},
+            )
+            await self.db.execute(stmt)
+
+    async def invalidate(self, user_id: UUID, created_at: Iterable[datetime]) -> None:
+        """Marca `stale` i mesi dei trade modificati o eliminati (creandoli se mancanti)."""
+        months = {sketch_month(c) for c in created_at if c is not None}
+        if not months:
+            return
+        stmt = insert(TradeMetricSketch).values([
+            {"user_id": user_id, "month": month, "metric": metric, "sketch": {}, "stale": True}
+            for month in sorted(months) for metric in SKETCH_METRICS
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TradeMetricSketch.user_id, TradeMetricSketch.month, TradeMetricSketch.metric],
+            set_={"stale": True},
+        )
+        await self.db.execute(stmt)
+
+    # ──────────────────────────────────────────────────────────────────────
+    # LETTURA (ricostruisce e salva i mesi stale)
+    # ──────────────────────────────────────────────────────────────────────
+    async def load(
+        self,
+        user_ids: Sequence[UUID],
+        metric: str,
+        *,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> QuantileSketch:
+        """
+        Digest fuso della metrica su uno o più utenti e sui mesi che intersecano
+        [start_date, end_date] (granularità mensile: i mesi agli estremi sono interi).
+        """
+        if metric not in SKETCH_METRICS:
+            raise ValueError(f"metric deve essere una tra {SKETCH_METRICS}")
+        q = select(TradeMetricSketch).where(
+            TradeMetricSketch.user_id.in_(list(user_ids)),
+            TradeMetricSketch.metric == metric,
+        )
+        if start_date is not None:
+            q = q.where(TradeMetricSketch.month >= start_date.replace(day=1))
+        if end_date is not None:
+            q = q.where(TradeMetricSketch.month <= end_date)
+        rows = (await self.db.execute(q)).scalars().all()
+
+        sketches = [QuantileSketch.from_dict(row.sketch) for row in rows if not row.stale]
+        stale = {(row.user_id, row.month) for row in rows if row.stale}
+        if stale:
+            rebuilt = await self.rebuild(stale)
+            sketches += [by_metric[metric] for by_metric in rebuilt.values()]
+        return QuantileSketch.merge_all(sketches)
+
+    async def rebuild(self, keys: Set[Tuple[UUID, date]]) -> Dict[Tuple[UUID, date], Dict[str, QuantileSketch]]:
+        """
+        Ricostruisce dai trade i digest dei mesi (utente, mese) indicati e li salva
+        (vedi _store). Sulla sessione della richiesta solo letture, senza lock né commit.
+        """
+        user_ids = sorted({user_id for user_id, _ in keys})
+        versions = await TradeVersionRepository(self.db).get_many(user_ids)
+        monthly = await self._read_monthly(user_ids, sorted({month for _, month in keys}))
+        empty = {metric: QuantileSketch() for metric in SKETCH_METRICS}
+        out = {key: monthly.get(key, empty) for key in keys}
+        await self._store(out, versions)
+        return out
+
+    async def backfill(self, user_id: UUID) -> int:
+        """Digest di tutti i mesi con trade dell'utente (backfill); ritorna le righe scritte."""
+        versions = await TradeVersionRepository(self.db).get_many([user_id])
+        return await self._store(await self._read_monthly([user_id]), versions)
+
+    async def _read_monthly(
+        self, user_ids: Sequence[UUID], months: Optional[Sequence[date]] = None
+    ) -> Dict[Tuple[UUID, date], Dict[str, QuantileSketch]]:
+        """Digest per (utente, mese) dai trade, con UNA query (tutti i mesi se `months` è None)."""
+        # literal (non parametro): stessa espressione dei rollup giornalieri
+        month_expr = func.date(func.date_trunc("month", func.timezone(literal_column("'UTC'"), Trade.created_at)))
+        q = select(Trade.user_id, *[getattr(Trade, field) for field in _TRADE_FIELDS]).where(
+            Trade.user_id.in_(list(user_ids))
+        )
+        if months is not None:
+            q = q.where(month_expr.in_(list(months)))
+        by_user: Dict[UUID, list] = {}
+        for row in (await self.db.execute(q)).all():
+            record = dict(row._mapping)
+            by_user.setdefault(record.pop("user_id"), []).append(record)
+        return {
+            (user_id, month): by_metric
+            for user_id, records in by_user.items()
+            for month, by_metric in monthly_sketches(records).items()
+        }
+
+    @staticmethod
+    async def _store(
+        sketches: Dict[Tuple[UUID, date], Dict[str, QuantileSketch]],
+        versions: Dict[UUID, int],
+    ) -> int:
+        """
+        Salva i digest con UN upsert (stale = false) in una transazione breve e
+        separata. Le versioni sono bloccate in lettura fino al commit: si scrivono
+        solo gli utenti la cui versione coincide con `versions` (letta prima dei
+        trade); per gli altri i mesi restano `stale`. Ritorna le righe scritte.
+        """
+        if not sketches:
+            return 0
+        async with SessionLocal() as session, session.begin():
+            current = await TradeVersionRepository(session).lock_many(sorted(versions))
+            rows = [
+                {"user_id": user_id, "month": month, "metric": metric, "sketch": sketch.to_dict(), "stale": False}
+                for (user_id, month), by_metric in sketches.items()
+                if current[user_id] == versions[user_id]
+                for metric, sketch in by_metric.items()
+            ]
+            if not rows:
+                return 0
+            stmt = insert(TradeMetricSketch).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[TradeMetricSketch.user_id, TradeMetricSketch.month, TradeMetricSketch.metric],
+                set_={"sketch": stmt.excluded.sketch, "stale": False},
+            )
+            await session.execute(stmt)
+        return len(rows)
@@ -0,0 +1,74 @@
+# app/Repositories/trade_version_repository.py
+# Repository asincrono per la tabella TRADE_DATA_VERSIONS (versione dei trade per utente).
+# L'incremento è eseguito sulla stessa sessione del TradeRepository: il commit è
+# quello della scrittura sul trade, quindi la versione letta da qualunque processo
+# cambia esattamente quando cambiano i trade.
+
+from __future__ import annotations
+
+from typing import Dict, Sequence
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.trade_data_version import TradeDataVersion
+
+
+class TradeVersionRepository:
+    """Incapsula l’accesso a TradeDataVersion (async)."""
+
+    def __init__(self, db: AsyncSession) -> None:
+        self.db = db
+
+    async def bump(self, user_id: UUID) -> int:
+        """
+        Incrementa (senza commit) e ritorna la versione dell'utente; la riga resta
+        bloccata fino al commit. Va chiamato PRIMA di toccare rollup e sketch, così
+        l'ordine dei lock è lo stesso della ricostruzione degli sketch (versione, poi sketch).
+        """
+        stmt = insert(TradeDataVersion).values(user_id=user_id, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TradeDataVersion.user_id],
+            set_={"version": TradeDataVersion.version + 1},
+        ).returning(TradeDataVersion.version)
+        return (await self.db.execute(stmt)).scalar_one()
+
+    async def lock_many(self, user_ids: Sequence[UUID]) -> Dict[UUID, int]:
+        """
+        Versioni correnti con lock condiviso fino al commit (le scritture dei trade
+        di questi utenti attendono). Le righe mancanti vengono create a 0.
+        """
+        if not user_ids:
+            return {}
+        await self.db.execute(
+            insert(TradeDataVersion)
+            .values([{"user_id": user_id, "version": 0} for user_id in user_ids])
+            .on_conflict_do_nothing()
+        )
+        res = await self.db.execute(
+            select(TradeDataVersion.user_id, TradeDataVersion.version)
+            .where(TradeDataVersion.user_id.in_(list(user_ids)))
+            .order_by(TradeDataVersion.user_id)
+            .with_for_update(read=True)
+        )
+        return dict(res.all())
+
+    async def get(self, user_id: UUID) -> int:
+        """Versione corrente (0 se l'utente non ha mai scritto trade)."""
+        res = await self.db.execute(
+            select(TradeDataVersion.version).where(TradeDataVersion.user_id == user_id)
+        )
+        return res.scalar_one_or_none() or 0
+
+    async def get_many(self, user_ids: Sequence[UUID]) -> Dict[UUID, int]:
+        """Versioni di più utenti in una query (0 per quelli senza riga)."""
+        if not user_ids:
+            return {}
+        res = await self.db.execute(
+            select(TradeDataVersion.user_id, TradeDataVersion.version)
+            .where(TradeDataVersion.user_id.in_(list(user_ids)))
+        )
+        versions = dict(res.all())
+        return {user_id: versions.get(user_id, 0) for user_id in user_ids}
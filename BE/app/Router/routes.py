@@ -18,7 +18,7 @@ from app.Controllers.trades_controller import TradesController
 # 📦 Schemi per le response (tipi Pydantic)
 from app.Schemas.auth_user import AuthUserRead
 from app.Schemas.role import RoleRead
-from app.Schemas.trade import TradeRead
+from app.Schemas.trade import TradeRead, TradeReadEnriched
 from app.Schemas.auth_session import (
     LoginResponse,
     RegisterResponse,
@@ -130,11 +130,22 @@ router_trades = APIRouter(
     tags=["Trades"],
 )
 
-router_trades.get("/", response_model=list[TradeRead])(trades.list_trades)
-router_trades.get("/{trade_id}", response_model=TradeRead)(trades.get_trade)
+router_trades.get("/", response_model=list[TradeReadEnriched])(trades.list_trades)
+router_trades.get("/{trade_id}", response_model=TradeReadEnriched)(trades.get_trade)
 router_trades.post("/", response_model=TradeRead, status_code=201)(trades.create_trade)
 router_trades.put("/{trade_id}", response_model=TradeRead)(trades.update_trade)
 router_trades.get("/calendar/data")(trades.calendar_data)
+router_trades.get("/calendar/months/{month}")(trades.calendar_month)
+router_trades.get("/summary/day/{day}")(trades.day_summary)
+router_trades.get("/summary/week/{week}")(trades.week_summary)
 router_trades.get("/performance/vantage-score")(trades.vantage_score)
+router_trades.post("/performance/vantage-score/batch")(trades.vantage_score_batch)
+router_trades.get("/performance/metrics")(trades.performance_metrics)
+router_trades.get("/performance/rolling")(trades.performance_rolling)
+router_trades.get("/performance/monte-carlo")(trades.performance_monte_carlo)
+router_trades.get("/performance/breakdown")(trades.performance_breakdown)
+router_trades.get("/performance/distribution")(trades.performance_distribution)
+router_trades.get("/performance/periods")(trades.performance_periods)
+router_trades.get("/performance/daily")(trades.performance_daily)
 
 router.include_router(router_trades)
@@ -0,0 +1,50 @@
+# app/Schemas/dashboard_filters.py
+# Filtri comuni degli endpoint della dashboard (query string), iniettati con
+# `filters: DashboardFilters = Depends()`: un'unica definizione dei parametri
+# invece di ripeterli in ogni endpoint.
+
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional
+
+from fastapi import Query
+
+from app.Services.metrics.metrics_calculator import COMPUTED_FILTERS
+
+# Filtri applicati in SQL (TradeRepository.list_with_filters / get_pnl_aggregates);
+# quelli in COMPUTED_FILTERS sono applicati sui trade caricati (MetricsCalculator.filter_trades)
+DB_FILTERS = (
+    "symbol", "direction", "setups", "mistakes", "days_of_week",
+    "min_size", "max_size", "tags", "start_date", "end_date",
+)
+
+
+@dataclass
+class DashboardFilters:
+    symbol: Optional[str] = Query(None)
+    direction: Optional[str] = Query(None)
+    setups: Optional[List[str]] = Query(None)
+    mistakes: Optional[List[str]] = Query(None)
+    days_of_week: Optional[List[int]] = Query(None, description="ISO day of week 1..7")
+    min_size: Optional[float] = Query(None)
+    max_size: Optional[float] = Query(None)
+    tags: Optional[List[str]] = Query(None)
+    start_date: Optional[date] = Query(None, description="Dal giorno (incluso)")
+    end_date: Optional[date] = Query(None, description="Al giorno (incluso)")
+    min_duration: Optional[float] = Query(None, description="Durata minima (minuti)")
+    max_duration: Optional[float] = Query(None, description="Durata massima (minuti)")
+    min_rr: Optional[float] = Query(None, description="R-multiple realizzato minimo")
+    max_rr: Optional[float] = Query(None, description="R-multiple realizzato massimo")
+
+    def db_filters(self) -> dict:
+        return {name: getattr(self, name) for name in DB_FILTERS}
+
+    def computed_filters(self) -> dict:
+        return {name: getattr(self, name) for name in COMPUTED_FILTERS}
+
+    def has_computed_filters(self) -> bool:
+        return any(value is not None for value in self.computed_filters().values())
+
+    def cache_params(self, **extra) -> dict:
+        """Parametri della chiave di cache: tutti i filtri + quelli propri dell'endpoint."""
+        return {**self.db_filters(), **self.computed_filters(), **extra}
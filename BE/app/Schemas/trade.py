@@ -82,6 +82,17 @@ class TradeRead(BaseModel):
         from_attributes = True
 
 
+class TradeReadEnriched(TradeRead):
+    """TradeRead + metriche calcolate (vedi Services/metrics/trade_enricher.py)."""
+
+    mae_usd: float = 0.0
+    mfe_usd: float = 0.0
+    planned_rr: float = 0.0
+    realized_rr: float = 0.0
+    stop_loss_usd: float = 0.0
+    profit_target_usd: float = 0.0
+
+
 class TradeFilters(BaseModel):
     symbol: Optional[str] = None
     direction: Optional[str] = None
@@ -91,3 +102,7 @@ class TradeFilters(BaseModel):
     min_size: Optional[float] = None
     max_size: Optional[float] = None
     tags: Optional[List[str]] = None
+
+
+class VantageScoreBatchRequest(BaseModel):
+    user_ids: List[UUID] = Field(..., min_length=1, max_length=1000)
@@ -0,0 +1,193 @@
+# app/Services/metrics/benchmark.py
+# Benchmark del motore metriche su trade sintetici (vedi synthetic_trades.py).
+#
+#   python -m app.Services.metrics.benchmark                          # 1k, 10k, 100k, 1M
+#   python -m app.Services.metrics.benchmark --sizes 1000 10000 --repeat 5
+#   python -m app.Services.metrics.benchmark --output bench.json --baseline old.json
+#
+# Per ogni dimensione e operazione misura il tempo (il migliore su --repeat
+# esecuzioni) e, in un'esecuzione separata sotto tracemalloc, il picco di
+# memoria allocata. Il risultato è un file JSON (commit, versioni, macchina,
+# misure) confrontabile tra commit con --baseline.
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.Services.metrics.metrics_calculator import MetricsCalculator
+from app.Services.metrics.synthetic_trades import generate_trades
+from app.Services.metrics.trade_enricher import enrich_trade_with_advanced_metrics, enrich_trades_batch
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+# Filtri calcolati usati per filter_trades (durata + R-multiple)
+BENCH_FILTERS = {"min_duration": 5, "max_duration": 240, "min_rr": -2, "max_rr": 3}
+
+# Statistiche di un widget tipico della dashboard (calcolo del solo sottografo)
+BENCH_STATS = ("profit_factor", "win_rate", "max_drawdown_abs")
+
+# enrich_trade_with_advanced_metrics è per-trade: si misura su un campione
+DEFAULT_ENRICH_SAMPLE = 10_000
+
+
+def _operations(trades: List[dict], enrich_sample: int) -> Dict[str, Callable[[], object]]:
+    """Operazioni misurate: nome -> callable senza argomenti. Ogni chiamata parte dai dict."""
+    sample = trades[:enrich_sample]
+    return {
+        "calculate_all_metrics": lambda: MetricsCalculator(trades).calculate_all_metrics(),
+        "calculate_all_metrics_compact": lambda: MetricsCalculator(trades).calculate_all_metrics(include_trades=False),
+        "calculate_vantage_score": lambda: MetricsCalculator(trades).calculate_vantage_score(),
+        "calculate_stats_subset": lambda: MetricsCalculator(trades).calculate_stats(BENCH_STATS),
+        "filter_trades": lambda: MetricsCalculator.filter_trades(trades, BENCH_FILTERS),
+        "enrich_trades_batch": lambda: enrich_trades_batch(trades),
+        "enrich_trade_with_advanced_metrics": lambda: [
+            enrich_trade_with_advanced_metrics(trade) for trade in sample
+        ],
+    }
+
+
+def _best_time(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_memory(fn: Callable[[], object]) -> int:
+    """Picco di memoria allocata (byte) durante una chiamata, via tracemalloc."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(
+    sizes=DEFAULT_SIZES,
+    *,
+    repeat: int = 3,
+    seed: int = 0,
+    measure_memory: bool = True,
+    enrich_sample: int = DEFAULT_ENRICH_SAMPLE,
+    operations: Optional[List[str]] = None,
+    log: Callable[[str], None] = print,
+) -> dict:
+    """Esegue il benchmark e ritorna il report (serializzabile in JSON)."""
+    results = []
+    for n in sizes:
+        trades = generate_trades(n, seed)
+        ops = _operations(trades, enrich_sample)
+        for name, fn in ops.items():
+            if operations and name not in operations:
+                continue
+            items = min(n, enrich_sample) if name == "enrich_trade_with_advanced_metrics" else n
+            wall = _best_time(fn, repeat)
+            peak = _peak_memory(fn) if measure_memory else None
+            results.append({
+                "operation": name,
+                "trades": n,
+                "items": items,
+                "wall_s": wall,
+                "us_per_item": wall / items * 1e6 if items else None,
+                "peak_memory_bytes": peak,
+            })
+            memory = f"{peak / 2**20:9.1f} MiB" if peak is not None else ""
+            log(f"{name:<36} n={n:>9,}  {wall:9.4f} s  {memory}")
+        del trades, ops
+        gc.collect()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+            "filters": BENCH_FILTERS,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict) -> List[dict]:
+    """Rapporto tempi/memoria rispetto a un report precedente (>1 = più lento)."""
+    previous = {(r["operation"], r["trades"]): r for r in baseline.get("results", [])}
+    rows = []
+    for r in report["results"]:
+        old = previous.get((r["operation"], r["trades"]))
+        if old is None or not old.get("wall_s"):
+            continue
+        memory_ratio = None
+        if r.get("peak_memory_bytes") and old.get("peak_memory_bytes"):
+            memory_ratio = r["peak_memory_bytes"] / old["peak_memory_bytes"]
+        rows.append({
+            "operation": r["operation"],
+            "trades": r["trades"],
+            "wall_ratio": r["wall_s"] / old["wall_s"],
+            "memory_ratio": memory_ratio,
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark di MetricsCalculator su trade sintetici.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Numero di trade")
+    parser.add_argument("--repeat", type=int, default=3, help="Esecuzioni per misura (si tiene la migliore)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Salta la misura del picco di memoria")
+    parser.add_argument("--enrich-sample", type=int, default=DEFAULT_ENRICH_SAMPLE,
+                        help="Trade usati per enrich_trade_with_advanced_metrics (per-trade)")
+    parser.add_argument("--only", nargs="+", default=None, help="Solo queste operazioni")
+    parser.add_argument("--output", default="metrics_benchmark.json", help="File JSON dei risultati")
+    parser.add_argument("--baseline", default=None, help="Report JSON precedente da confrontare")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        args.sizes,
+        repeat=args.repeat,
+        seed=args.seed,
+        measure_memory=not args.no_memory,
+        enrich_sample=args.enrich_sample,
+        operations=args.only,
+    )
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f))
+        for row in report["comparison"]:
+            memory = f"  mem x{row['memory_ratio']:.2f}" if row["memory_ratio"] else ""
+            print(f"{row['operation']:<36} n={row['trades']:>9,}  tempo x{row['wall_ratio']:.2f}{memory}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"risultati scritti in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# app/Services/metrics/breakdown.py
+# Scomposizione delle performance per categoria (setup, simbolo, direzione,
+# stato emotivo, tag, errori) per le card di breakdown della dashboard.
+#
+# Ogni campo categorico viene fattorizzato in codici interi; i campi a più
+# valori (tags, mistakes) sono "esplosi" in coppie (trade, codice), quindi un
+# trade conta in ognuno dei suoi tag. I codici di tutti i campi richiesti sono
+# concatenati (con offset per campo) e le statistiche di tutti i gruppi escono
+# dalle stesse bincount, in un solo passaggio.
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.Services.metrics.trade_frame import (
+    DIR_LONG,
+    DIR_NONE,
+    DIR_OTHER,
+    DIR_SHORT,
+    TradeFrame,
+    from_fixed,
+)
+
+GROUP_FIELDS = ("setup", "symbol", "direction", "emotional_state", "tags", "mistakes")
+
+# Campi a più valori (liste di nomi nel dict del trade)
+_MULTI_VALUED = {"tags", "mistakes"}
+
+_MISSING_LABEL = "Non specificato"
+_EMPTY_LIST_LABEL = "Nessuno"
+
+_DIRECTION_LABELS = {DIR_NONE: _MISSING_LABEL, DIR_LONG: "Long", DIR_SHORT: "Short", DIR_OTHER: "Altro"}
+
+# Statistiche per gruppo (ordinabili con sort_by)
+GROUP_STATS = (
+    'trade_count', 'winning_trades_count', 'losing_trades_count', 'win_rate',
+    'total_pl', 'avg_win', 'avg_loss', 'average_trade_pnl', 'profit_factor',
+    'expectancy', 'avg_realized_rr', 'largest_profit', 'largest_loss',
+)
+
+
+def factorize(values: Iterable) -> Tuple[np.ndarray, List[str]]:
+    """Valori -> (codici int64, etichette in ordine di prima apparizione); None -> 'Non specificato'."""
+    values = list(values)
+    distinct = {value: code for code, value in enumerate(dict.fromkeys(values))}
+    codes = np.fromiter(map(distinct.__getitem__, values), dtype=np.int64, count=len(values))
+    return codes, [_MISSING_LABEL if v is None else str(v) for v in distinct]
+
+
+def _field_codes(frame: TradeFrame, rows: List[dict], field: str) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """(posizioni nel frame, codici, etichette) per un campo; più righe per trade nei campi multipli."""
+    n = len(frame)
+    if field == "direction":
+        present = np.unique(frame.direction)
+        codes = np.searchsorted(present, frame.direction).astype(np.int64)
+        return np.arange(n), codes, [_DIRECTION_LABELS.get(int(d), "Altro") for d in present]
+    if field == "setup":
+        codes, labels = factorize(frame.setup.tolist())
+        return np.arange(n), codes, labels
+    if field in _MULTI_VALUED:
+        names = [row.get(field) or [_EMPTY_LIST_LABEL] for row in rows]
+        lengths = np.fromiter((len(v) for v in names), dtype=np.int64, count=n)
+        codes, labels = factorize(name for values in names for name in values)
+        return np.repeat(np.arange(n), lengths), codes, labels
+    codes, labels = factorize(row.get(field) for row in rows)
+    return np.arange(n), codes, labels
+
+
+def _group_stats(pnl: np.ndarray, rr: np.ndarray, codes: np.ndarray, n_groups: int) -> Dict[str, np.ndarray]:
+    """Statistiche di tutti i gruppi insieme (pnl in punto fisso, rr NaN se non disponibile)."""
+    wins, losses = pnl > 0, pnl < 0
+    count = np.bincount(codes, minlength=n_groups)
+    win_count = np.bincount(codes, weights=wins, minlength=n_groups).astype(np.int64)
+    loss_count = np.bincount(codes, weights=losses, minlength=n_groups).astype(np.int64)
+    gross_win = np.bincount(codes, weights=np.where(wins, pnl, 0), minlength=n_groups)
+    gross_loss = -np.bincount(codes, weights=np.where(losses, pnl, 0), minlength=n_groups)
+
+    has_rr = ~np.isnan(rr)
+    rr_count = np.bincount(codes, weights=has_rr, minlength=n_groups)
+    rr_sum = np.bincount(codes, weights=np.where(has_rr, rr, 0.0), minlength=n_groups)
+
+    largest_profit = np.zeros(n_groups, dtype=np.int64)
+    largest_loss = np.zeros(n_groups, dtype=np.int64)
+    np.maximum.at(largest_profit, codes, pnl)
+    np.minimum.at(largest_loss, codes, pnl)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        win_rate = np.where(count > 0, win_count / count, 0.0)
+        avg_win = np.where(win_count > 0, gross_win / win_count, 0.0)
+        avg_loss = np.where(loss_count > 0, gross_loss / loss_count, 0.0)
+        profit_factor = np.where(gross_loss > 0, gross_win / gross_loss, np.inf)
+        avg_rr = np.where(rr_count > 0, rr_sum / rr_count, 0.0)
+
+    return {
+        'trade_count': count,
+        'winning_trades_count': win_count,
+        'losing_trades_count': loss_count,
+        'win_rate': win_rate * 100,
+        'total_pl': from_fixed(gross_win - gross_loss),
+        'avg_win': from_fixed(avg_win),
+        'avg_loss': from_fixed(avg_loss),
+        'average_trade_pnl': from_fixed((gross_win - gross_loss) / np.maximum(count, 1)),
+        'profit_factor': profit_factor,
+        'expectancy': from_fixed(win_rate * avg_win - (1 - win_rate) * avg_loss),
+        'avg_realized_rr': avg_rr,
+        'largest_profit': from_fixed(largest_profit),
+        'largest_loss': from_fixed(largest_loss),
+    }
+
+
+def breakdown(
+    frame: TradeFrame,
+    fields: Iterable[str] = GROUP_FIELDS,
+    *,
+    sort_by: str = 'total_pl',
+    top_n: Optional[int] = None,
+    min_trades: int = 1,
+) -> Dict[str, dict]:
+    """
+    Per ogni campo: gruppi con almeno `min_trades` trade, ordinati per `sort_by`
+    (decrescente) e limitati ai primi `top_n`. `total_groups` / `omitted_groups`
+    dicono quanti gruppi esistono e quanti sono stati esclusi.
+    """
+    fields = list(dict.fromkeys(fields))
+    for field in fields:
+        if field not in GROUP_FIELDS:
+            raise ValueError(f"field deve essere uno tra {GROUP_FIELDS}")
+    if sort_by not in GROUP_STATS:
+        raise ValueError(f"sort_by deve essere uno tra {GROUP_STATS}")
+
+    rows = frame.rows() if any(f not in ("setup", "direction") for f in fields) else []
+    positions, codes, spans = [], [], []
+    offset = 0
+    for field in fields:
+        field_positions, field_codes, labels = _field_codes(frame, rows, field)
+        positions.append(field_positions)
+        codes.append(field_codes + offset)
+        spans.append((field, offset, labels))
+        offset += len(labels)
+
+    positions = np.concatenate(positions) if positions else np.zeros(0, dtype=np.int64)
+    codes = np.concatenate(codes) if codes else np.zeros(0, dtype=np.int64)
+    stats = _group_stats(frame.pnl_fixed()[positions], frame.realized_rr()[positions], codes, offset)
+    columns = {key: stats[key].tolist() for key in GROUP_STATS}
+
+    result = {}
+    for field, start, labels in spans:
+        groups = [
+            {'label': label, **{key: columns[key][start + i] for key in GROUP_STATS}}
+            for i, label in enumerate(labels)
+        ]
+        kept = [g for g in groups if g['trade_count'] >= min_trades]
+        kept.sort(key=lambda g: g[sort_by], reverse=True)
+        if top_n is not None:
+            kept = kept[:top_n]
+        result[field] = {
+            'groups': kept,
+            'total_groups': len(groups),
+            'omitted_groups': len(groups) - len(kept),
+        }
+    return result
@@ -0,0 +1,287 @@
+# app/Services/metrics/compute_service.py
+# Esecuzione dei calcoli pesanti di MetricsCalculator fuori dall'event loop.
+#
+# - Input piccoli (< METRICS_POOL_MIN_TRADES) restano inline: il costo di
+#   trasferimento supererebbe quello del calcolo.
+# - Input grandi vanno a un ProcessPoolExecutor: le colonne del TradeFrame
+#   vengono copiate UNA volta in un blocco multiprocessing.shared_memory e il
+#   worker le legge come viste NumPy (niente pickling di liste di dict).
+#   Al worker arriva solo un piccolo descrittore (nome blocco + layout colonne).
+# - Simulazioni Monte Carlo: la serie ricampionata è piccola e viaggia per
+#   pickle; il lavoro (percorsi x passi) va al pool oltre una soglia di celle.
+# - Batch di Vantage Score (molti utenti): le colonne (created_at, P&L) di
+#   tutti gli utenti vanno in un unico blocco; ogni worker calcola una fetta
+#   contigua di utenti, bilanciata per numero di trade.
+# - Lavoro sincrono su oggetti in-process (righe ORM -> dict -> TradeFrame):
+#   non è trasferibile a un altro processo, va in un thread oltre una soglia
+#   di righe così l'event loop resta libero durante la costruzione del frame.
+#
+# Con METRICS_POOL_WORKERS = 0 il pool è disabilitato e tutto gira inline.
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.Services.metrics.metrics_accumulator import MetricsAccumulator
+from app.Services.metrics.metrics_calculator import MetricsCalculator
+from app.Services.metrics.monte_carlo import simulate
+from app.Services.metrics.trade_frame import TradeFrame, to_datetime64
+from app.Utils.serialization import to_json_safe
+
+_ALIGN = 8
+
+# Layout delle colonne in un blocco: [(colonna, dtype, offset, lunghezza)]
+Layout = List[Tuple[str, str, int, int]]
+
+# Descrittore di un frame in shared memory:
+# (nome blocco, layout colonne, categorie del setup)
+FrameHandle = Tuple[str, Layout, list]
+
+# Descrittore di un batch di utenti: (nome blocco, layout colonne)
+BatchHandle = Tuple[str, Layout]
+
+# Fette di utenti per worker nel batch (più fette che worker -> bilanciamento)
+_SLICES_PER_WORKER = 4
+
+# Celle (percorsi x passi) oltre le quali una simulazione va al pool
+_SIMULATION_POOL_MIN_STEPS = 1_000_000
+
+# Righe oltre le quali la costruzione del frame va in un thread (~5 µs a riga)
+_THREAD_MIN_ROWS = 5_000
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# TASK (eseguiti nel worker o inline): frame -> risultato JSON-safe
+# ──────────────────────────────────────────────────────────────────────────
+def _task_all_metrics(frame: TradeFrame) -> dict:
+    return to_json_safe(MetricsCalculator(frame).calculate_all_metrics(include_trades=False))
+
+
+def _task_stats(frame: TradeFrame, names: Sequence[str]) -> dict:
+    return to_json_safe(MetricsCalculator(frame).calculate_stats(names))
+
+
+def _task_rolling_metrics(frame: TradeFrame, window: int, unit: str) -> dict:
+    return to_json_safe(MetricsCalculator(frame).calculate_rolling_metrics(window, unit))
+
+
+def _task_period_stats(frame: TradeFrame, periods: Sequence[str], as_of: Any) -> dict:
+    return to_json_safe(MetricsCalculator(frame).calculate_period_stats(periods, as_of))
+
+
+def _task_monte_carlo_increments(frame: TradeFrame, mode: str, starting_capital: float, risk_pct: float) -> np.ndarray:
+    return MetricsCalculator(frame).monte_carlo_increments(mode, starting_capital, risk_pct)
+
+
+# Solo calcoli sulle colonne del frame: nel worker i dict originali (simbolo,
+# tag, errori, ...) non ci sono, il breakdown va con run_blocking.
+TASKS: Dict[str, Callable[..., Any]] = {
+    "all_metrics": _task_all_metrics,
+    "stats": _task_stats,
+    "rolling_metrics": _task_rolling_metrics,
+    "period_stats": _task_period_stats,
+    "monte_carlo_increments": _task_monte_carlo_increments,
+}
+
+
+def score_users(created_us: np.ndarray, pnl: np.ndarray, offsets: np.ndarray, lo: int, hi: int) -> List[dict]:
+    """
+    Vantage Score degli utenti lo..hi-1 di un batch: i trade dell'utente i sono
+    created_us/pnl[offsets[i]:offsets[i + 1]], già in ordine cronologico.
+    """
+    return [
+        to_json_safe(
+            MetricsAccumulator.from_arrays(
+                created_us[offsets[i]:offsets[i + 1]], pnl[offsets[i]:offsets[i + 1]]
+            ).vantage_score()
+        )
+        for i in range(lo, hi)
+    ]
+
+
+def pack_user_rows(groups: Sequence[Sequence[Tuple[Any, Optional[float]]]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """[(created_at, p_l), ...] per utente -> (created_us, pnl, offsets) per score_users."""
+    counts = np.fromiter((len(rows) for rows in groups), dtype=np.int64, count=len(groups))
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    total = int(offsets[-1])
+    created_us = to_datetime64([created_at for rows in groups for created_at, _ in rows]).view(np.int64)
+    pnl = np.fromiter(
+        (p_l or 0.0 for rows in groups for _, p_l in rows), dtype=np.float64, count=total
+    )
+    return created_us, pnl, offsets
+
+
+def _balanced_slices(offsets: np.ndarray, parts: int) -> List[Tuple[int, int]]:
+    """Divide gli utenti in (al più) `parts` fette contigue con ~lo stesso numero di trade."""
+    n_users = len(offsets) - 1
+    targets = offsets[-1] * np.arange(1, parts) / parts
+    cuts = np.unique(np.clip(np.searchsorted(offsets, targets), 1, n_users - 1)) if n_users > 1 else []
+    bounds = [0, *np.asarray(cuts, dtype=np.int64).tolist(), n_users]
+    return [(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# SHARED MEMORY: export (processo principale) / attach (worker)
+# ──────────────────────────────────────────────────────────────────────────
+def export_arrays(columns: Dict[str, np.ndarray]) -> Tuple[shared_memory.SharedMemory, Layout]:
+    """Copia array 1-D (dtype numerici) in un nuovo blocco di shared memory."""
+    layout, offset = [], 0
+    for name, column in columns.items():
+        layout.append((name, column.dtype.str, offset, len(column)))
+        offset += -(-column.nbytes // _ALIGN) * _ALIGN
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (name, dtype, start, length) in layout:
+        target = np.ndarray((length,), dtype=dtype, buffer=shm.buf, offset=start)
+        target[:] = columns[name]
+        del target
+    return shm, layout
+
+
+def _attach_arrays(shm: shared_memory.SharedMemory, layout: Layout) -> Dict[str, np.ndarray]:
+    """Viste NumPy (senza copia) sulle colonne di un blocco."""
+    return {
+        col: np.ndarray((length,), dtype=dtype, buffer=shm.buf, offset=start)
+        for col, dtype, start, length in layout
+    }
+
+
+def export_frame(frame: TradeFrame) -> Tuple[shared_memory.SharedMemory, FrameHandle]:
+    """Copia le colonne del frame in un blocco di shared memory."""
+    columns = frame.columns()
+    setup = columns.pop("setup")
+    categories: dict = {}
+    columns["setup"] = np.fromiter(
+        (categories.setdefault(s, len(categories)) for s in setup), dtype=np.int32, count=len(setup)
+    )
+    shm, layout = export_arrays(columns)
+    return shm, (shm.name, layout, list(categories))
+
+
+def _run_on_shared_frame(task_name: str, handle: FrameHandle, *args: Any) -> Any:
+    """Entry point del worker: aggancia il blocco, ricostruisce il frame e calcola."""
+    name, layout, categories = handle
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        columns = _attach_arrays(shm, layout)
+        setup = np.empty(len(categories), dtype=object)
+        setup[:] = categories
+        columns["setup"] = setup[columns["setup"]] if len(categories) else np.empty(0, dtype=object)
+        frame = TradeFrame.from_columns(columns).sort_by_created_at()  # copia fuori dal blocco
+        del columns
+        return TASKS[task_name](frame, *args)
+    finally:
+        shm.close()
+
+
+def _score_shared_users(handle: BatchHandle, lo: int, hi: int) -> List[dict]:
+    """Entry point del worker per il batch: Vantage Score degli utenti lo..hi-1."""
+    name, layout = handle
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        columns = _attach_arrays(shm, layout)
+        try:
+            return score_users(columns["created_us"], columns["pnl"], columns["offsets"], lo, hi)
+        finally:
+            del columns
+    finally:
+        shm.close()
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# SERVICE
+# ──────────────────────────────────────────────────────────────────────────
+class MetricsComputeService:
+    """Smista i calcoli tra esecuzione inline e pool di processi."""
+
+    def __init__(self, max_workers: int, min_trades: int) -> None:
+        self.max_workers = max_workers
+        self.min_trades = min_trades
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def use_pool(self, n_trades: int) -> bool:
+        return self.max_workers > 0 and n_trades >= self.min_trades
+
+    async def run(self, task_name: str, frame: TradeFrame, *args: Any) -> Any:
+        """Esegue TASKS[task_name](frame, *args) (inline o nel pool; args piccoli e picklabili)."""
+        if not self.use_pool(len(frame)):
+            return TASKS[task_name](frame, *args)
+
+        shm, handle = export_frame(frame)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_pool(), _run_on_shared_frame, task_name, handle, *args
+            )
+        finally:
+            shm.close()
+            shm.unlink()
+
+    async def run_blocking(self, n_rows: int, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Esegue fn(*args) (lavoro sincrono su oggetti in-process, es. righe ORM)
+        inline per pochi dati, altrimenti in un thread fuori dall'event loop.
+        """
+        if n_rows < _THREAD_MIN_ROWS:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    async def score_users(self, created_us: np.ndarray, pnl: np.ndarray, offsets: np.ndarray) -> List[dict]:
+        """
+        Vantage Score di un batch di utenti (vedi score_users), uno per utente
+        nell'ordine di `offsets`. Con molti trade il lavoro è diviso tra i worker.
+        """
+        n_users = len(offsets) - 1
+        if n_users <= 0:
+            return []
+        if not self.use_pool(len(pnl)) or n_users == 1:
+            return score_users(created_us, pnl, offsets, 0, n_users)
+
+        shm, layout = export_arrays({
+            "created_us": created_us.astype(np.int64, copy=False),
+            "pnl": pnl.astype(np.float64, copy=False),
+            "offsets": offsets.astype(np.int64, copy=False),
+        })
+        try:
+            loop = asyncio.get_running_loop()
+            pool = self._get_pool()
+            slices = _balanced_slices(offsets, self.max_workers * _SLICES_PER_WORKER)
+            results = await asyncio.gather(*(
+                loop.run_in_executor(pool, _score_shared_users, (shm.name, layout), lo, hi)
+                for lo, hi in slices
+            ))
+        finally:
+            shm.close()
+            shm.unlink()
+        return [score for chunk in results for score in chunk]
+
+    async def simulate(self, increments: np.ndarray, **params: Any) -> dict:
+        """Simulazione Monte Carlo (vedi monte_carlo.simulate), inline o nel pool."""
+        params.setdefault("memory_budget_bytes", settings.METRICS_SIMULATION_MEMORY_MB * 1024 * 1024)
+        task = partial(simulate, increments, **params)
+        if self.max_workers <= 0 or params["n_paths"] * params["horizon"] < _SIMULATION_POOL_MIN_STEPS:
+            return task()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pool(), task)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+compute_service = MetricsComputeService(
+    max_workers=settings.METRICS_POOL_WORKERS,
+    min_trades=settings.METRICS_POOL_MIN_TRADES,
+)
@@ -0,0 +1,127 @@
+# app/Services/metrics/downsampling.py
+# Riduzione dei punti delle serie dei grafici (equity curve, P&L giornaliero).
+#
+# Largest-Triangle-Three-Buckets: primo e ultimo punto restano, i punti
+# interni sono divisi in `max_points - 2` bucket e di ogni bucket si tiene il
+# punto che forma il triangolo più grande con il punto scelto nel bucket
+# precedente e la media del bucket successivo (la forma visiva si conserva).
+# Alcuni punti (es. picco e minimo del max drawdown) sono sempre mantenuti:
+# LTTB lavora sul budget rimanente.
+#
+# Il downsampling è applicato alla risposta (anche quella in cache), senza
+# modificarla: la cache conserva la serie completa.
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+
+def lttb_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indici crescenti dei punti scelti da LTTB (ascissa = posizione)."""
+    n = y.size
+    if n <= max_points:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1])[:max(max_points, 1)]
+
+    n_buckets = max_points - 2
+    edges = np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)  # bucket b = [edges[b], edges[b + 1])
+    lengths = np.diff(edges)
+    # medie dei bucket (+ l'ultimo punto come "bucket" finale)
+    avg_x = np.append(edges[:-1] + (lengths - 1) / 2, n - 1)
+    avg_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / lengths, y[-1])
+
+    # bucket come righe di una matrice (n_buckets x larghezza massima), le
+    # celle oltre la fine del bucket sono padding escluso dall'argmax
+    offsets = np.arange(lengths.max())
+    padding = offsets >= lengths[:, None]
+    xs = np.minimum(edges[:-1, None] + offsets, edges[1:, None] - 1)
+    ys = y[xs]
+
+    # Il punto scelto in un bucket dipende da quello scelto nel precedente:
+    # invece del ciclo bucket per bucket si ricalcolano in blocco (argmax per
+    # riga) solo i bucket il cui predecessore è cambiato, fino al punto fisso.
+    # Il punto fisso è unico ed è la scelta sequenziale di LTTB (il bucket b è
+    # definitivo dopo al più b + 1 passate); in pratica bastano poche passate.
+    chosen = edges[:-1].copy()
+    pending = np.arange(n_buckets)
+    while pending.size:
+        a = np.where(pending > 0, chosen[pending - 1], 0)
+        a_f = a.astype(np.float64)[:, None]
+        y_a = y[a][:, None]
+        # doppia area del triangolo (a, punto del bucket, media del bucket successivo)
+        area = np.abs(
+            (a_f - avg_x[pending + 1, None]) * (ys[pending] - y_a)
+            - (a_f - xs[pending]) * (avg_y[pending + 1, None] - y_a)
+        )
+        area[padding[pending]] = -1.0
+        picked = xs[pending, np.argmax(area, axis=1)]
+        changed = pending[picked != chosen[pending]]
+        chosen[pending] = picked
+        pending = changed[changed + 1 < n_buckets] + 1
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    selected[1:-1] = chosen
+    return selected
+
+
+def downsample_indices(y: np.ndarray, max_points: int, keep: Iterable[int] = ()) -> np.ndarray:
+    """Indici da conservare: LTTB sul budget rimasto + gli indici `keep` (al più max_points)."""
+    n = y.size
+    if n <= max_points:
+        return np.arange(n)
+    keep = np.unique(np.fromiter((k for k in keep if 0 <= k < n), dtype=np.int64))
+    return np.union1d(lttb_indices(y, max(max_points - keep.size, 2)), keep)
+
+
+def downsample_equity_curve(points: List[dict], max_points: int) -> List[dict]:
+    """
+    Equity curve ({'date', 'pl', 'drawdown'}): restano sempre massimo e minimo
+    dell'equity e picco/minimo del max drawdown.
+    """
+    if len(points) <= max_points:
+        return points
+    equity = np.array([p['pl'] for p in points], dtype=np.float64)
+    keep = [int(np.argmax(equity)), int(np.argmin(equity))]
+    drawdown = np.array([p.get('drawdown') or 0.0 for p in points], dtype=np.float64)
+    if drawdown.max() > 0:
+        trough = int(np.argmax(drawdown))
+        keep += [trough, int(np.argmax(equity[:trough + 1]))]
+    return [points[i] for i in downsample_indices(equity, max_points, keep).tolist()]
+
+
+def downsample_daily_pnl(points: List[dict], max_points: int) -> List[dict]:
+    """P&L giornaliero ({'date', 'pnl'}): restano sempre il giorno migliore e il peggiore."""
+    if len(points) <= max_points:
+        return points
+    pnl = np.array([p['pnl'] for p in points], dtype=np.float64)
+    keep = [int(np.argmax(pnl)), int(np.argmin(pnl))]
+    return [points[i] for i in downsample_indices(pnl, max_points, keep).tolist()]
+
+
+_CHART_SERIES = {
+    'equity_curve_data': downsample_equity_curve,
+    'net_daily_pnl_chart': downsample_daily_pnl,
+}
+
+
+def downsample_charts(payload: dict, max_points: Optional[int]) -> dict:
+    """
+    Copia del payload con le serie dei grafici ridotte a `max_points` punti
+    (anche quelle duplicate dentro `stats`). Senza max_points: payload invariato.
+    """
+    if not max_points:
+        return payload
+    result = dict(payload)
+    containers = [result]
+    if isinstance(result.get('stats'), dict):
+        result['stats'] = dict(result['stats'])
+        containers.append(result['stats'])
+    for container in containers:
+        for key, reduce in _CHART_SERIES.items():
+            if isinstance(container.get(key), list):
+                container[key] = reduce(container[key], max_points)
+    return result
@@ -0,0 +1,125 @@
+# app/Services/metrics/drawdown.py
+# Motore drawdown: curva equity, picchi, drawdown ed episodi in un solo
+# passaggio vettoriale sui P&L in ordine cronologico.
+#
+# Indici: i punti della curva sono 0..n, dove il punto 0 è l'equity iniziale
+# (0) e il punto k è l'equity dopo il trade k-1. Gli indici degli episodi
+# sono invece indici di TRADE (0..n-1) nell'ordine del frame.
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from app.Services.metrics.trade_frame import from_fixed, to_fixed
+
+_US_PER_DAY = 86_400_000_000
+
+
+@dataclass
+class DrawdownProfile:
+    """
+    - equity / peak / drawdown: array di n + 1 punti (drawdown = peak - equity >= 0)
+    - episodi (array allineati, uno per periodo sotto il picco):
+        start:    primo trade sotto il picco
+        trough:   trade con il drawdown massimo dell'episodio (primo, a parità)
+        recovery: trade che riporta l'equity al picco, -1 se non recuperato
+        depth:    profondità massima dell'episodio (valore assoluto)
+    """
+
+    equity: np.ndarray
+    peak: np.ndarray
+    drawdown: np.ndarray
+    start: np.ndarray
+    trough: np.ndarray
+    recovery: np.ndarray
+    depth: np.ndarray
+
+    @classmethod
+    def from_pnl(cls, pnl: np.ndarray) -> "DrawdownProfile":
+        return cls.from_fixed(to_fixed(pnl))
+
+    @classmethod
+    def from_fixed(cls, units: np.ndarray) -> "DrawdownProfile":
+        """
+        Da P&L in punto fisso (int64): equity, picchi e confronti sono interi
+        esatti, quindi un recupero esattamente al picco chiude l'episodio.
+        """
+        equity = np.concatenate(([0], np.cumsum(units, dtype=np.int64)))
+        peak = np.maximum.accumulate(equity)
+        drawdown = peak - equity
+
+        # episodi = run di punti sotto il picco (punti 1..n -> trade 0..n-1)
+        underwater = drawdown[1:] > 0
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], underwater, [False])).astype(np.int8)))
+        start, end = edges[0::2], edges[1::2]  # [start, end) in indici di trade
+        if start.size:
+            trade_dd = drawdown[1:]
+            depth = np.maximum.reduceat(trade_dd, start)
+            # primo trade di ogni episodio in cui il drawdown raggiunge la profondità massima
+            episode_of = np.repeat(np.arange(start.size), end - start)
+            positions = _episode_positions(start, end)
+            is_trough = trade_dd[positions] == depth[episode_of]
+            first = np.unique(episode_of[is_trough], return_index=True)[1]
+            trough = positions[is_trough][first]
+        else:
+            depth = np.zeros(0, dtype=np.int64)
+            trough = np.zeros(0, dtype=np.int64)
+        recovery = np.where(end < units.size, end, -1)
+        return cls(
+            from_fixed(equity), from_fixed(peak), from_fixed(drawdown),
+            start, trough, recovery, from_fixed(depth),
+        )
+
+    # ──────────────────────────────────────────────────────────────────────
+    # STATISTICHE
+    # ──────────────────────────────────────────────────────────────────────
+    @property
+    def max_drawdown(self) -> float:
+        return float(self.drawdown.max())
+
+    @property
+    def average_drawdown(self) -> float:
+        return float(self.depth.mean()) if self.depth.size else 0.0
+
+    def durations_days(self, created_at: np.ndarray) -> np.ndarray:
+        """
+        Tempo sotto il picco di ogni episodio, in giorni: dal primo trade in
+        perdita al trade di recupero (o all'ultimo trade se non recuperato).
+        """
+        if not self.start.size:
+            return np.zeros(0)
+        stamps = created_at.astype(np.int64)
+        end = np.where(self.recovery >= 0, self.recovery, stamps.size - 1)
+        return (stamps[end] - stamps[self.start]) / _US_PER_DAY
+
+    def episodes(self, created_at: np.ndarray) -> List[dict]:
+        """Episodi serializzabili (indici di trade + timestamp ISO UTC)."""
+        labels = np.datetime_as_string(created_at, unit='s')
+        durations = self.durations_days(created_at)
+
+        def _stamp(i: int) -> Optional[str]:
+            return labels[i] + 'Z' if i >= 0 else None
+
+        return [
+            {
+                'start_index': s, 'trough_index': t,
+                'recovery_index': r if r >= 0 else None,
+                'start_date': _stamp(s), 'trough_date': _stamp(t), 'recovery_date': _stamp(r),
+                'depth': d, 'duration_trades': (r if r >= 0 else len(labels)) - s,
+                'duration_days': days,
+            }
+            for s, t, r, d, days in zip(
+                self.start.tolist(), self.trough.tolist(), self.recovery.tolist(),
+                self.depth.tolist(), durations.tolist(),
+            )
+        ]
+
+
+def _episode_positions(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Concatenazione vettoriale degli intervalli [start, end)."""
+    lengths = end - start
+    offsets = np.repeat(start - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return np.arange(int(lengths.sum())) + offsets
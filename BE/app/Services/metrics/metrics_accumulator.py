@@ -0,0 +1,359 @@
+# app/Services/metrics/metrics_accumulator.py
+# Accumulatore incrementale (online) delle metriche del Vantage Score.
+#
+# Mantiene per utente: totali P&L, conteggi win/loss, media/varianza dei P&L
+# giornalieri (Welford), equity, picco, max drawdown e stato delle streak.
+# Le scritture sui trade (create/update/delete nel TradeRepository) lo
+# aggiornano in O(1); solo una modifica "fuori ordine" (trade non ultimo in
+# ordine cronologico) invalida la parte dipendente dal percorso (equity,
+# drawdown, streak) e forza un ricalcolo completo alla lettura successiva.
+# Gli importi (totali, P&L giornalieri, equity, picco, drawdown) sono interi in
+# punto fisso (vedi trade_frame.MONEY_SCALE): aggiunte e rimozioni ripetute
+# non accumulano errori e lo stato coincide con un ricalcolo completo.
+#
+# Registro: gli accumulatori stanno nella metrics_cache (stesso budget di memoria
+# LRU e TTL dei risultati) e sono legati alla versione persistita dei trade
+# dell'utente (trade_data_versions). Un accumulatore è usato solo se la sua
+# versione coincide con quella letta dal DB, e un hook di scrittura lo aggiorna
+# solo se ha visto tutte le scritture precedenti: una scrittura servita da un
+# altro worker lo invalida.
+
+from __future__ import annotations
+
+import math
+import sys
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.Services.metrics.metrics_cache import metrics_cache
+from app.Services.metrics.metrics_calculator import MetricsCalculator
+from app.Services.metrics.streaks import LOSS, WIN, StreakRuns
+from app.Services.metrics.trade_frame import TradeFrame, from_fixed, money_to_fixed, to_epoch_us, to_fixed
+
+_US_PER_DAY = 86_400_000_000
+
+# Stima della memoria per voce di `trades` (UUID + tupla di due int) e di `days`
+_TRADE_ENTRY_BYTES = 220
+_DAY_ENTRY_BYTES = 160
+
+
+@dataclass
+class _PathState:
+    """Parte dello stato che dipende dall'ordine cronologico dei trade (importi in punto fisso)."""
+
+    equity: int = 0
+    peak: int = 0
+    max_drawdown: int = 0
+    current_wins: int = 0
+    current_losses: int = 0
+    max_wins: int = 0
+    max_losses: int = 0
+
+    def push(self, pnl: int) -> None:
+        """Applica in coda il P&L di un nuovo trade (O(1))."""
+        self.equity += pnl
+        self.peak = max(self.peak, self.equity)
+        self.max_drawdown = max(self.max_drawdown, self.peak - self.equity)
+        if pnl > 0:
+            self.current_wins, self.current_losses = self.current_wins + 1, 0
+        elif pnl < 0:
+            self.current_wins, self.current_losses = 0, self.current_losses + 1
+        else:
+            self.current_wins = self.current_losses = 0
+        self.max_wins = max(self.max_wins, self.current_wins)
+        self.max_losses = max(self.max_losses, self.current_losses)
+
+    @classmethod
+    def from_fixed(cls, pnl: np.ndarray) -> "_PathState":
+        """Stato dopo aver applicato (in ordine) tutti i P&L (int64 in punto fisso)."""
+        if pnl.size == 0:
+            return cls()
+        equity = np.cumsum(pnl, dtype=np.int64)
+        peak = np.maximum(np.maximum.accumulate(equity), 0)
+        runs = StreakRuns.from_values(pnl)
+        return cls(
+            equity=int(equity[-1]),
+            peak=int(peak[-1]),
+            max_drawdown=int((peak - equity).max()),
+            current_wins=max(runs.current, 0),
+            current_losses=max(-runs.current, 0),
+            max_wins=runs.max_length(WIN),
+            max_losses=runs.max_length(LOSS),
+        )
+
+
+class MetricsAccumulator:
+    """Stato incrementale delle metriche di un singolo utente."""
+
+    def __init__(self) -> None:
+        # Parte indipendente dall'ordine (sempre aggiornabile in O(1))
+        self.trade_count = 0
+        self.win_count = 0
+        self.loss_count = 0
+        self.total_win = 0  # punto fisso
+        self.total_loss = 0
+        self.days: Dict[int, list] = {}  # giorno (UTC, da epoch) -> [pnl punto fisso, n_trade]
+        self.day_n = 0
+        self.day_mean = 0.0
+        self.day_m2 = 0.0
+        self.trades: Dict[Hashable, Tuple[int, int]] = {}  # id -> (created_at µs, pnl punto fisso)
+        self.version: Optional[int] = None  # versione persistita dei trade rispecchiata dallo stato
+
+        # Parte dipendente dall'ordine (+ snapshot prima dell'ultimo trade)
+        self.path = _PathState()
+        self.path_valid = True
+        self.last_id: Optional[Hashable] = None
+        self.last_created_us: Optional[int] = None
+        self._before_last: Optional[Tuple[_PathState, Optional[int]]] = None
+
+    # ──────────────────────────────────────────────────────────────────────
+    # COSTRUZIONE (ricalcolo completo)
+    # ──────────────────────────────────────────────────────────────────────
+    @classmethod
+    def from_frame(cls, frame: TradeFrame) -> "MetricsAccumulator":
+        """Costruisce lo stato da tutti i trade dell'utente (ricalcolo completo)."""
+        if not len(frame):
+            return cls()
+        frame = frame.sort_by_created_at()
+        ids = [row.get('id') for row in frame.rows()]
+        return cls.from_arrays(frame.created_at.astype(np.int64), frame.pnl_filled(), ids)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        created_us: np.ndarray,
+        pnl: np.ndarray,
+        ids: Optional[Sequence[Hashable]] = None,
+    ) -> "MetricsAccumulator":
+        """
+        Costruisce lo stato da colonne già in ordine cronologico
+        (created_at in µs da epoch, P&L senza NaN).
+        Senza `ids` l'accumulatore è di sola lettura: non può seguire
+        update/delete dei singoli trade (es. calcoli batch).
+        """
+        acc = cls()
+        if not pnl.size:
+            return acc
+        created = created_us.astype(np.int64, copy=False)
+        pnl = to_fixed(pnl)
+
+        acc.trade_count = int(pnl.size)
+        acc.win_count = int(np.count_nonzero(pnl > 0))
+        acc.loss_count = int(np.count_nonzero(pnl < 0))
+        acc.total_win = int(pnl[pnl > 0].sum())
+        acc.total_loss = int(-pnl[pnl < 0].sum())
+
+        days, day_index = np.unique(created // _US_PER_DAY, return_inverse=True)
+        day_pnl = np.zeros(days.size, dtype=np.int64)
+        np.add.at(day_pnl, day_index, pnl)
+        day_count = np.bincount(day_index, minlength=days.size)
+        acc.days = {d: [p, c] for d, p, c in zip(days.tolist(), day_pnl.tolist(), day_count.tolist())}
+        day_values = from_fixed(day_pnl)
+        acc.day_n = int(days.size)
+        acc.day_mean = float(day_values.mean())
+        acc.day_m2 = float(((day_values - acc.day_mean) ** 2).sum())
+
+        acc.path = _PathState.from_fixed(pnl)
+        acc.last_created_us = int(created[-1])
+        previous_created = int(created[-2]) if pnl.size > 1 else None
+        acc._before_last = (_PathState.from_fixed(pnl[:-1]), previous_created)
+        if ids is not None:
+            acc.trades = dict(zip(ids, zip(created.tolist(), pnl.tolist())))
+            acc.last_id = ids[-1]
+        return acc
+
+    # ──────────────────────────────────────────────────────────────────────
+    # AGGIORNAMENTI O(1)
+    # ──────────────────────────────────────────────────────────────────────
+    def _welford_add(self, x: float) -> None:
+        self.day_n += 1
+        delta = x - self.day_mean
+        self.day_mean += delta / self.day_n
+        self.day_m2 += delta * (x - self.day_mean)
+
+    def _welford_remove(self, x: float) -> None:
+        self.day_n -= 1
+        if self.day_n == 0:
+            self.day_mean = self.day_m2 = 0.0
+            return
+        delta = x - self.day_mean
+        self.day_mean -= delta / self.day_n
+        self.day_m2 = max(0.0, self.day_m2 - delta * (x - self.day_mean))
+
+    def _apply_totals(self, created_us: int, pnl: int, sign: int) -> None:
+        """Aggiunge (sign=+1) o rimuove (sign=-1) il contributo di un trade."""
+        self.trade_count += sign
+        if pnl > 0:
+            self.win_count += sign
+            self.total_win += sign * pnl
+        elif pnl < 0:
+            self.loss_count += sign
+            self.total_loss -= sign * pnl
+
+        day = created_us // _US_PER_DAY
+        bucket = self.days.get(day)
+        if bucket is not None:
+            self._welford_remove(from_fixed(bucket[0]))
+        else:
+            bucket = self.days[day] = [0, 0]
+        bucket[0] += sign * pnl
+        bucket[1] += sign
+        if bucket[1] > 0:
+            self._welford_add(from_fixed(bucket[0]))
+        else:
+            del self.days[day]
+
+    def _append(self, trade_id: Hashable, created_us: int, pnl: int) -> None:
+        """Trade in coda all'ordine cronologico: aggiorna anche il percorso."""
+        self._before_last = (replace(self.path), self.last_created_us)
+        self.path.push(pnl)
+        self.last_id, self.last_created_us = trade_id, created_us
+
+    def _drop_last(self) -> None:
+        """Annulla l'ultimo trade ripristinando lo snapshot (se disponibile)."""
+        if self._before_last is None:
+            self.path_valid = False
+            return
+        self.path, self.last_created_us = self._before_last
+        self.last_id, self._before_last = None, None
+
+    def _is_append(self, created_us: int) -> bool:
+        return self.last_created_us is None or created_us > self.last_created_us
+
+    def on_saved(self, trade_id: Hashable, created_at: Any, pnl: Optional[float]) -> None:
+        """Trade creato o modificato."""
+        created_us = to_epoch_us(created_at)
+        pnl = money_to_fixed(pnl)
+        previous = self.trades.get(trade_id)
+        if previous == (created_us, pnl):
+            return  # nessun campo rilevante per le metriche è cambiato
+
+        if previous is not None:
+            self._apply_totals(*previous, sign=-1)
+            if trade_id == self.last_id:
+                self._drop_last()
+            else:
+                self.path_valid = False
+        self._apply_totals(created_us, pnl, sign=+1)
+        self.trades[trade_id] = (created_us, pnl)
+
+        if self.path_valid and self._is_append(created_us):
+            self._append(trade_id, created_us, pnl)
+        else:
+            self.path_valid = False
+
+    def on_deleted(self, trade_id: Hashable) -> None:
+        """Trade eliminato."""
+        previous = self.trades.pop(trade_id, None)
+        if previous is None:
+            self.path_valid = False
+            return
+        self._apply_totals(*previous, sign=-1)
+        if trade_id == self.last_id:
+            self._drop_last()
+        else:
+            self.path_valid = False
+
+    # ──────────────────────────────────────────────────────────────────────
+    # LETTURA
+    # ──────────────────────────────────────────────────────────────────────
+    def __sizeof__(self) -> int:
+        """Stima della memoria (budget della metrics_cache): cresce con trade e giorni."""
+        return (
+            object.__sizeof__(self)
+            + sys.getsizeof(self.trades) + len(self.trades) * _TRADE_ENTRY_BYTES
+            + sys.getsizeof(self.days) + len(self.days) * _DAY_ENTRY_BYTES
+        )
+
+    @property
+    def needs_rebuild(self) -> bool:
+        """True se una modifica fuori ordine richiede il ricalcolo completo."""
+        return not self.path_valid
+
+    def stats(self) -> dict:
+        """Statistiche richieste da MetricsCalculator.score_from_stats."""
+        total_win, total_loss = from_fixed(self.total_win), from_fixed(self.total_loss)
+        avg_win = total_win / self.win_count if self.win_count else 0.0
+        avg_loss = total_loss / self.loss_count if self.loss_count else 0.0
+        total_pl = from_fixed(self.total_win - self.total_loss)
+        max_dd, peak = from_fixed(self.path.max_drawdown), from_fixed(self.path.peak)
+        return {
+            'trade_count': self.trade_count,
+            'total_pl': total_pl,
+            'profit_factor': total_win / total_loss if total_loss > 0 else math.inf,
+            'average_win_loss_ratio': avg_win / avg_loss if avg_loss > 0 else math.inf,
+            'win_rate': self.win_count / self.trade_count * 100 if self.trade_count else 0.0,
+            'max_drawdown_abs': max_dd,
+            'max_drawdown_pct': max_dd / peak * 100 if peak > 0 else 0.0,
+            'recovery_factor': total_pl / max_dd if max_dd > 0 else math.inf,
+            'consistency_score': math.sqrt(self.day_m2 / self.day_n) if self.day_n else 0.0,
+            'max_consecutive_wins': self.path.max_wins,
+            'max_consecutive_losses': self.path.max_losses,
+            'current_trade_streak': self.path.current_wins or -self.path.current_losses,
+        }
+
+    def vantage_score(self) -> dict:
+        """Vantage Score (stesso risultato di MetricsCalculator.calculate_vantage_score)."""
+        if not self.trade_count:
+            return MetricsCalculator([]).calculate_vantage_score()
+        return MetricsCalculator.score_from_stats(self.stats())
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# REGISTRO PER-UTENTE (nella metrics_cache, validato sulla versione persistita)
+# ──────────────────────────────────────────────────────────────────────────
+def _cache_key(user_id: Hashable) -> tuple:
+    return ("accumulator", user_id)
+
+
+def get_accumulator(user_id: Hashable, version: int) -> Optional[MetricsAccumulator]:
+    """
+    Accumulatore dell'utente se rispecchia la versione persistita `version`
+    (TradeVersionRepository.get), altrimenti None: va (ri)costruito.
+    """
+    hit, acc = metrics_cache.get(_cache_key(user_id))
+    if not hit or acc.needs_rebuild or acc.version != version:
+        return None
+    return acc
+
+
+def store_accumulator(user_id: Hashable, acc: MetricsAccumulator, version: int) -> None:
+    """Registra l'accumulatore costruito dai trade letti DOPO aver letto `version`."""
+    acc.version = version
+    metrics_cache.put(_cache_key(user_id), acc)
+
+
+def _follow_write(user_id: Hashable, version: int) -> Optional[MetricsAccumulator]:
+    """
+    Accumulatore da aggiornare con la scrittura che ha prodotto `version`:
+    solo se ha visto tutte le precedenti (version - 1), altrimenti viene scartato.
+    """
+    key = _cache_key(user_id)
+    hit, acc = metrics_cache.get(key)
+    if not hit:
+        return None
+    if acc.version != version - 1:
+        metrics_cache.discard(key)
+        return None
+    return acc
+
+
+def on_trade_saved(
+    user_id: Hashable, version: int, trade_id: Hashable, created_at: datetime, pnl: Optional[float]
+) -> None:
+    """Hook di scrittura (dopo il commit): no-op se l'utente non ha un accumulatore valido."""
+    acc = _follow_write(user_id, version)
+    if acc is not None:
+        acc.on_saved(trade_id, created_at, pnl)
+        store_accumulator(user_id, acc, version)  # aggiorna anche la stima di memoria
+
+
+def on_trade_deleted(user_id: Hashable, version: int, trade_id: Hashable) -> None:
+    """Hook di cancellazione (dopo il commit): no-op se l'utente non ha un accumulatore valido."""
+    acc = _follow_write(user_id, version)
+    if acc is not None:
+        acc.on_deleted(trade_id)
+        store_accumulator(user_id, acc, version)
@@ -0,0 +1,125 @@
+# app/Services/metrics/metrics_cache.py
+# Cache LRU in-process dei risultati di MetricsCalculator.
+#
+# Chiave: (tipo di calcolo, user_id, filtri normalizzati, versione dati utente).
+# La versione è quella persistita in trade_data_versions, incrementata dal
+# TradeRepository nella transazione di ogni scrittura su trade/tag: il chiamante
+# la legge prima della ricerca in cache, quindi una scrittura servita da un
+# altro worker invalida subito anche le voci di questo processo. Le voci con
+# versione vecchia non vengono più servite e vengono espulse per LRU/TTL.
+# Limiti: budget di memoria (stima in byte) + TTL per voce.
+
+from __future__ import annotations
+
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+from app.config import settings
+
+def normalize_filters(filters: Optional[dict]) -> Tuple:
+    """Filtri -> tupla hashabile e stabile (None scartati, liste ordinate)."""
+    if not filters:
+        return ()
+    items = []
+    for key, value in filters.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = tuple(sorted(str(v) for v in value))
+        items.append((key, value))
+    return tuple(sorted(items, key=lambda kv: kv[0]))
+
+
+def estimate_size(value: Any) -> int:
+    """Stima (approssimata) della memoria occupata da un payload JSON-like."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(v) for v in value)
+    return size
+
+
+class MetricsCache:
+    """LRU con budget di memoria e TTL."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """(hit, valore). Le voci scadute vengono rimosse."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, _, expires_at = entry
+        if expires_at <= self._clock():
+            self._evict(key)
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = estimate_size(value)
+        if key in self._entries:
+            self._evict(key)
+        if size > self.max_bytes:
+            return  # troppo grande per il budget: non si mette in cache
+        self._entries[key] = (value, size, self._clock() + self.ttl_seconds)
+        self.current_bytes += size
+
+        # Prima le voci scadute, poi LRU finché non si rientra nel budget
+        now = self._clock()
+        for k in [k for k, (_, _, exp) in self._entries.items() if exp <= now]:
+            self._evict(k)
+        while self.current_bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def discard(self, key: Hashable) -> None:
+        if key in self._entries:
+            self._evict(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.current_bytes = 0
+
+
+metrics_cache = MetricsCache(
+    max_bytes=settings.METRICS_CACHE_MAX_BYTES,
+    ttl_seconds=settings.METRICS_CACHE_TTL_SECONDS,
+)
+
+
+async def get_or_compute(
+    kind: str,
+    user_id: Hashable,
+    filters: Optional[dict],
+    compute: Callable[[], Awaitable[Any]],
+    version: int,
+) -> Any:
+    """
+    Ritorna il risultato in cache per (kind, user_id, filtri, versione dati)
+    oppure lo calcola con `compute()` e lo memorizza.
+    `version` è la versione persistita (TradeVersionRepository.get) letta PRIMA
+    di `compute()`: i dati letti dopo sono almeno altrettanto recenti, quindi una
+    voce non è mai più vecchia della versione nella sua chiave.
+    """
+    key = (kind, user_id, normalize_filters(filters), version)
+    hit, value = metrics_cache.get(key)
+    if hit:
+        return value
+    value = await compute()
+    metrics_cache.put(key, value)
+    return value
@@ -0,0 +1,103 @@
+# app/Services/metrics/monte_carlo.py
+# Simulazione Monte Carlo dell'equity (bootstrap dei risultati realizzati).
+#
+# Ogni percorso è una sequenza di `horizon` incrementi estratti con
+# reinserimento dalla serie storica (P&L in valuta, oppure R-multiple
+# convertiti in valuta con un rischio fisso per trade). I percorsi sono
+# simulati a blocchi di righe di una matrice (percorsi x passi): la dimensione
+# del blocco è scelta in modo che le matrici di lavoro stiano nel budget di
+# memoria, quindi 100k percorsi x 1k trade non richiedono 100M celle in RAM.
+# Di ogni blocco si conservano solo i riepiloghi per percorso (equity finale,
+# max drawdown, rovina): i percentili finali sono esatti.
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+MODES = ("pnl", "r")
+
+EQUITY_PERCENTILES = (5, 25, 50, 75, 95)
+DRAWDOWN_PERCENTILES = (50, 75, 90, 95, 99)
+
+# Byte per cella nel blocco: indici estratti + equity + picco (float64)
+_BYTES_PER_STEP = 24
+
+
+def paths_per_batch(horizon: int, memory_budget_bytes: int) -> int:
+    """Numero di percorsi per blocco che rispetta il budget di memoria (almeno 1)."""
+    return max(1, int(memory_budget_bytes) // (max(horizon, 1) * _BYTES_PER_STEP))
+
+
+def _percentiles(values: np.ndarray, levels) -> dict:
+    return {f"p{q}": float(v) for q, v in zip(levels, np.percentile(values, levels))}
+
+
+def simulate(
+    increments: np.ndarray,
+    *,
+    n_paths: int,
+    horizon: int,
+    starting_capital: float,
+    ruin_pct: float = 50.0,
+    seed: Optional[int] = None,
+    memory_budget_bytes: int = 256 * 1024 * 1024,
+) -> dict:
+    """
+    Bootstrap di `n_paths` percorsi di `horizon` incrementi presi da `increments`.
+
+    - final_equity: equity finale (capitale iniziale + P&L simulato), media e percentili
+    - max_drawdown / max_drawdown_pct: massimo drawdown per percorso (valuta e %
+      del picco di equity, capitale incluso), percentili
+    - probability_of_ruin: frazione di percorsi in cui l'equity scende almeno
+      una volta a starting_capital * (1 - ruin_pct / 100)
+    - probability_of_loss: frazione di percorsi che chiudono sotto il capitale iniziale
+    Stesso `seed` -> stesso risultato (a parità di budget di memoria).
+    """
+    increments = np.asarray(increments, dtype=np.float64)
+    if increments.size == 0 or n_paths < 1 or horizon < 1:
+        raise ValueError("servono almeno un risultato storico, un percorso e un passo")
+    if starting_capital <= 0:
+        raise ValueError("starting_capital deve essere > 0")
+
+    rng = np.random.default_rng(seed)
+    ruin_loss = starting_capital * ruin_pct / 100
+    index_dtype = np.int32 if increments.size < 2**31 else np.int64
+    batch = paths_per_batch(horizon, memory_budget_bytes)
+
+    final = np.empty(n_paths)
+    max_dd = np.empty(n_paths)
+    max_dd_pct = np.empty(n_paths)
+    ruined = np.empty(n_paths, dtype=bool)
+
+    for lo in range(0, n_paths, batch):
+        hi = min(lo + batch, n_paths)
+        # equity (P&L cumulato) di ogni percorso del blocco, in place
+        equity = increments[rng.integers(0, increments.size, size=(hi - lo, horizon), dtype=index_dtype)]
+        np.cumsum(equity, axis=1, out=equity)
+        final[lo:hi] = equity[:, -1]
+        ruined[lo:hi] = equity.min(axis=1) <= -ruin_loss
+
+        peak = np.maximum.accumulate(equity, axis=1)
+        np.maximum(peak, 0.0, out=peak)  # il capitale iniziale è il primo picco
+        np.subtract(peak, equity, out=equity)  # equity -> drawdown
+        max_dd[lo:hi] = equity.max(axis=1)
+        peak += starting_capital
+        np.divide(equity, peak, out=peak)  # peak -> drawdown relativo
+        max_dd_pct[lo:hi] = peak.max(axis=1) * 100
+        del equity, peak
+
+    final += starting_capital
+    return {
+        'n_paths': n_paths,
+        'horizon': horizon,
+        'sample_size': int(increments.size),
+        'starting_capital': float(starting_capital),
+        'ruin_level': float(starting_capital - ruin_loss),
+        'final_equity': {'mean': float(final.mean()), **_percentiles(final, EQUITY_PERCENTILES)},
+        'max_drawdown': _percentiles(max_dd, DRAWDOWN_PERCENTILES),
+        'max_drawdown_pct': _percentiles(max_dd_pct, DRAWDOWN_PERCENTILES),
+        'probability_of_ruin': float(ruined.mean()),
+        'probability_of_loss': float((final < starting_capital).mean()),
+    }
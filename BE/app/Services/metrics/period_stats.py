@@ -0,0 +1,188 @@
+# app/Services/metrics/period_stats.py
+# Statistiche per periodo di calendario (settimana, mese, trimestre, anno) e
+# confronto periodo corrente / precedente, in un solo passaggio sul frame.
+#
+# Ogni trade riceve la chiave del suo periodo (troncamento datetime64 di
+# created_at, UTC); con il frame in ordine cronologico i trade dello stesso
+# periodo sono contigui, quindi tutte le statistiche sono riduzioni per
+# segmento (bincount / reduceat) calcolate per tutti i periodi insieme.
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from app.Services.metrics.trade_frame import TradeFrame, from_fixed
+
+PERIODS = ("week", "month", "quarter", "year")
+
+# Statistiche per periodo (ordine delle colonne nella tabella)
+PERIOD_STATS = (
+    'trade_count', 'winning_trades_count', 'losing_trades_count', 'breakeven_trades_count',
+    'win_rate', 'total_pl', 'gross_profit', 'gross_loss', 'avg_win', 'avg_loss',
+    'average_trade_pnl', 'profit_factor', 'expectancy', 'largest_profit', 'largest_loss',
+    'max_drawdown_abs', 'trading_days',
+)
+
+
+def period_start(days: np.ndarray, period: str) -> np.ndarray:
+    """Primo giorno (datetime64[D]) del periodo di ogni giorno; settimane da lunedì."""
+    days = days.astype('datetime64[D]')
+    if period == 'week':
+        return days - ((days.astype(np.int64) + 3) % 7).astype('timedelta64[D]')
+    if period == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    if period == 'quarter':
+        months = days.astype('datetime64[M]').astype(np.int64)
+        return (months - months % 3).astype('datetime64[M]').astype('datetime64[D]')
+    if period == 'year':
+        return days.astype('datetime64[Y]').astype('datetime64[D]')
+    raise ValueError(f"period deve essere uno tra {PERIODS}")
+
+
+def period_label(start: np.datetime64, period: str) -> str:
+    """Etichetta leggibile: 2024-03-04 (settimana), 2024-03, 2024-Q1, 2024."""
+    text = str(start.astype('datetime64[D]'))
+    if period == 'week':
+        return text
+    if period == 'month':
+        return text[:7]
+    if period == 'quarter':
+        return f"{text[:4]}-Q{(int(text[5:7]) - 1) // 3 + 1}"
+    return text[:4]
+
+
+def _previous_start(start: np.datetime64, period: str) -> np.datetime64:
+    if period == 'week':
+        return start - np.timedelta64(7, 'D')
+    step = {'month': 1, 'quarter': 3, 'year': 12}[period]
+    return (start.astype('datetime64[M]') - np.timedelta64(step, 'M')).astype('datetime64[D]')
+
+
+def _segment_stats(pnl: np.ndarray, days: np.ndarray, seg: np.ndarray, n_seg: int) -> Dict[str, np.ndarray]:
+    """
+    Statistiche di tutti i segmenti (periodi) insieme.
+    pnl: int64 in punto fisso, in ordine cronologico; seg: indice di periodo (non decrescente).
+    """
+    wins, losses = pnl > 0, pnl < 0
+    count = np.bincount(seg, minlength=n_seg)
+    win_count = np.bincount(seg, weights=wins, minlength=n_seg).astype(np.int64)
+    loss_count = np.bincount(seg, weights=losses, minlength=n_seg).astype(np.int64)
+    gross_win = np.bincount(seg, weights=np.where(wins, pnl, 0), minlength=n_seg)
+    gross_loss = -np.bincount(seg, weights=np.where(losses, pnl, 0), minlength=n_seg)
+
+    starts = np.flatnonzero(np.diff(seg, prepend=-1))
+    largest_profit = np.maximum(np.maximum.reduceat(pnl, starts), 0)
+    largest_loss = np.minimum(np.minimum.reduceat(pnl, starts), 0)
+
+    # Equity relativa all'inizio del periodo; il picco riparte da 0 in ogni
+    # periodo: spostando ogni segmento di `span` (> escursione dell'equity)
+    # un solo maximum.accumulate non "vede" i picchi dei periodi precedenti.
+    cumulative = np.cumsum(pnl)
+    equity = cumulative - (cumulative[starts] - pnl[starts])[seg]
+    span = int(max(equity.max(), 0) - min(equity.min(), 0)) + 1
+    offset = seg.astype(np.int64) * span
+    peak = np.maximum(np.maximum.accumulate(equity + offset) - offset, 0)
+    max_drawdown = np.maximum.reduceat(peak - equity, starts)
+
+    trading_days = np.bincount(seg[np.flatnonzero(np.diff(days, prepend=days[0] - 1))], minlength=n_seg)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        win_rate = np.where(count > 0, win_count / count, 0.0)
+        avg_win = np.where(win_count > 0, gross_win / win_count, 0.0)
+        avg_loss = np.where(loss_count > 0, gross_loss / loss_count, 0.0)
+        profit_factor = np.where(gross_loss > 0, gross_win / gross_loss, np.inf)
+
+    return {
+        'trade_count': count,
+        'winning_trades_count': win_count,
+        'losing_trades_count': loss_count,
+        'breakeven_trades_count': count - win_count - loss_count,
+        'win_rate': win_rate * 100,
+        'total_pl': from_fixed(gross_win - gross_loss),
+        'gross_profit': from_fixed(gross_win),
+        'gross_loss': from_fixed(gross_loss),
+        'avg_win': from_fixed(avg_win),
+        'avg_loss': from_fixed(avg_loss),
+        'average_trade_pnl': from_fixed((gross_win - gross_loss) / np.maximum(count, 1)),
+        'profit_factor': profit_factor,
+        'expectancy': from_fixed(win_rate * avg_win - (1 - win_rate) * avg_loss),
+        'largest_profit': from_fixed(largest_profit),
+        'largest_loss': from_fixed(largest_loss),
+        'max_drawdown_abs': from_fixed(max_drawdown),
+        'trading_days': trading_days,
+    }
+
+
+def _empty_row() -> dict:
+    row = dict.fromkeys(PERIOD_STATS, 0)
+    row['profit_factor'] = float('inf')
+    return row
+
+
+def _comparison(current: dict, previous: dict) -> dict:
+    """Variazione assoluta e percentuale (su |precedente|) di ogni statistica."""
+    change, change_pct = {}, {}
+    for key in PERIOD_STATS:
+        cur, prev = current[key], previous[key]
+        if np.isinf(cur) or np.isinf(prev):
+            change[key] = change_pct[key] = None
+            continue
+        change[key] = cur - prev
+        change_pct[key] = (cur - prev) / abs(prev) * 100 if prev else None
+    return {'change': change, 'change_pct': change_pct}
+
+
+def period_stats(
+    frame: TradeFrame,
+    periods: Iterable[str] = PERIODS,
+    as_of: Optional[date] = None,
+) -> dict:
+    """
+    Per ogni periodo richiesto:
+      - rows: una riga per periodo con trade (statistiche PERIOD_STATS), in ordine
+      - current / previous: periodo che contiene `as_of` (default: oggi UTC) e quello
+        precedente, con `change` / `change_pct` (zero trade -> statistiche a 0)
+    Il frame deve essere in ordine cronologico (created_at).
+    """
+    periods = list(dict.fromkeys(periods))
+    for period in periods:
+        if period not in PERIODS:
+            raise ValueError(f"period deve essere uno tra {PERIODS}")
+    as_of_day = np.datetime64(as_of or np.datetime64('today', 'D'), 'D')
+
+    has_time = ~np.isnat(frame.created_at)
+    days = frame.created_at[has_time].astype('datetime64[D]')
+    pnl = frame.pnl_fixed()[has_time]
+
+    result = {'as_of': str(as_of_day), 'periods': {}}
+    for period in periods:
+        rows = []
+        by_start = {}
+        if days.size:
+            starts, seg = np.unique(period_start(days, period), return_inverse=True)
+            stats = _segment_stats(pnl, days.astype(np.int64), seg, starts.size)
+            columns = {key: stats[key].tolist() for key in PERIOD_STATS}
+            for i, start in enumerate(starts):
+                row = {'period': period_label(start, period), 'start': str(start),
+                       **{key: columns[key][i] for key in PERIOD_STATS}}
+                rows.append(row)
+                by_start[start] = row
+
+        current_start = period_start(np.array([as_of_day]), period)[0]
+        previous_start = _previous_start(current_start, period)
+        current = by_start.get(current_start) or {
+            'period': period_label(current_start, period), 'start': str(current_start), **_empty_row()
+        }
+        previous = by_start.get(previous_start) or {
+            'period': period_label(previous_start, period), 'start': str(previous_start), **_empty_row()
+        }
+        result['periods'][period] = {
+            'rows': rows,
+            'current': current,
+            'previous': previous,
+            **_comparison(current, previous),
+        }
+    return result
@@ -0,0 +1,87 @@
+# app/Services/metrics/pnl_aggregates.py
+# Aggregati P&L per giorno / giorno della settimana / ora.
+# Possono essere calcolati in Python dal TradeFrame oppure arrivare già pronti
+# dal database (TradeRepository.get_pnl_aggregates): MetricsCalculator li
+# consuma allo stesso modo, senza bisogno dei trade grezzi.
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from app.Services.metrics.trade_frame import TradeFrame, from_fixed
+
+
+def weekday_of(ts: np.ndarray) -> np.ndarray:
+    """Giorno della settimana (0 = lunedì) da datetime64."""
+    days = ts.astype('datetime64[D]').astype(np.int64)
+    return (days + 3) % 7  # 1970-01-01 era giovedì
+
+
+def hour_of(ts: np.ndarray) -> np.ndarray:
+    """Ora del giorno (0..23) da datetime64."""
+    return ts.astype('datetime64[h]').astype(np.int64) % 24
+
+
+@dataclass
+class PnlAggregates:
+    """
+    - days: giorni (datetime64[D], UTC, crescenti) con almeno un trade (per created_at)
+    - daily_pnl / daily_volume / daily_count: allineati a `days`
+    - weekday_pnl (7, lunedì = 0) / hour_pnl (24): per entry_timestamp
+    - trade_day_index: per ogni trade del frame, l'indice del suo giorno
+      in `days` (solo se calcolati da un frame)
+    """
+
+    days: np.ndarray
+    daily_pnl: np.ndarray
+    daily_volume: np.ndarray
+    daily_count: np.ndarray
+    weekday_pnl: np.ndarray
+    hour_pnl: np.ndarray
+    trade_day_index: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_frame(cls, frame: TradeFrame) -> "PnlAggregates":
+        # somme in punto fisso: bincount accumula interi in float64, esatti fino a 2**53 unità
+        pnl = frame.pnl_fixed()
+        days, day_index = np.unique(frame.created_at.astype('datetime64[D]'), return_inverse=True)
+        has_entry = ~np.isnat(frame.entry_ts)
+        entry_ts, entry_pnl = frame.entry_ts[has_entry], pnl[has_entry]
+        return cls(
+            days=days,
+            daily_pnl=from_fixed(np.bincount(day_index, weights=pnl, minlength=days.size)),
+            daily_volume=np.bincount(
+                day_index, weights=np.nan_to_num(frame.position_size), minlength=days.size
+            ),
+            daily_count=np.bincount(day_index, minlength=days.size),
+            weekday_pnl=from_fixed(np.bincount(weekday_of(entry_ts), weights=entry_pnl, minlength=7)),
+            hour_pnl=from_fixed(np.bincount(hour_of(entry_ts), weights=entry_pnl, minlength=24)),
+            trade_day_index=day_index,
+        )
+
+    @classmethod
+    def from_rows(cls, daily_rows, weekday_rows, hour_rows) -> "PnlAggregates":
+        """
+        Da righe già aggregate (es. SQL), con i P&L in punto fisso (interi):
+          daily_rows:   [(date, pnl, volume, count)] in ordine di giorno
+          weekday_rows: [(isodow 1..7, pnl)]
+          hour_rows:    [(hour 0..23, pnl)]
+        """
+        daily_rows = list(daily_rows)
+        weekday_pnl = np.zeros(7, dtype=np.int64)
+        for isodow, pnl in weekday_rows:
+            weekday_pnl[int(isodow) - 1] += int(pnl or 0)
+        hour_pnl = np.zeros(24, dtype=np.int64)
+        for hour, pnl in hour_rows:
+            hour_pnl[int(hour)] += int(pnl or 0)
+        return cls(
+            days=np.array([r[0] for r in daily_rows], dtype='datetime64[D]'),
+            daily_pnl=from_fixed(np.array([int(r[1] or 0) for r in daily_rows], dtype=np.int64)),
+            daily_volume=np.array([float(r[2] or 0) for r in daily_rows], dtype=np.float64),
+            daily_count=np.array([int(r[3] or 0) for r in daily_rows], dtype=np.int64),
+            weekday_pnl=from_fixed(weekday_pnl),
+            hour_pnl=from_fixed(hour_pnl),
+        )
@@ -0,0 +1,115 @@
+# app/Services/metrics/profiling.py
+# Strumentazione opzionale della pipeline metriche: tempo e allocazioni per fase.
+#
+# MetricsCalculator (e i controller) aprono le fasi con `profiler.stage(nome)`;
+# senza profiler le fasi sono no-op (nessun costo). Le fasi possono essere
+# annidate (es. streaks dentro advanced_stats): il tempo del genitore include
+# quello dei figli e `depth` indica il livello.
+#
+# Attivazione (vedi TradesController):
+# - setting METRICS_PROFILING: profiling "leggero" di ogni richiesta, solo le
+#   fasi del controller (db, compute); cache e pool di processi restano attivi.
+# - header `X-Metrics-Profile: 1`, solo se METRICS_PROFILING_ALLOW_HEADER:
+#   profiling "dettagliato", calcolo senza cache nel processo corrente con le
+#   fasi interne del MetricsCalculator (in un thread per input grandi).
+# Il report torna nella risposta sotto `_profile` e viene passato a tutti i
+# sink registrati (es. esportatori verso sistemi di monitoraggio).
+
+from __future__ import annotations
+
+import logging
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Valori dell'header X-Metrics-Profile che attivano il profiling
+_TRUTHY = {"1", "true", "yes", "on"}
+
+# Sink: riceve il report di ogni pipeline profilata
+MetricsSink = Callable[[dict], None]
+
+_sinks: List[MetricsSink] = []
+
+
+def register_sink(sink: MetricsSink) -> None:
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+
+def unregister_sink(sink: MetricsSink) -> None:
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+class StageProfiler:
+    """
+    Raccoglie, per ogni fase: wall time (ms) e blocchi di memoria allocati
+    al netto (sys.getallocatedblocks: oggetti creati e non ancora liberati).
+    """
+
+    def __init__(self, pipeline: str, detailed: bool = False) -> None:
+        self.pipeline = pipeline
+        self.detailed = detailed  # richiesto via header: senza cache, fasi interne
+        self.stages: List[Dict] = []
+        self._depth = 0
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        record = {"stage": name, "depth": self._depth}
+        self.stages.append(record)  # ordine di apertura
+        self._depth += 1
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record["wall_ms"] = (time.perf_counter() - start) * 1000
+            record["allocated_blocks"] = sys.getallocatedblocks() - blocks
+            self._depth -= 1
+
+    def report(self) -> dict:
+        return {
+            "pipeline": self.pipeline,
+            "detailed": self.detailed,
+            "total_ms": (time.perf_counter() - self._started) * 1000,
+            "stages": [dict(s) for s in self.stages],
+        }
+
+    def emit(self) -> dict:
+        """Report finale, passato anche ai sink registrati (gli errori dei sink non si propagano)."""
+        report = self.report()
+        for sink in list(_sinks):
+            try:
+                sink(report)
+            except Exception:
+                logger.exception("metrics sink %r fallito", sink)
+        return report
+
+
+def stage(profiler: Optional[StageProfiler], name: str) -> ContextManager:
+    """Fase del profiler, o no-op se il profiling non è attivo."""
+    return profiler.stage(name) if profiler is not None else nullcontext()
+
+
+def start_profiler(
+    pipeline: str,
+    requested: Optional[str] = None,
+    enabled: bool = False,
+    allow_header: bool = False,
+) -> Optional[StageProfiler]:
+    """
+    Profiler per una richiesta, altrimenti None:
+    - dettagliato se l'header `requested` è vero e `allow_header` lo consente
+      (setting METRICS_PROFILING_ALLOW_HEADER);
+    - leggero se `enabled` (setting METRICS_PROFILING).
+    Senza `allow_header` l'header viene ignorato.
+    """
+    if allow_header and (requested or "").strip().lower() in _TRUTHY:
+        return StageProfiler(pipeline, detailed=True)
+    if enabled:
+        return StageProfiler(pipeline)
+    return None
@@ -0,0 +1,269 @@
+# app/Services/metrics/quantile_sketch.py
+# Sketch dei quantili fondibile (t-digest) per distribuzioni di P&L, R-multiple,
+# durate e P&L giornalieri.
+#
+# Il digest è un insieme di centroidi (media, peso) ordinati: vicino alle code
+# i centroidi restano piccoli (anche singoli valori), al centro si fondono.
+# Ogni centroide pesa al più 4·n·q(1−q)/δ (δ = `compression`), quindi le code
+# (p0.1, p99.9) restano accurate; la dimensione cresce come O(δ·log n), e due
+# digest si fondono concatenando i centroidi e ricomprimendo: si possono
+# quindi sommare mesi diversi o utenti diversi senza rileggere i dati grezzi.
+#
+# Compressione vettoriale: centroidi ordinati, quantili dei loro bordi, scala
+# k2 (logit) -> unità = floor(k); i centroidi contenuti nella stessa unità sono
+# contigui e si fondono con due bincount.
+# Senza compressione (pochi valori) i quantili coincidono con np.percentile e
+# l'istogramma ha conteggi interi esatti.
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+import numpy as np
+
+DEFAULT_COMPRESSION = 100
+
+# valori in buffer prima di una compressione (multiplo di compression)
+_BUFFER_FACTOR = 5
+
+
+class QuantileSketch:
+    """t-digest: centroidi (means, weights) in ordine di media + minimo/massimo esatti."""
+
+    __slots__ = ("compression", "means", "weights", "minimum", "maximum", "_buffer")
+
+    def __init__(
+        self,
+        compression: int = DEFAULT_COMPRESSION,
+        means: Optional[np.ndarray] = None,
+        weights: Optional[np.ndarray] = None,
+        minimum: float = np.inf,
+        maximum: float = -np.inf,
+    ) -> None:
+        self.compression = int(compression)
+        self.means = np.zeros(0) if means is None else np.asarray(means, dtype=np.float64)
+        self.weights = np.zeros(0) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+        self._buffer: list = []
+
+    # ──────────────────────────────────────────────────────────────────────
+    # COSTRUZIONE / FUSIONE
+    # ──────────────────────────────────────────────────────────────────────
+    @classmethod
+    def from_values(cls, values, compression: int = DEFAULT_COMPRESSION) -> "QuantileSketch":
+        sketch = cls(compression)
+        sketch.add(values)
+        return sketch
+
+    @classmethod
+    def merge_all(cls, sketches: Iterable["QuantileSketch"], compression: Optional[int] = None) -> "QuantileSketch":
+        """Fusione di più digest (es. mesi di un periodo o utenti diversi)."""
+        sketches = list(sketches)
+        if compression is None:
+            compression = max((s.compression for s in sketches), default=DEFAULT_COMPRESSION)
+        merged = cls(compression)
+        for sketch in sketches:
+            merged.merge(sketch)
+        return merged
+
+    def add(self, values) -> None:
+        """Aggiunge uno o più valori (NaN ignorati)."""
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return
+        self._buffer.append(values)
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        if sum(b.size for b in self._buffer) >= _BUFFER_FACTOR * self.compression:
+            self._compress()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Fonde `other` in questo digest (in place) e lo ritorna."""
+        other._compress()
+        if other.weights.size:
+            self._compress(other.means, other.weights)
+            self.minimum = min(self.minimum, other.minimum)
+            self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    def _compress(self, extra_means: Optional[np.ndarray] = None, extra_weights: Optional[np.ndarray] = None) -> None:
+        parts_m, parts_w = [self.means], [self.weights]
+        if self._buffer:
+            values = np.concatenate(self._buffer)
+            parts_m.append(values)
+            parts_w.append(np.ones(values.size))
+            self._buffer = []
+        if extra_means is not None:
+            parts_m.append(extra_means)
+            parts_w.append(extra_weights)
+        if len(parts_m) == 1:
+            return
+        means, weights = np.concatenate(parts_m), np.concatenate(parts_w)
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+
+        # Scala k2 (logit): un'unità di k copre un intervallo di quantili largo
+        # ~4·q(1−q)/δ, cioè il limite 4·n·q(1−q)/δ sul peso di un centroide.
+        # Si fondono solo centroidi contenuti per intero nella stessa unità; chi
+        # ne attraversa il bordo resta da solo (il suo peso rispettava già il limite).
+        total = weights.sum()
+        upper = np.cumsum(weights)
+        edges = np.clip(np.concatenate(([0.0], upper)) / total, 0.5 / total, 1 - 0.5 / total)
+        unit = np.floor(self.compression / 4 * np.log(edges / (1 - edges))).astype(np.int64)
+        unit_left, unit_right = unit[:-1], unit[1:]
+        alone = unit_left != unit_right
+        starts = np.ones(means.size, dtype=bool)
+        starts[1:] = alone[1:] | alone[:-1] | (unit_right[1:] != unit_right[:-1])
+        cluster = np.cumsum(starts) - 1
+
+        merged_w = np.bincount(cluster, weights=weights)
+        self.means = np.bincount(cluster, weights=means * weights) / merged_w
+        self.weights = merged_w
+
+    # ──────────────────────────────────────────────────────────────────────
+    # LETTURA
+    # ──────────────────────────────────────────────────────────────────────
+    @property
+    def count(self) -> int:
+        self._compress()
+        return int(round(self.weights.sum()))
+
+    def mean(self) -> float:
+        self._compress()
+        total = self.weights.sum()
+        return float((self.means * self.weights).sum() / total) if total else 0.0
+
+    def _positions(self):
+        """(posizioni 0..n-1 dei centri dei centroidi, medie), con minimo e massimo agli estremi."""
+        self._compress()
+        n = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights + (self.weights - 1) / 2
+        positions = np.concatenate(([0.0], centers, [n - 1]))
+        values = np.concatenate(([self.minimum], self.means, [self.maximum]))
+        return positions, values, n
+
+    def quantile(self, q):
+        """Quantile/i (q in [0, 1]), interpolazione lineare come np.percentile. NaN se vuoto."""
+        positions, values, n = self._positions()
+        if n == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else float("nan")
+        result = np.interp(np.asarray(q, dtype=np.float64) * (n - 1), positions, values)
+        return result if np.ndim(q) else float(result)
+
+    def rank(self, x):
+        """Numero (stimato) di valori < x."""
+        positions, values, n = self._positions()
+        x = np.asarray(x, dtype=np.float64)
+        if n == 0:
+            return np.zeros(np.shape(x))
+        inside = np.clip(np.interp(x, values, positions) + 0.5, 0, n)
+        return np.where(x <= self.minimum, 0.0, np.where(x > self.maximum, n, inside))
+
+    def cdf(self, x):
+        """Frazione (stimata) di valori <= x."""
+        n = self.count
+        if n == 0:
+            return np.zeros(np.shape(x)) if np.ndim(x) else 0.0
+        result = np.where(np.asarray(x) >= self.maximum, 1.0, self.rank(x) / n)
+        return result if np.ndim(x) else float(result)
+
+    def histogram(self, edges) -> np.ndarray:
+        """
+        Conteggi per bin [edges[i], edges[i+1]), ultimo bin chiuso come np.histogram:
+        interi esatti finché ogni centroide è un singolo valore, altrimenti stimati.
+        """
+        edges = np.asarray(edges, dtype=np.float64)
+        self._compress()
+        if self.weights.size and np.all(self.weights == 1):
+            return np.histogram(self.means, bins=edges)[0]
+        below = self.rank(edges)
+        below[edges >= self.maximum] = self.count if self.count else 0
+        return np.diff(below)
+
+    def tail_mean(self, q: float) -> float:
+        """Media della frazione `q` di valori più bassi (es. CVaR con q = 0.05)."""
+        self._compress()
+        n = self.weights.sum()
+        if n == 0 or q <= 0:
+            return float("nan") if n == 0 else self.minimum
+        target = q * n
+        cumulative = np.cumsum(self.weights)
+        full = cumulative <= target
+        covered = cumulative[full][-1] if full.any() else 0.0
+        total = (self.means[full] * self.weights[full]).sum()
+        if covered < target and not full.all():
+            total += (target - covered) * self.means[np.argmin(full)]
+        return float(total / target)
+
+    # ──────────────────────────────────────────────────────────────────────
+    # SERIALIZZAZIONE (JSON)
+    # ──────────────────────────────────────────────────────────────────────
+    def to_dict(self) -> dict:
+        self._compress()
+        empty = not self.weights.size
+        return {
+            "compression": self.compression,
+            "min": None if empty else self.minimum,
+            "max": None if empty else self.maximum,
+            "means": self.means.tolist(),
+            "weights": self.weights.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "QuantileSketch":
+        if not data:
+            return cls()
+        return cls(
+            data.get("compression", DEFAULT_COMPRESSION),
+            np.array(data.get("means", []), dtype=np.float64),
+            np.array(data.get("weights", []), dtype=np.float64),
+            np.inf if data.get("min") is None else data["min"],
+            -np.inf if data.get("max") is None else data["max"],
+        )
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# RIEPILOGO (risposta API)
+# ──────────────────────────────────────────────────────────────────────────
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+DEFAULT_BINS = 20
+
+
+def describe(
+    sketch: QuantileSketch,
+    quantiles: Iterable[float] = DEFAULT_QUANTILES,
+    edges: Optional[Iterable[float]] = None,
+    bins: int = DEFAULT_BINS,
+    tail_risk: bool = False,
+) -> dict:
+    """
+    Conteggio, min/max/media, mediana, quantili richiesti e istogramma (bordi
+    `edges` arbitrari o `bins` bin uguali tra min e max). Con `tail_risk`
+    aggiunge VaR/CVaR al 95% (in valore assoluto, come in MetricsCalculator).
+    """
+    count = sketch.count
+    quantiles = [float(q) for q in quantiles]
+    result = {
+        "count": count,
+        "min": sketch.minimum if count else None,
+        "max": sketch.maximum if count else None,
+        "mean": sketch.mean() if count else None,
+        "median": sketch.quantile(0.5) if count else None,
+        "quantiles": {
+            f"p{q * 100:g}": value
+            for q, value in zip(quantiles, sketch.quantile(np.array(quantiles)).tolist())
+        } if count else {},
+    }
+    if edges is None:
+        edges = np.linspace(sketch.minimum, sketch.maximum, bins + 1) if count else np.zeros(0)
+    edges = np.asarray(list(edges), dtype=np.float64)
+    result["histogram"] = {
+        "edges": edges.tolist(),
+        "counts": sketch.histogram(edges).tolist() if edges.size > 1 else [],
+    }
+    if tail_risk:
+        result["var_95"] = abs(sketch.quantile(0.05)) if count else 0.0
+        result["cvar_95"] = abs(sketch.tail_mean(0.05)) if count else 0.0
+    return result
@@ -0,0 +1,42 @@
+# app/Services/metrics/rebuild_rollups.py
+# Ricostruzione (backfill) della tabella trade_daily_rollups dai trade esistenti.
+#
+#   python -m app.Services.metrics.rebuild_rollups                # tutti gli utenti
+#   python -m app.Services.metrics.rebuild_rollups --user-id <uuid>
+#
+# Da eseguire dopo la migrazione db/sql/002_trade_daily_rollups.sql o se i
+# rollup risultano disallineati (es. scritture sui trade fuori dal repository).
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from typing import Optional
+from uuid import UUID
+
+from app.Infrastructure.db import SessionLocal, dispose_engine
+from app.Repositories.trade_repository import TradeRepository
+
+
+async def rebuild_rollups(user_id: Optional[UUID] = None) -> int:
+    async with SessionLocal() as session:
+        return await TradeRepository(session).rollups.rebuild(user_id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ricostruisce trade_daily_rollups dai trade.")
+    parser.add_argument("--user-id", type=UUID, default=None, help="Solo per questo utente")
+    args = parser.parse_args()
+
+    async def run() -> int:
+        try:
+            return await rebuild_rollups(args.user_id)
+        finally:
+            await dispose_engine()
+
+    written = asyncio.run(run())
+    print(f"trade_daily_rollups: {written} righe (utente, giorno) ricostruite")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# app/Services/metrics/rebuild_sketches.py
+# Ricostruzione (backfill) della tabella trade_metric_sketches dai trade esistenti.
+#
+#   python -m app.Services.metrics.rebuild_sketches                # tutti gli utenti
+#   python -m app.Services.metrics.rebuild_sketches --user-id <uuid>
+#
+# Da eseguire dopo la migrazione db/sql/003_trade_metric_sketches.sql: i digest
+# di tutti i mesi vengono calcolati qui, utente per utente (una transazione breve
+# ciascuno), invece che dalla prima richiesta di distribuzione.
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import select
+
+from app.Infrastructure.db import SessionLocal, dispose_engine
+from app.Models.trade import Trade
+from app.Repositories.trade_repository import TradeRepository
+
+
+async def rebuild_sketches(user_id: Optional[UUID] = None) -> int:
+    async with SessionLocal() as session:
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = (await session.execute(select(Trade.user_id).distinct())).scalars().all()
+        written = 0
+        for uid in user_ids:
+            written += await TradeRepository(session).sketches.backfill(uid)
+            await session.rollback()  # chiude la transazione di sola lettura
+        return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ricostruisce trade_metric_sketches dai trade.")
+    parser.add_argument("--user-id", type=UUID, default=None, help="Solo per questo utente")
+    args = parser.parse_args()
+
+    async def run() -> int:
+        try:
+            return await rebuild_sketches(args.user_id)
+        finally:
+            await dispose_engine()
+
+    written = asyncio.run(run())
+    print(f"trade_metric_sketches: {written} righe (utente, mese, metrica) ricostruite")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# app/Services/metrics/rolling_metrics.py
+# Metriche su finestre mobili (Sharpe, win rate, profit factor, expectancy).
+#
+# Le colonne vengono disposte su una griglia densa di "bucket": un bucket per
+# trade (finestre di N trade) oppure un bucket per giorno di calendario
+# (finestre di N giorni; i giorni senza trade sono bucket vuoti). Su una griglia
+# densa ogni finestra ha lunghezza fissa e le somme per finestra si ottengono in
+# O(n) con somme prefisso/suffisso per blocchi di `window` elementi: a
+# differenza della differenza di cumsum globali, l'errore di arrotondamento
+# dipende solo dalla finestra e non dalla lunghezza dello storico.
+
+from __future__ import annotations
+
+from typing import Dict
+
+import numpy as np
+
+from app.Services.metrics.pnl_aggregates import PnlAggregates
+from app.Services.metrics.trade_frame import TradeFrame
+
+UNITS = ("trades", "days")
+
+_STATS = ('sharpe', 'win_rate', 'profit_factor', 'expectancy', 'trade_count')
+
+
+def sliding_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Somme di tutte le finestre complete values[i:i + window] (i = 0..n - window).
+    Blocchi di `window` elementi: somma = suffisso del blocco di inizio +
+    prefisso del blocco di fine (o il blocco intero se la finestra è allineata).
+    """
+    n = values.size
+    if n < window:
+        return np.zeros(0)
+    blocks = np.zeros(-(-n // window) * window)
+    blocks[:n] = values
+    blocks = blocks.reshape(-1, window)
+    prefix = np.cumsum(blocks, axis=1).ravel()
+    suffix = np.cumsum(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    starts = np.arange(n - window + 1)
+    ends = starts + window - 1
+    return np.where(starts % window == 0, suffix[starts], suffix[starts] + prefix[ends])
+
+
+def rolling_window_stats(buckets: Dict[str, np.ndarray], window: int, annualization: float) -> dict:
+    """
+    Statistiche per ogni finestra completa di `window` bucket consecutivi.
+    Colonne per bucket: pnl, present (1 se il bucket contiene trade), trades,
+    wins, losses, gross_win, gross_loss (positivo).
+    Lo Sharpe usa il P&L dei soli bucket presenti (std di popolazione, come
+    MetricsCalculator); profit factor = inf senza perdite, come nelle statistiche base.
+    """
+    sums = {name: sliding_sums(values, window) for name, values in buckets.items()}
+    sums['pnl_sq'] = sliding_sums(buckets['pnl'] ** 2, window)
+    present = sums['present']
+    trades, wins, losses = sums['trades'], sums['wins'], sums['losses']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(present > 0, sums['pnl'] / present, 0.0)
+        variance = np.where(present > 0, sums['pnl_sq'] / present, 0.0) - mean ** 2
+        std = np.sqrt(np.maximum(variance, 0.0))
+        # finestre a P&L costante: la varianza è solo rumore di arrotondamento
+        std[std <= 1e-9 * np.maximum(np.abs(mean), 1.0)] = 0.0
+        sharpe = np.where(std > 0, mean / std * annualization, 0.0)
+
+        win_rate = np.where(trades > 0, wins / trades, 0.0)
+        avg_win = np.where(wins > 0, sums['gross_win'] / wins, 0.0)
+        avg_loss = np.where(losses > 0, sums['gross_loss'] / losses, 0.0)
+        profit_factor = np.where(sums['gross_loss'] > 0, sums['gross_win'] / sums['gross_loss'], np.inf)
+
+    return {
+        'sharpe': sharpe,
+        'win_rate': win_rate * 100,
+        'profit_factor': profit_factor,
+        'expectancy': win_rate * avg_win - (1 - win_rate) * avg_loss,
+        'trade_count': np.rint(trades).astype(np.int64),
+    }
+
+
+def _trade_buckets(pnl: np.ndarray) -> Dict[str, np.ndarray]:
+    ones = np.ones(pnl.size)
+    return {
+        'pnl': pnl,
+        'present': ones,
+        'trades': ones,
+        'wins': (pnl > 0).astype(np.float64),
+        'losses': (pnl < 0).astype(np.float64),
+        'gross_win': np.where(pnl > 0, pnl, 0.0),
+        'gross_loss': np.where(pnl < 0, -pnl, 0.0),
+    }
+
+
+def rolling_metrics(frame: TradeFrame, window: int, unit: str = 'trades') -> dict:
+    """
+    Serie temporali delle metriche su finestre mobili di `window` trade o giorni.
+    Il frame deve essere in ordine cronologico (created_at).
+    Vengono emesse solo finestre complete:
+      - trades: una per trade, dal `window`-esimo in poi (etichetta = created_at)
+      - days: una per giorno di trading che chiude una finestra di `window`
+        giorni di calendario (etichetta = giorno)
+    """
+    if unit not in UNITS:
+        raise ValueError(f"unit deve essere uno tra {UNITS}")
+    if window < 1:
+        raise ValueError("window deve essere >= 1")
+
+    pnl = frame.pnl_filled()
+    if unit == 'trades':
+        buckets = _trade_buckets(pnl)
+        ends = np.arange(window - 1, pnl.size)
+        labels = [s + 'Z' for s in np.datetime_as_string(frame.created_at[ends], unit='s').tolist()]
+        keep = slice(None)
+        annualization = 1.0
+    else:
+        aggregates = PnlAggregates.from_frame(frame)
+        days = aggregates.days.astype(np.int64)
+        if not days.size:
+            return {'window': window, 'unit': unit, 'labels': [], **{k: [] for k in _STATS}}
+        # griglia densa di giorni di calendario dal primo all'ultimo giorno di trading
+        grid = days - days[0]
+        per_day = {
+            name: np.bincount(aggregates.trade_day_index, weights=values, minlength=days.size)
+            for name, values in _trade_buckets(pnl).items()
+        }
+        per_day['present'] = np.ones(days.size)
+        buckets = {}
+        for name, values in per_day.items():
+            dense = np.zeros(int(grid[-1]) + 1)
+            dense[grid] = values
+            buckets[name] = dense
+        # finestre che terminano in un giorno di trading
+        complete = grid >= window - 1
+        labels = np.datetime_as_string(aggregates.days[complete], unit='D').tolist()
+        keep = grid[complete] - (window - 1)
+        annualization = float(np.sqrt(252))
+
+    stats = rolling_window_stats(buckets, window, annualization)
+    return {
+        'window': window,
+        'unit': unit,
+        'labels': labels,
+        **{key: stats[key][keep].tolist() for key in _STATS},
+    }
@@ -0,0 +1,668 @@
+# app/Services/metrics/stat_graph.py
+# Grafo delle dipendenze delle statistiche di MetricsCalculator.
+#
+# Ogni statistica (e ogni grandezza intermedia condivisa: P&L in punto fisso,
+# profilo di drawdown, aggregati giornalieri, streak...) è un nodo dichiarato
+# con le sue dipendenze esplicite: il nome del nodo è il nome della funzione,
+# i parametri arrivano dai nodi elencati nel decoratore. Una StatEvaluation
+# calcola un nodo solo quando viene richiesto e lo memoizza: chiedere
+# `profit_factor, win_rate, max_drawdown_abs` calcola solo il sottografo
+# minimo (niente efficienze, scipy skew/kurtosis, streak, grafici...).
+#
+# Gli input (nodi sorgente) vengono passati alla StatEvaluation:
+#   - `frame` per le metriche sui trade
+#   - `aggregates` + `total_pl` per le sole metriche giornaliere (aggregati SQL)
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+from scipy.stats import kurtosis as _kurtosis, skew as _skew
+
+from app.Services.metrics.drawdown import DrawdownProfile
+from app.Services.metrics.pnl_aggregates import PnlAggregates
+from app.Services.metrics.streaks import LOSS, WIN, StreakRuns
+from app.Services.metrics.trade_frame import DIR_LONG, DIR_SHORT, from_fixed
+
+DAY_NAMES = ["Lunedì", "Martedì", "Mercoledì", "Giovedì", "Venerdì", "Sabato", "Domenica"]
+
+# Sotto questa soglia di giorni di trading le metriche di rischio restano a 0
+_MIN_RISK_DAYS = 3
+
+
+class Node(NamedTuple):
+    name: str
+    deps: Tuple[str, ...]
+    fn: Callable
+
+
+class StatGraph:
+    """Registro dei nodi: nome -> (dipendenze, funzione)."""
+
+    def __init__(self) -> None:
+        self.nodes: Dict[str, Node] = {}
+
+    def node(self, *deps: str) -> Callable[[Callable], Callable]:
+        """Decoratore: registra la funzione come nodo con dipendenze `deps`."""
+        def register(fn: Callable) -> Callable:
+            if fn.__name__ in self.nodes:
+                raise ValueError(f"nodo duplicato: {fn.__name__}")
+            self.nodes[fn.__name__] = Node(fn.__name__, deps, fn)
+            return fn
+        return register
+
+    def subgraph(self, names: Iterable[str], inputs: Iterable[str] = ()) -> List[str]:
+        """
+        Nodi da calcolare per ottenere `names` (dipendenze prima), esclusi
+        gli input già disponibili. ValueError per nomi sconosciuti.
+        """
+        order: List[str] = []
+        seen = set(inputs)
+
+        def visit(name: str) -> None:
+            if name in seen:
+                return
+            node = self.nodes.get(name)
+            if node is None:
+                raise ValueError(f"nodo sconosciuto: {name}")
+            seen.add(name)
+            for dep in node.deps:
+                visit(dep)
+            order.append(name)
+
+        for name in names:
+            visit(name)
+        return order
+
+
+class StatEvaluation:
+    """Valori memoizzati dei nodi di un grafo per un insieme di input."""
+
+    def __init__(self, graph: StatGraph, **inputs) -> None:
+        self.graph = graph
+        self.values: Dict[str, object] = dict(inputs)
+
+    def get(self, name: str):
+        if name not in self.values:
+            for node_name in self.graph.subgraph([name], self.values):
+                node = self.graph.nodes[node_name]
+                self.values[node_name] = node.fn(*(self.values[dep] for dep in node.deps))
+        return self.values[name]
+
+    def evaluate(self, names: Iterable[str]) -> dict:
+        """{nome: valore} nell'ordine richiesto."""
+        return {name: self.get(name) for name in names}
+
+
+STAT_GRAPH = StatGraph()
+node = STAT_GRAPH.node
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# P&L PER TRADE
+# ──────────────────────────────────────────────────────────────────────────
+@node('frame')
+def pnl(frame):
+    return frame.pnl_filled()
+
+
+@node('frame')
+def pnl_fixed(frame):
+    # segni e totali sul P&L in punto fisso (esatti)
+    return frame.pnl_fixed()
+
+
+@node('pnl_fixed')
+def wins(pnl_fixed):
+    return pnl_fixed > 0
+
+
+@node('pnl_fixed')
+def losses(pnl_fixed):
+    return pnl_fixed < 0
+
+
+@node('pnl', 'wins')
+def winning_pnl(pnl, wins):
+    return pnl[wins]
+
+
+@node('pnl', 'losses')
+def losing_pnl(pnl, losses):
+    return pnl[losses]
+
+
+@node('pnl')
+def pnl_data(pnl):
+    return pnl
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# STATISTICHE DI BASE
+# ──────────────────────────────────────────────────────────────────────────
+@node('frame')
+def trade_count(frame):
+    return len(frame)
+
+
+@node('wins')
+def winning_trades_count(wins):
+    return int(np.count_nonzero(wins))
+
+
+@node('losses')
+def losing_trades_count(losses):
+    return int(np.count_nonzero(losses))
+
+
+@node('trade_count', 'winning_trades_count', 'losing_trades_count')
+def breakeven_trades_count(trade_count, winning_trades_count, losing_trades_count):
+    return trade_count - winning_trades_count - losing_trades_count
+
+
+@node('pnl_fixed', 'wins')
+def total_win(pnl_fixed, wins):
+    return from_fixed(int(pnl_fixed[wins].sum()))
+
+
+@node('pnl_fixed', 'losses')
+def total_loss(pnl_fixed, losses):
+    return from_fixed(-int(pnl_fixed[losses].sum()))
+
+
+@node('pnl_fixed')
+def total_pl(pnl_fixed):
+    return from_fixed(int(pnl_fixed.sum()))
+
+
+@node('total_win', 'winning_trades_count')
+def avg_win(total_win, winning_trades_count):
+    return total_win / winning_trades_count if winning_trades_count > 0 else 0.0
+
+
+@node('total_loss', 'losing_trades_count')
+def avg_loss(total_loss, losing_trades_count):
+    return total_loss / losing_trades_count if losing_trades_count > 0 else 0.0
+
+
+@node('total_win', 'total_loss')
+def profit_factor(total_win, total_loss):
+    return total_win / total_loss if total_loss > 0 else float('inf')
+
+
+@node('winning_trades_count', 'trade_count')
+def win_fraction(winning_trades_count, trade_count):
+    return winning_trades_count / trade_count if trade_count > 0 else 0.0
+
+
+@node('win_fraction', 'avg_win', 'avg_loss')
+def expectancy(win_fraction, avg_win, avg_loss):
+    return (win_fraction * avg_win) - ((1 - win_fraction) * avg_loss)
+
+
+@node('win_fraction')
+def win_rate(win_fraction):
+    return win_fraction * 100
+
+
+@node('total_pl', 'trade_count')
+def average_trade_pnl(total_pl, trade_count):
+    return total_pl / trade_count if trade_count > 0 else 0.0
+
+
+@node('avg_win', 'avg_loss')
+def average_win_loss_ratio(avg_win, avg_loss):
+    return avg_win / avg_loss if avg_loss > 0 else float('inf')
+
+
+@node('winning_pnl')
+def largest_profit(winning_pnl):
+    return float(winning_pnl.max()) if winning_pnl.size else 0.0
+
+
+@node('losing_pnl')
+def largest_loss(losing_pnl):
+    return float(losing_pnl.min()) if losing_pnl.size else 0.0
+
+
+def _side_analysis(frame, wins, losses, code):
+    side = frame.direction == code
+    w, l = int(np.count_nonzero(side & wins)), int(np.count_nonzero(side & losses))
+    total = int(np.count_nonzero(side))
+    return {'wins': w, 'losses': l, 'breakeven': total - w - l, 'total': total}
+
+
+@node('frame', 'wins', 'losses')
+def long_trades_analysis(frame, wins, losses):
+    return _side_analysis(frame, wins, losses, DIR_LONG)
+
+
+@node('frame', 'wins', 'losses')
+def short_trades_analysis(frame, wins, losses):
+    return _side_analysis(frame, wins, losses, DIR_SHORT)
+
+
+@node('long_trades_analysis')
+def longs_win_percentage(long_trades_analysis):
+    side = long_trades_analysis
+    return side['wins'] / side['total'] * 100 if side['total'] else 0.0
+
+
+@node('short_trades_analysis')
+def shorts_win_percentage(short_trades_analysis):
+    side = short_trades_analysis
+    return side['wins'] / side['total'] * 100 if side['total'] else 0.0
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# EFFICIENZE (MAE/MFE) E R-MULTIPLE
+# ──────────────────────────────────────────────────────────────────────────
+@node('frame')
+def mae_mfe(frame):
+    return frame.mae_mfe_points()
+
+
+@node('frame', 'pnl', 'mae_mfe')
+def avg_sell_efficiency(frame, pnl, mae_mfe):
+    mfe = mae_mfe[1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sell_mask = (pnl > 0) & (mfe > 0) & ~np.isnan(frame.entry_price) & ~np.isnan(frame.exit_price)
+        efficiencies = np.abs(frame.exit_price - frame.entry_price)[sell_mask] / mfe[sell_mask]
+    return efficiencies.mean() * 100 if efficiencies.size else 0.0
+
+
+@node('mae_mfe')
+def avg_total_efficiency(mae_mfe):
+    mae, mfe = mae_mfe
+    with np.errstate(invalid='ignore', divide='ignore'):
+        excursion = mfe + mae
+        efficiencies = (mfe / excursion)[excursion > 0]
+    return efficiencies.mean() * 100 if efficiencies.size else 0.0
+
+
+@node('frame')
+def planned_rrs(frame):
+    risk = frame.risk_points()
+    has_risk = risk > 0
+    return frame.reward_points()[has_risk] / risk[has_risk]
+
+
+@node('frame', 'pnl')
+def realized_rrs(frame, pnl):
+    """R-multiple realizzati (P&L / rischio iniziale in valuta), in ordine cronologico."""
+    risk = frame.risk_points()
+    initial_dollar_risk = risk * frame.value_per_point()
+    realized_mask = (risk > 0) & (initial_dollar_risk > 0)
+    return pnl[realized_mask] / initial_dollar_risk[realized_mask]
+
+
+@node('planned_rrs')
+def avg_planned_rr(planned_rrs):
+    return planned_rrs.mean() if planned_rrs.size else 0.0
+
+
+@node('realized_rrs')
+def avg_realized_rr(realized_rrs):
+    return realized_rrs.mean() if realized_rrs.size else 0.0
+
+
+@node('realized_rrs')
+def realized_rrs_list(realized_rrs):
+    return realized_rrs.tolist()
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# EQUITY CURVE E DRAWDOWN (il frame è già in ordine cronologico)
+# ──────────────────────────────────────────────────────────────────────────
+@node('pnl_fixed')
+def drawdown_profile(pnl_fixed):
+    return DrawdownProfile.from_fixed(pnl_fixed)
+
+
+@node('frame')
+def aggregates(frame):
+    return PnlAggregates.from_frame(frame)
+
+
+@node('aggregates')
+def day_labels(aggregates):
+    return np.datetime_as_string(aggregates.days, unit='D').tolist()
+
+
+@node('aggregates', 'drawdown_profile', 'day_labels')
+def equity_curve_data(aggregates, drawdown_profile, day_labels):
+    equity_labels = [f"{d[8:10]}/{d[5:7]}/{d[0:4]}" for d in day_labels]
+    return [
+        {'date': equity_labels[i], 'pl': pl, 'drawdown': dd}
+        for i, pl, dd in zip(
+            aggregates.trade_day_index.tolist(),
+            drawdown_profile.equity[1:].tolist(),
+            drawdown_profile.drawdown[1:].tolist(),
+        )
+    ]
+
+
+@node('drawdown_profile')
+def max_drawdown_abs(drawdown_profile):
+    return drawdown_profile.max_drawdown
+
+
+@node('drawdown_profile', 'max_drawdown_abs')
+def max_drawdown_pct(drawdown_profile, max_drawdown_abs):
+    final_peak = drawdown_profile.peak[-1]
+    return max_drawdown_abs / final_peak * 100 if final_peak > 0 else 0.0
+
+
+@node('total_pl', 'max_drawdown_abs')
+def recovery_factor(total_pl, max_drawdown_abs):
+    return total_pl / max_drawdown_abs if max_drawdown_abs > 0 else float('inf')
+
+
+@node('drawdown_profile')
+def average_drawdown(drawdown_profile):
+    return drawdown_profile.average_drawdown
+
+
+@node('frame', 'drawdown_profile')
+def drawdown_durations(frame, drawdown_profile):
+    # Durata degli episodi sotto il picco, in giorni
+    return drawdown_profile.durations_days(frame.created_at)
+
+
+@node('drawdown_durations')
+def max_drawdown_duration(drawdown_durations):
+    return float(drawdown_durations.max()) if drawdown_durations.size else 0.0
+
+
+@node('drawdown_durations')
+def average_drawdown_duration(drawdown_durations):
+    return float(drawdown_durations.mean()) if drawdown_durations.size else 0.0
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# DURATE
+# ──────────────────────────────────────────────────────────────────────────
+@node('frame')
+def hold_times(frame):
+    hold = frame.hold_minutes()
+    return hold[~np.isnan(hold)]
+
+
+@node('hold_times')
+def average_hold_time(hold_times):
+    return float(hold_times.mean()) if hold_times.size else 0
+
+
+@node('hold_times')
+def longest_trade_duration(hold_times):
+    return float(hold_times.max()) if hold_times.size else 0
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# STATISTICHE GIORNALIERE (solo PnlAggregates: da frame o già aggregati in SQL)
+# ──────────────────────────────────────────────────────────────────────────
+@node('aggregates')
+def daily_returns(aggregates):
+    return aggregates.daily_pnl
+
+
+@node('daily_returns')
+def winning_days_pnl(daily_returns):
+    return daily_returns[daily_returns > 0]
+
+
+@node('daily_returns')
+def losing_days_pnl(daily_returns):
+    return daily_returns[daily_returns < 0]
+
+
+@node('daily_returns')
+def has_risk_days(daily_returns):
+    return daily_returns.size >= _MIN_RISK_DAYS
+
+
+@node('day_labels', 'daily_returns')
+def net_daily_pnl_chart(day_labels, daily_returns):
+    return [{'date': d, 'pnl': p} for d, p in zip(day_labels, daily_returns.tolist())]
+
+
+@node('daily_returns', 'has_risk_days')
+def sharpe_ratio(daily_returns, has_risk_days):
+    if not has_risk_days:
+        return 0.0
+    volatility = daily_returns.std()
+    return daily_returns.mean() / volatility * np.sqrt(252) if volatility > 0 else 0.0
+
+
+@node('daily_returns', 'losing_days_pnl', 'has_risk_days')
+def sortino_ratio(daily_returns, losing_days_pnl, has_risk_days):
+    if not has_risk_days:
+        return 0.0
+    downside_std = losing_days_pnl.std() if losing_days_pnl.size else 0.0
+    return daily_returns.mean() / downside_std * np.sqrt(252) if downside_std > 0 else 0.0
+
+
+@node('daily_returns', 'has_risk_days')
+def skewness(daily_returns, has_risk_days):
+    return _skew(daily_returns) if has_risk_days else 0.0
+
+
+@node('daily_returns', 'has_risk_days')
+def kurtosis(daily_returns, has_risk_days):
+    return _kurtosis(daily_returns) if has_risk_days else 0.0
+
+
+@node('daily_returns', 'has_risk_days')
+def daily_var_95(daily_returns, has_risk_days):
+    return np.percentile(daily_returns, 5) if has_risk_days else 0.0
+
+
+@node('daily_var_95')
+def var_95(daily_var_95):
+    return abs(daily_var_95)
+
+
+@node('daily_returns', 'daily_var_95', 'has_risk_days')
+def cvar_95(daily_returns, daily_var_95, has_risk_days):
+    return abs(daily_returns[daily_returns <= daily_var_95].mean()) if has_risk_days else 0.0
+
+
+@node('aggregates', 'total_pl', 'max_drawdown_abs', 'has_risk_days')
+def calmar_ratio(aggregates, total_pl, max_drawdown_abs, has_risk_days):
+    # richiede il max drawdown per-trade: non disponibile dai soli aggregati
+    if not has_risk_days:
+        return 0.0
+    trading_days = int((aggregates.days[-1] - aggregates.days[0]).astype(np.int64))
+    if trading_days > 0 and max_drawdown_abs:
+        return total_pl * (365 / trading_days) / max_drawdown_abs
+    return 0.0
+
+
+@node('daily_returns')
+def average_daily_pnl(daily_returns):
+    return daily_returns.mean() if daily_returns.size else 0.0
+
+
+@node('winning_days_pnl')
+def average_winning_day_pnl(winning_days_pnl):
+    return winning_days_pnl.mean() if winning_days_pnl.size else 0.0
+
+
+@node('losing_days_pnl')
+def average_losing_day_pnl(losing_days_pnl):
+    return losing_days_pnl.mean() if losing_days_pnl.size else 0.0
+
+
+@node('winning_days_pnl')
+def largest_profitable_day(winning_days_pnl):
+    return winning_days_pnl.max() if winning_days_pnl.size else 0.0
+
+
+@node('losing_days_pnl')
+def largest_losing_day(losing_days_pnl):
+    return losing_days_pnl.min() if losing_days_pnl.size else 0.0
+
+
+@node('winning_days_pnl')
+def winning_days(winning_days_pnl):
+    return int(winning_days_pnl.size)
+
+
+@node('losing_days_pnl')
+def losing_days(losing_days_pnl):
+    return int(losing_days_pnl.size)
+
+
+@node('daily_returns', 'winning_days', 'losing_days')
+def breakeven_days(daily_returns, winning_days, losing_days):
+    return int(daily_returns.size) - winning_days - losing_days
+
+
+@node('daily_returns', 'winning_days')
+def day_win_percentage(daily_returns, winning_days):
+    return winning_days / daily_returns.size * 100 if daily_returns.size else 0.0
+
+
+@node('aggregates')
+def average_daily_volume(aggregates):
+    return aggregates.daily_volume.mean() if aggregates.daily_pnl.size else 0.0
+
+
+@node('aggregates')
+def performance_by_day_of_week(aggregates):
+    return {DAY_NAMES[i]: float(v) for i, v in enumerate(aggregates.weekday_pnl)}
+
+
+@node('aggregates')
+def performance_by_hour(aggregates):
+    return {f"{h:02d}:00": float(v) for h, v in enumerate(aggregates.hour_pnl)}
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# STREAK E CONSISTENCY (run-length encoding, vedi streaks.py)
+# ──────────────────────────────────────────────────────────────────────────
+@node('pnl')
+def trade_runs(pnl):
+    return StreakRuns.from_values(pnl)
+
+
+@node('daily_returns')
+def day_runs(daily_returns):
+    return StreakRuns.from_values(daily_returns)
+
+
+@node('trade_runs')
+def max_consecutive_wins(trade_runs):
+    return trade_runs.max_length(WIN)
+
+
+@node('trade_runs')
+def max_consecutive_losses(trade_runs):
+    return trade_runs.max_length(LOSS)
+
+
+@node('trade_runs')
+def current_trade_streak(trade_runs):
+    return trade_runs.current
+
+
+@node('trade_runs')
+def average_consecutive_wins(trade_runs):
+    return trade_runs.average_length(WIN)
+
+
+@node('trade_runs')
+def average_consecutive_losses(trade_runs):
+    return trade_runs.average_length(LOSS)
+
+
+@node('day_runs')
+def max_consecutive_winning_days(day_runs):
+    return day_runs.max_length(WIN)
+
+
+@node('day_runs')
+def max_consecutive_losing_days(day_runs):
+    return day_runs.max_length(LOSS)
+
+
+@node('day_runs')
+def current_day_streak(day_runs):
+    return day_runs.current
+
+
+@node('day_runs')
+def average_consecutive_winning_days(day_runs):
+    return day_runs.average_length(WIN)
+
+
+@node('day_runs')
+def average_consecutive_losing_days(day_runs):
+    return day_runs.average_length(LOSS)
+
+
+@node('daily_returns')
+def consistency_score(daily_returns):
+    # std dev dei P&L giornalieri
+    return daily_returns.std() if daily_returns.size else 0.0
+
+
+@node('trade_runs', 'day_runs', 'day_labels')
+def streaks(trade_runs, day_runs, day_labels):
+    """Riepiloghi, istogrammi e streak giornaliere con le date (payload, non statistica)."""
+    return {
+        'trades': trade_runs.summary(),
+        'days': {**day_runs.summary(), 'streaks': day_runs.records(day_labels)},
+    }
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# GRUPPI DI NODI (ordine delle chiavi nelle risposte)
+# ──────────────────────────────────────────────────────────────────────────
+BASE_STATS = (
+    'total_pl', 'trade_count', 'winning_trades_count', 'losing_trades_count',
+    'breakeven_trades_count', 'avg_win', 'avg_loss', 'profit_factor', 'expectancy',
+    'win_rate', 'average_trade_pnl', 'average_win_loss_ratio', 'largest_profit',
+    'largest_loss', 'longs_win_percentage', 'shorts_win_percentage',
+    'long_trades_analysis', 'short_trades_analysis', 'pnl_data',
+)
+
+DAILY_STATS = (
+    'sharpe_ratio', 'sortino_ratio', 'skewness', 'kurtosis', 'var_95', 'cvar_95',
+    'average_daily_pnl', 'average_winning_day_pnl', 'average_losing_day_pnl',
+    'largest_profitable_day', 'largest_losing_day', 'net_daily_pnl_chart',
+    'winning_days', 'losing_days', 'breakeven_days', 'day_win_percentage',
+    'average_daily_volume', 'performance_by_day_of_week', 'performance_by_hour',
+)
+
+TRADE_STREAK_STATS = (
+    'max_consecutive_wins', 'max_consecutive_losses', 'current_trade_streak',
+    'average_consecutive_wins', 'average_consecutive_losses',
+)
+
+DAY_STREAK_STATS = (
+    'max_consecutive_winning_days', 'max_consecutive_losing_days', 'current_day_streak',
+    'average_consecutive_winning_days', 'average_consecutive_losing_days', 'consistency_score',
+)
+
+ADVANCED_STATS = (
+    'avg_sell_efficiency', 'avg_total_efficiency', 'avg_planned_rr', 'avg_realized_rr',
+    'equity_curve_data', 'max_drawdown_abs', 'max_drawdown_pct', 'realized_rrs_list',
+    'recovery_factor', 'average_drawdown', 'max_drawdown_duration',
+    'average_drawdown_duration', 'average_hold_time', 'longest_trade_duration',
+    *DAILY_STATS, 'calmar_ratio',
+    *TRADE_STREAK_STATS, *DAY_STREAK_STATS, 'streaks',
+)
+
+# Serie e strutture per i grafici: nel payload, non tra le statistiche
+PAYLOAD_NODES = ('realized_rrs_list', 'pnl_data', 'equity_curve_data', 'net_daily_pnl_chart', 'streaks')
+
+# Statistiche richiedibili singolarmente (chiavi di `stats` nel payload completo)
+STAT_NAMES = tuple(name for name in BASE_STATS + ADVANCED_STATS if name not in PAYLOAD_NODES)
+
+# Statistiche usate dal Vantage Score (vedi MetricsCalculator.score_from_stats)
+VANTAGE_STATS = (
+    'profit_factor', 'average_win_loss_ratio', 'max_drawdown_pct', 'win_rate',
+    'total_pl', 'consistency_score', 'recovery_factor',
+)
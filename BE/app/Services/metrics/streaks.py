@@ -0,0 +1,111 @@
+# app/Services/metrics/streaks.py
+# Streak (serie consecutive) di risultati vincenti / perdenti, per trade o per giorno.
+#
+# Run-length encoding del segno dei valori: gli inizi delle run sono i punti in
+# cui il segno cambia (np.diff + np.flatnonzero), la somma di ogni run esce da
+# np.add.reduceat. Le run a zero (pareggi) interrompono le streak e non vengono
+# riportate. Nessun ciclo Python sui valori: stesso codice per P&L dei trade,
+# P&L giornalieri e ricostruzione dell'accumulatore incrementale.
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+WIN, LOSS = 1, -1
+
+
+@dataclass
+class StreakRuns:
+    """
+    Streak in ordine di inizio (indici nella serie analizzata, `end` incluso):
+    - sign: +1 vincente, -1 perdente
+    - pnl: somma dei valori della streak (stesso tipo dei valori: float o punto fisso)
+    `size` è la lunghezza della serie analizzata.
+    """
+
+    sign: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    pnl: np.ndarray
+    size: int
+
+    @classmethod
+    def from_values(cls, values) -> "StreakRuns":
+        values = np.asarray(values)
+        n = values.size
+        if n == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(empty.astype(np.int8), empty, empty, values[:0], 0)
+        signs = np.sign(values).astype(np.int8)
+        # inizio di ogni run (la run iniziale a zero, se c'è, resta esclusa)
+        starts = np.flatnonzero(np.diff(signs, prepend=np.int8(0)))
+        if starts.size == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(empty.astype(np.int8), empty, empty, values[:0], n)
+        ends = np.append(starts[1:], n) - 1
+        pnl = np.add.reduceat(values, starts)
+        keep = signs[starts] != 0
+        return cls(signs[starts][keep], starts[keep], ends[keep], pnl[keep], n)
+
+    @property
+    def length(self) -> np.ndarray:
+        return self.end - self.start + 1
+
+    def lengths(self, sign: int) -> np.ndarray:
+        return self.length[self.sign == sign]
+
+    def max_length(self, sign: int) -> int:
+        lengths = self.lengths(sign)
+        return int(lengths.max()) if lengths.size else 0
+
+    def average_length(self, sign: int) -> float:
+        lengths = self.lengths(sign)
+        return float(lengths.mean()) if lengths.size else 0.0
+
+    @property
+    def current(self) -> int:
+        """Streak in corso a fine serie: > 0 vincente, < 0 perdente, 0 se l'ultimo valore è un pareggio."""
+        if self.end.size == 0 or self.end[-1] != self.size - 1:
+            return 0
+        return int(self.sign[-1]) * int(self.end[-1] - self.start[-1] + 1)
+
+    def histogram(self, sign: int) -> Dict[int, int]:
+        """Lunghezza -> numero di streak di quel segno."""
+        counts = np.bincount(self.lengths(sign))
+        lengths = np.flatnonzero(counts)
+        return dict(zip(lengths.tolist(), counts[lengths].tolist()))
+
+    def summary(self) -> dict:
+        return {
+            'max_win_streak': self.max_length(WIN),
+            'max_loss_streak': self.max_length(LOSS),
+            'current_streak': self.current,
+            'average_win_streak': self.average_length(WIN),
+            'average_loss_streak': self.average_length(LOSS),
+            'win_streaks': int(np.count_nonzero(self.sign == WIN)),
+            'loss_streaks': int(np.count_nonzero(self.sign == LOSS)),
+            'histogram': {'win': self.histogram(WIN), 'loss': self.histogram(LOSS)},
+        }
+
+    def records(self, labels: Optional[Sequence[str]] = None) -> List[dict]:
+        """Una riga per streak; con `labels` (es. date) aggiunge start/end leggibili."""
+        rows = [
+            {
+                'type': 'win' if sign > 0 else 'loss',
+                'start_index': start,
+                'end_index': end,
+                'length': end - start + 1,
+                'pnl': pnl,
+            }
+            for sign, start, end, pnl in zip(
+                self.sign.tolist(), self.start.tolist(), self.end.tolist(), self.pnl.tolist()
+            )
+        ]
+        if labels is not None:
+            for row in rows:
+                row['start'] = labels[row['start_index']]
+                row['end'] = labels[row['end_index']]
+        return rows
@@ -0,0 +1,165 @@
+# app/Services/metrics/synthetic_trades.py
+# Generatore deterministico di trade sintetici (stessi campi di TradeRead),
+# per benchmark e prove del motore metriche senza database.
+#
+# Le colonne sono generate in blocco con NumPy (seed fisso -> stessi trade):
+# mix long/short, setup, simboli con valore per punto diverso, orari di
+# sessione nei giorni feriali, stop/target coerenti con la direzione, esiti
+# espressi in R-multiple e una quota realistica di campi mancanti.
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import numpy as np
+
+# simbolo -> (prezzo tipico, valore per punto, rischio tipico in punti)
+SYMBOLS = {
+    "ES": (5000.0, 50.0, 6.0),
+    "NQ": (17500.0, 20.0, 25.0),
+    "CL": (80.0, 1000.0, 0.4),
+    "AAPL": (190.0, 100.0, 1.5),
+    "EURUSD": (1.08, 100_000.0, 0.002),
+}
+SETUPS = ["Breakout", "Pullback", "Reversal", "Range", "News"]
+MISTAKES = ["Entrata anticipata", "Uscita anticipata", "Size eccessiva", "Stop spostato"]
+TAGS = ["A+", "trend", "controtrend", "overnight"]
+EMOTIONS = ["Calmo", "FOMO", "Ansioso", "Sicuro"]
+
+_US_PER_MINUTE = 60_000_000
+_SESSION_OPEN_MINUTE = 13 * 60 + 30  # 13:30 UTC
+_SESSION_MINUTES = 390
+_START = np.datetime64("2023-01-02", "D")  # lunedì
+
+
+def _optional(values: list, missing: np.ndarray) -> list:
+    """Sostituisce con None le posizioni mancanti."""
+    return [None if m else v for v, m in zip(values, missing.tolist())]
+
+
+def _timestamps(us: np.ndarray) -> List[datetime]:
+    return [
+        datetime.fromtimestamp(t / 1_000_000, tz=timezone.utc)
+        for t in us.tolist()
+    ]
+
+
+def generate_trades(
+    n: int,
+    seed: int = 0,
+    *,
+    user_id: Optional[uuid.UUID] = None,
+    trades_per_day: float = 8.0,
+) -> List[dict]:
+    """
+    `n` trade sintetici in ordine cronologico, come dict nello stesso formato
+    restituito dal repository (TradeRead + tags). Stesso `seed` -> stessi trade.
+    """
+    rng = np.random.default_rng(seed)
+    user_id = user_id or uuid.UUID(int=seed + 1)
+
+    # ── Tempi: giorni feriali consecutivi, orari casuali in sessione ──────
+    n_days = max(1, int(np.ceil(n / trades_per_day)))
+    weekdays = np.busday_offset(_START, np.arange(n_days), roll="forward")
+    day = np.sort(rng.integers(0, n_days, n))
+    entry_minute = _SESSION_OPEN_MINUTE + rng.integers(0, _SESSION_MINUTES - 5, n)
+    entry_us = (
+        weekdays[day].astype("datetime64[us]").astype(np.int64)
+        + entry_minute * _US_PER_MINUTE
+        + rng.integers(0, _US_PER_MINUTE, n)
+    )
+    hold_minutes = np.minimum(rng.lognormal(3.0, 1.0, n), 600.0)
+    exit_us = entry_us + (hold_minutes * _US_PER_MINUTE).astype(np.int64)
+    created_us = exit_us + rng.integers(0, 5 * _US_PER_MINUTE, n)
+    order = np.argsort(created_us, kind="stable")
+    entry_us, exit_us, created_us = entry_us[order], exit_us[order], created_us[order]
+
+    # ── Strumento, direzione, size ───────────────────────────────────────
+    names = list(SYMBOLS)
+    symbol_idx = rng.choice(len(names), n, p=[0.35, 0.25, 0.15, 0.15, 0.10])
+    base_price, point_value, risk_points = (
+        np.array([SYMBOLS[s][k] for s in names])[symbol_idx] for k in range(3)
+    )
+    direction_code = rng.choice(3, n, p=[0.55, 0.43, 0.02])  # Long, Short, mancante
+    sign = np.where(direction_code == 1, -1.0, 1.0)
+    size = rng.choice(np.array([1.0, 1.0, 2.0, 3.0, 5.0]), n)
+
+    # ── Prezzi: entry, stop/target, esito in R-multiple ──────────────────
+    entry = base_price * (1 + rng.normal(0, 0.03, n))
+    risk = risk_points * rng.uniform(0.5, 1.5, n)
+    planned_rr = rng.choice(np.array([1.0, 1.5, 2.0, 3.0]), n)
+    outcome = rng.random(n)
+    r_multiple = np.where(
+        outcome < 0.47, rng.uniform(0.2, 1.0, n) * planned_rr,       # vincente
+        np.where(outcome < 0.52, 0.0, -rng.uniform(0.6, 1.1, n)),    # pareggio / perdente
+    )
+    exit_price = entry + sign * r_multiple * risk
+    stop = entry - sign * risk
+    target = entry + sign * risk * planned_rr
+    adverse = np.abs(rng.normal(0, 0.5, n)) * risk
+    favorable = np.maximum(r_multiple, 0) * risk + np.abs(rng.normal(0, 0.3, n)) * risk
+    low = np.where(sign > 0, entry - adverse, entry - favorable)
+    high = np.where(sign > 0, entry + favorable, entry + adverse)
+    low, high = np.minimum(low, exit_price), np.maximum(high, exit_price)
+    pnl = np.round((exit_price - entry) * sign * point_value * size, 2)
+
+    decimals = np.where(base_price < 10, 5, 2)
+    rounded = {
+        name: [round(v, d) for v, d in zip(values.tolist(), decimals.tolist())]
+        for name, values in (("entry", entry), ("exit", exit_price), ("stop", stop),
+                             ("target", target), ("low", low), ("high", high))
+    }
+
+    # ── Campi mancanti / categorici ──────────────────────────────────────
+    def missing(p: float) -> np.ndarray:
+        return rng.random(n) < p
+
+    setups = _optional([SETUPS[i] for i in rng.integers(0, len(SETUPS), n).tolist()], missing(0.05))
+    mistake_count = rng.choice(3, n, p=[0.7, 0.25, 0.05])
+    tag_count = rng.choice(3, n, p=[0.5, 0.4, 0.1])
+    mistakes_pick = rng.integers(0, len(MISTAKES), (n, 2)).tolist()
+    tags_pick = rng.integers(0, len(TAGS), (n, 2)).tolist()
+    emotions = _optional([EMOTIONS[i] for i in rng.integers(0, len(EMOTIONS), n).tolist()], missing(0.3))
+
+    columns = {
+        "id": [uuid.UUID(int=(seed << 64) + i) for i in range(n)],
+        "created_at": _timestamps(created_us),
+        "p_l": _optional(pnl.tolist(), missing(0.02)),
+        "setup": setups,
+        "stop_loss_price": _optional(rounded["stop"], missing(0.10)),
+        "take_profit_price": _optional(rounded["target"], missing(0.15)),
+        "entry_price": _optional(rounded["entry"], missing(0.02)),
+        "exit_price": _optional(rounded["exit"], missing(0.03)),
+        "position_size": _optional(size.tolist(), missing(0.02)),
+        "lowest_price_during_trade": _optional(rounded["low"], missing(0.10)),
+        "highest_price_during_trade": _optional(rounded["high"], missing(0.10)),
+        "symbol": [names[i] for i in symbol_idx.tolist()],
+        "direction": [("Long", "Short", None)[c] for c in direction_code.tolist()],
+        "emotional_state": emotions,
+        "entry_timestamp": _optional(_timestamps(entry_us), missing(0.03)),
+        "exit_timestamp": _optional(_timestamps(exit_us), missing(0.05)),
+    }
+    mistakes = [
+        list(dict.fromkeys(MISTAKES[i] for i in pick[:k]))
+        for pick, k in zip(mistakes_pick, mistake_count.tolist())
+    ]
+    tags = [
+        list(dict.fromkeys(TAGS[i] for i in pick[:k]))
+        for pick, k in zip(tags_pick, tag_count.tolist())
+    ]
+
+    keys = list(columns)
+    return [
+        {
+            **dict(zip(keys, values)),
+            "user_id": user_id,
+            "notes": None,
+            "mistakes": mistakes[i],
+            "notes_pre_trade": None,
+            "notes_post_trade": None,
+            "tags": tags[i],
+        }
+        for i, values in enumerate(zip(*columns.values()))
+    ]
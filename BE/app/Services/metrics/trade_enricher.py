@@ -2,60 +2,132 @@
 
 from decimal import Decimal
 
-def enrich_trade_with_advanced_metrics(trade):
+import numpy as np
+
+from app.Services.metrics.trade_frame import (
+    TradeFrame, DIR_LONG, DIR_NONE, from_fixed, money_to_fixed,
+)
+
+# Campi aggiunti dall'arricchimento
+ENRICHED_FIELDS = (
+    'mae_usd', 'mfe_usd', 'planned_rr', 'realized_rr', 'stop_loss_usd', 'profit_target_usd'
+)
+
+
+def enrich_trades_batch(trades):
     """
-    Calcola metriche avanzate per un singolo trade e le aggiunge al dizionario del trade.
-    Modifica il dizionario 'trade' in-place e lo restituisce.
+    Calcola le metriche avanzate per una lista di trade in forma vettoriale.
+    Accetta una lista di dict o un TradeFrame e NON modifica i dict: ritorna
+    {campo: np.ndarray float64} allineato all'ordine di input (vedi ENRICHED_FIELDS).
     """
-    if not trade:
-        return None
+    frame = trades if isinstance(trades, TradeFrame) else TradeFrame.from_records(trades)
+    n = len(frame)
 
-    entry = Decimal(trade.get('entry_price') or 0)
-    exit_price = Decimal(trade.get('exit_price') or 0)
-    lowest = Decimal(trade.get('lowest_price_during_trade') or 0)
-    highest = Decimal(trade.get('highest_price_during_trade') or 0)
-    sl = Decimal(trade.get('stop_loss_price') or 0)
-    tp = Decimal(trade.get('take_profit_price') or 0)
-    pnl = Decimal(trade.get('p_l') or 0)
-    position_size = Decimal(trade.get('position_size') or 1)
-    direction = trade.get('direction')
+    entry = np.nan_to_num(frame.entry_price)
+    lowest = np.nan_to_num(frame.lowest_price)
+    highest = np.nan_to_num(frame.highest_price)
+    pnl = frame.pnl_filled()
+
+    # 1) Value-per-point dedotto una sola volta per tutto il batch
+    value_per_point = frame.value_per_point()
+
+    # 2) MAE/MFE (punti e USD); direzioni non Long trattate come Short
+    is_long = frame.direction == DIR_LONG
+    valid = (entry > 0) & (lowest > 0) & (highest > 0) & (frame.direction != DIR_NONE)
+    mae_points = np.where(is_long, entry - lowest, highest - entry)
+    mfe_points = np.where(is_long, highest - entry, entry - lowest)
+    mae_usd = np.where(valid, -np.abs(mae_points * value_per_point), 0.0)  # MAE sempre perdita potenziale
+    mfe_usd = np.where(valid, mfe_points * value_per_point, 0.0)
+
+    # 3) R-Multiples e valori USD
+    risk = frame.risk_points()
+    has_risk = risk > 0
+    reward = frame.reward_points()
+    initial_dollar_risk = risk * value_per_point
+
+    planned_rr = np.zeros(n)
+    planned_rr[has_risk] = reward[has_risk] / risk[has_risk]
+    realized_ok = has_risk & (initial_dollar_risk > 0)
+    realized_rr = np.zeros(n)
+    realized_rr[realized_ok] = pnl[realized_ok] / initial_dollar_risk[realized_ok]
+
+    return {
+        'mae_usd': mae_usd,
+        'mfe_usd': mfe_usd,
+        'planned_rr': planned_rr,
+        'realized_rr': realized_rr,
+        'stop_loss_usd': np.where(has_risk, -np.abs(initial_dollar_risk), 0.0),
+        'profit_target_usd': np.where(has_risk, reward * value_per_point, 0.0),
+    }
 
-    # 1) Infer value-per-point (es. futures)
-    value_per_point = Decimal(0)
-    if direction and entry and exit_price and pnl != 0:
-        pnl_in_points = (exit_price - entry) if direction == 'Long' else (entry - exit_price)
-        if pnl_in_points != 0:
-            value_per_point = abs(pnl / pnl_in_points)
 
-    # fallback: usa la size come moltiplicatore (azioni, ecc.)
+def _price(trade, key):
+    """Prezzo del trade come float (None -> 0, come nan_to_num sul frame)."""
+    value = trade.get(key)
+    return float(value) if value is not None else 0.0
+
+
+def enrich_trade(trade):
+    """
+    Versione scalare di enrich_trades_batch per un solo dict: stessi float
+    (stesse operazioni, P&L arrotondato al punto fisso) senza costruire un
+    TradeFrame, che per un trade costa ~25 volte tanto. NON modifica il dict:
+    ritorna {campo: float} (vedi ENRICHED_FIELDS).
+    """
+    entry = _price(trade, 'entry_price')
+    exit_price = _price(trade, 'exit_price')
+    lowest = _price(trade, 'lowest_price_during_trade')
+    highest = _price(trade, 'highest_price_during_trade')
+    sl = _price(trade, 'stop_loss_price')
+    tp = _price(trade, 'take_profit_price')
+    size = _price(trade, 'position_size')
+    pnl = from_fixed(money_to_fixed(trade.get('p_l')))
+    direction = trade.get('direction')
+    is_long = direction == 'Long'
+
+    # 1) Value-per-point (vedi TradeFrame.value_per_point)
+    value_per_point = 0.0
+    points = exit_price - entry if is_long else entry - exit_price
+    if direction and entry != 0 and exit_price != 0 and points != 0:
+        value_per_point = abs(pnl / points)
     if value_per_point == 0:
-        value_per_point = position_size
+        value_per_point = size if size != 0 else 1.0
 
-    # 2) MAE/MFE (punti e USD)
+    # 2) MAE/MFE (punti e USD); direzioni non Long trattate come Short
+    mae_usd = mfe_usd = 0.0
     if entry > 0 and lowest > 0 and highest > 0 and direction:
-        if direction == 'Long':
-            mae_points = entry - lowest
-            mfe_points = highest - entry
-        else:  # Short
-            mae_points = highest - entry
-            mfe_points = entry - lowest
-        trade['mae_usd'] = -abs(mae_points * value_per_point)  # MAE sempre perdita potenziale
-        trade['mfe_usd'] = mfe_points * value_per_point
-    else:
-        trade['mae_usd'], trade['mfe_usd'] = Decimal(0), Decimal(0)
+        mae_points = entry - lowest if is_long else highest - entry
+        mfe_points = highest - entry if is_long else entry - lowest
+        mae_usd = -abs(mae_points * value_per_point)  # MAE sempre perdita potenziale
+        mfe_usd = mfe_points * value_per_point
 
     # 3) R-Multiples e valori USD
-    potential_risk_points = abs(entry - sl) if entry and sl else Decimal(0)
-    if potential_risk_points > 0:
-        initial_dollar_risk = potential_risk_points * value_per_point
-        potential_reward_points = abs(tp - entry) if tp and entry else Decimal(0)
-
-        trade['planned_rr'] = (potential_reward_points / potential_risk_points) if potential_risk_points else Decimal(0)
-        trade['stop_loss_usd'] = -abs(initial_dollar_risk)
-        trade['profit_target_usd'] = potential_reward_points * value_per_point
-        trade['realized_rr'] = (pnl / initial_dollar_risk) if initial_dollar_risk > 0 else Decimal(0)
-    else:
-        trade['planned_rr'], trade['realized_rr'] = Decimal(0), Decimal(0)
-        trade['stop_loss_usd'], trade['profit_target_usd'] = Decimal(0), Decimal(0)
+    risk = abs(entry - sl) if entry != 0 and sl != 0 else 0.0
+    reward = abs(tp - entry) if entry != 0 and tp != 0 else 0.0
+    if risk <= 0:
+        return {
+            'mae_usd': mae_usd, 'mfe_usd': mfe_usd, 'planned_rr': 0.0,
+            'realized_rr': 0.0, 'stop_loss_usd': 0.0, 'profit_target_usd': 0.0,
+        }
+    initial_dollar_risk = risk * value_per_point
+    return {
+        'mae_usd': mae_usd,
+        'mfe_usd': mfe_usd,
+        'planned_rr': reward / risk,
+        'realized_rr': pnl / initial_dollar_risk if initial_dollar_risk > 0 else 0.0,
+        'stop_loss_usd': -abs(initial_dollar_risk),
+        'profit_target_usd': reward * value_per_point,
+    }
+
+
+def enrich_trade_with_advanced_metrics(trade):
+    """
+    Calcola metriche avanzate per un singolo trade e le aggiunge al dizionario del trade.
+    Modifica il dizionario 'trade' in-place e lo restituisce.
+    """
+    if not trade:
+        return None
 
+    for field, value in enrich_trade(trade).items():
+        trade[field] = Decimal(value)
     return trade
@@ -0,0 +1,360 @@
+# app/Services/metrics/trade_frame.py
+# Rappresentazione colonnare (NumPy) dei trade usata dal motore metriche.
+# I dict provenienti dal repository vengono letti UNA sola volta e trasformati
+# in array float64 / int8 / datetime64; tutte le statistiche lavorano poi su
+# queste colonne invece di riconvertire ogni campo a Decimal ad ogni passata.
+
+from __future__ import annotations
+
+import functools
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+from dateutil.parser import parse
+
+# Codifica della colonna `direction`
+DIR_NONE = 0    # direzione assente / vuota
+DIR_LONG = 1
+DIR_SHORT = -1
+DIR_OTHER = 2   # valore non riconosciuto (trattato come short nel value-per-point)
+
+_DIRECTION_CODES = {"Long": DIR_LONG, "Short": DIR_SHORT}
+
+# Colonne numeriche: nome colonna -> chiave del dict trade
+_FLOAT_FIELDS = {
+    "pnl": "p_l",
+    "entry_price": "entry_price",
+    "exit_price": "exit_price",
+    "stop_loss_price": "stop_loss_price",
+    "take_profit_price": "take_profit_price",
+    "position_size": "position_size",
+    "lowest_price": "lowest_price_during_trade",
+    "highest_price": "highest_price_during_trade",
+}
+
+# Colonne temporali: nome colonna -> chiave del dict trade
+_TIME_FIELDS = {
+    "created_at": "created_at",
+    "entry_ts": "entry_timestamp",
+    "exit_ts": "exit_timestamp",
+}
+
+# Importi monetari (P&L) in punto fisso: int64 in unità di 1/MONEY_SCALE di
+# valuta (4 decimali, come il tipo `money` SQL). Somme, equity e confronti con
+# lo zero restano esatti; si torna a float solo per rapporti e medie, e a
+# Decimal solo al confine di serializzazione.
+MONEY_SCALE = 10_000
+
+_NAT_INT = np.iinfo(np.int64).min  # rappresentazione int64 di NaT
+_UTC_SUFFIXES = ("Z", "+00:00")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Stringa -> datetime. I formati ISO-8601 prodotti dall'API (anche con 'Z'
+    o offset) passano da datetime.fromisoformat; dateutil resta solo come
+    ripiego per i formati non riconosciuti (è molto più lento).
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return parse(value)
+
+
+def to_epoch_us(value: Any) -> int:
+    """Converte datetime/str in microsecondi da epoch UTC (naive = UTC). None -> NaT."""
+    if value is None:
+        return _NAT_INT
+    if isinstance(value, str):
+        value = parse_timestamp(value)
+    if value.tzinfo is None:
+        return (value - _EPOCH_NAIVE) // _MICROSECOND
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _utc_iso_body(value: str) -> Optional[str]:
+    """
+    Parte data/ora di una stringa ISO in UTC ('Z', '+00:00' o senza offset),
+    convertibile direttamente da NumPy; None se ha un altro offset.
+    """
+    for suffix in _UTC_SUFFIXES:
+        if value.endswith(suffix):
+            return value[:-len(suffix)]
+    time_part = value[10:]
+    return None if "+" in time_part or "-" in time_part else value
+
+
+def to_datetime64(values: Sequence[Any]) -> np.ndarray:
+    """
+    Converte una colonna intera (datetime / str / None) in datetime64[us] UTC.
+    - stringhe ISO in UTC o naive (il caso comune): UNA conversione vettoriale NumPy
+    - datetime e stringhe con altri offset: to_epoch_us per elemento
+    - se NumPy non riconosce qualche stringa, quelle righe passano da parse_timestamp
+    """
+    out = np.full(len(values), _NAT_INT, dtype=np.int64)
+    positions, bodies = [], []
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        body = _utc_iso_body(value) if isinstance(value, str) else None
+        if body is None:
+            out[i] = to_epoch_us(value)
+        else:
+            positions.append(i)
+            bodies.append(body)
+    if bodies:
+        try:
+            out[positions] = np.array(bodies, dtype="datetime64[us]").astype(np.int64)
+        except ValueError:
+            out[positions] = [to_epoch_us(values[i]) for i in positions]
+    return out.view("datetime64[us]")
+
+
+def to_fixed(values: Any) -> np.ndarray:
+    """Importi float (NaN = 0) -> int64 in punto fisso."""
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64), nan=0.0)
+    return np.rint(values * MONEY_SCALE).astype(np.int64)
+
+
+def money_to_fixed(value: Any) -> int:
+    """Singolo importo (None = 0, Decimal/float) -> intero in punto fisso."""
+    return round(float(value or 0) * MONEY_SCALE)
+
+
+def from_fixed(units: Any) -> Any:
+    """Punto fisso (int, array int64 o somme intere in float64) -> float."""
+    return units / MONEY_SCALE
+
+
+def _memoized(method):
+    """Memorizza per-frame una colonna derivata (calcolata una sola volta)."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self):
+        derived = self._derived
+        if name not in derived:
+            derived[name] = method(self)
+        return derived[name]
+
+    return wrapper
+
+
+def _select(value, positions):
+    """Applica la selezione di righe a un array o a una tupla di array."""
+    if isinstance(value, tuple):
+        return tuple(v[positions] for v in value)
+    return value[positions]
+
+
+def datetime64_to_datetime(value: np.datetime64) -> Optional[datetime]:
+    """datetime64[us] (UTC) -> datetime aware UTC; NaT -> None."""
+    if np.isnat(value):
+        return None
+    return value.astype("datetime64[us]").item().replace(tzinfo=timezone.utc)
+
+
+class TradeFrame:
+    """
+    Vista colonnare immutabile su una lista di trade (dict).
+
+    - Le colonne float contengono NaN dove il campo è None.
+    - `direction` è codificata in int8 (vedi DIR_*).
+    - Le colonne temporali sono datetime64[us] in UTC, NaT dove mancanti.
+    - `index` mappa ogni riga al dict originale in `records` (nessuna copia).
+    - Le colonne derivate (durata, R-multiple, ...) sono calcolate una volta
+      e riusate: NON vanno modificate in-place dai chiamanti.
+    """
+
+    __slots__ = (
+        "records", "index", "direction", "setup", "_derived",
+        *_FLOAT_FIELDS.keys(), *_TIME_FIELDS.keys(),
+    )
+
+    def __init__(
+        self,
+        records: Sequence[dict],
+        index: np.ndarray,
+        columns: dict,
+        derived: Optional[dict] = None,
+    ) -> None:
+        self.records = records
+        self.index = index
+        self._derived = derived or {}
+        for name, column in columns.items():
+            setattr(self, name, column)
+
+    # ──────────────────────────────────────────────────────────────────────
+    # COSTRUZIONE
+    # ──────────────────────────────────────────────────────────────────────
+    @classmethod
+    def from_records(cls, trades: Sequence[dict]) -> "TradeFrame":
+        """Costruisce il frame leggendo ogni dict una sola volta."""
+        n = len(trades)
+        columns: dict[str, np.ndarray] = {}
+
+        for name, key in _FLOAT_FIELDS.items():
+            raw = [t.get(key) for t in trades]
+            columns[name] = np.array(
+                [np.nan if v is None else float(v) for v in raw], dtype=np.float64
+            )
+
+        for name, key in _TIME_FIELDS.items():
+            columns[name] = to_datetime64([t.get(key) for t in trades])
+
+        directions = np.zeros(n, dtype=np.int8)
+        for i, t in enumerate(trades):
+            d = t.get("direction")
+            if d:
+                directions[i] = _DIRECTION_CODES.get(d, DIR_OTHER)
+        columns["direction"] = directions
+
+        setups = np.empty(n, dtype=object)
+        setups[:] = [t.get("setup", "Non specificato") for t in trades]
+        columns["setup"] = setups
+
+        return cls(trades, np.arange(n, dtype=np.int64), columns)
+
+    @classmethod
+    def from_columns(cls, columns: dict, records: Sequence[dict] = ()) -> "TradeFrame":
+        """Ricostruisce un frame da colonne già pronte (es. trasferite a un worker)."""
+        n = len(columns["pnl"])
+        return cls(records, np.arange(n, dtype=np.int64), dict(columns))
+
+    def columns(self) -> dict:
+        """Tutte le colonne base del frame (senza le derivate)."""
+        return {name: getattr(self, name) for name in self._column_names()}
+
+    def take(self, positions: np.ndarray) -> "TradeFrame":
+        """Sotto-frame (righe selezionate per posizione o maschera booleana)."""
+        columns = {name: getattr(self, name)[positions] for name in self._column_names()}
+        derived = {name: _select(v, positions) for name, v in self._derived.items()}
+        return TradeFrame(self.records, self.index[positions], columns, derived)
+
+    def sort_by_created_at(self) -> "TradeFrame":
+        """Ordina cronologicamente per created_at (sort stabile, NaT in coda)."""
+        order = np.argsort(self.created_at, kind="stable")
+        return self.take(order)
+
+    @staticmethod
+    def _column_names() -> List[str]:
+        return [*_FLOAT_FIELDS.keys(), *_TIME_FIELDS.keys(), "direction", "setup"]
+
+    # ──────────────────────────────────────────────────────────────────────
+    # ACCESSO
+    # ──────────────────────────────────────────────────────────────────────
+    def __len__(self) -> int:
+        return int(self.index.shape[0])
+
+    def rows(self) -> List[dict]:
+        """I dict originali nell'ordine del frame (stessi oggetti, non copie)."""
+        records = self.records
+        return [records[i] for i in self.index.tolist()]
+
+    # ──────────────────────────────────────────────────────────────────────
+    # COLONNE DERIVATE (vettoriali)
+    # ──────────────────────────────────────────────────────────────────────
+    @_memoized
+    def pnl_fixed(self) -> np.ndarray:
+        """P&L in punto fisso (int64, vedi MONEY_SCALE), None -> 0."""
+        return to_fixed(self.pnl)
+
+    @_memoized
+    def pnl_filled(self) -> np.ndarray:
+        """P&L con None -> 0 (float, arrotondato al punto fisso)."""
+        return from_fixed(self.pnl_fixed())
+
+    @_memoized
+    def mae_mfe_points(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        MAE/MFE in punti (stessa semantica del calcolo per-trade storico):
+          - prezzi validi (>0) e Long/Short -> valori calcolati
+          - dati mancanti -> 0
+          - direzione non riconosciuta con prezzi validi -> NaN (metrica assente)
+        """
+        entry, low, high = self.entry_price, self.lowest_price, self.highest_price
+        with np.errstate(invalid="ignore"):
+            valid = (entry > 0) & (low > 0) & (high > 0) & (self.direction != DIR_NONE)
+        is_long = self.direction == DIR_LONG
+        is_short = self.direction == DIR_SHORT
+
+        mae = np.zeros(len(self), dtype=np.float64)
+        mfe = np.zeros(len(self), dtype=np.float64)
+        m = valid & is_long
+        mae[m] = entry[m] - low[m]
+        mfe[m] = high[m] - entry[m]
+        m = valid & is_short
+        mae[m] = high[m] - entry[m]
+        mfe[m] = entry[m] - low[m]
+        m = valid & ~is_long & ~is_short
+        mae[m] = np.nan
+        mfe[m] = np.nan
+        return mae, mfe
+
+    @_memoized
+    def net_roi(self) -> np.ndarray:
+        """ROI netto % = pnl / (entry * size) * 100 (0 se costo nullo)."""
+        cost = np.nan_to_num(self.entry_price) * np.nan_to_num(self.position_size)
+        out = np.zeros(len(self), dtype=np.float64)
+        nz = cost != 0
+        out[nz] = self.pnl_filled()[nz] / cost[nz] * 100
+        return out
+
+    @_memoized
+    def value_per_point(self) -> np.ndarray:
+        """
+        Valore monetario di un punto, dedotto da pnl / punti realizzati.
+        Fallback: position_size (o 1 se assente/zero), come per il calcolo per-trade.
+        """
+        entry = np.nan_to_num(self.entry_price)
+        exit_price = np.nan_to_num(self.exit_price)
+        pnl = self.pnl_filled()
+
+        points = np.where(self.direction == DIR_LONG, exit_price - entry, entry - exit_price)
+        usable = (self.direction != DIR_NONE) & (entry != 0) & (exit_price != 0) & (points != 0)
+        vpp = np.zeros(len(self), dtype=np.float64)
+        vpp[usable] = np.abs(pnl[usable] / points[usable])
+
+        size = np.nan_to_num(self.position_size)
+        fallback = np.where(size != 0, size, 1.0)
+        return np.where(vpp == 0, fallback, vpp)
+
+    @_memoized
+    def risk_points(self) -> np.ndarray:
+        """|entry - stop| se entrambi presenti e non nulli, altrimenti 0."""
+        entry = np.nan_to_num(self.entry_price)
+        sl = np.nan_to_num(self.stop_loss_price)
+        return np.where((entry != 0) & (sl != 0), np.abs(entry - sl), 0.0)
+
+    @_memoized
+    def reward_points(self) -> np.ndarray:
+        """|target - entry| se entrambi presenti e non nulli, altrimenti 0."""
+        entry = np.nan_to_num(self.entry_price)
+        tp = np.nan_to_num(self.take_profit_price)
+        return np.where((entry != 0) & (tp != 0), np.abs(tp - entry), 0.0)
+
+    @_memoized
+    def hold_minutes(self) -> np.ndarray:
+        """Durata in minuti (NaN se manca entry o exit)."""
+        delta = (self.exit_ts - self.entry_ts).astype("timedelta64[us]").astype(np.float64)
+        missing = np.isnat(self.entry_ts) | np.isnat(self.exit_ts)
+        delta[missing] = np.nan
+        return delta / 60_000_000.0
+
+    @_memoized
+    def realized_rr(self) -> np.ndarray:
+        """
+        R-multiple realizzato = pnl / (rischio in punti * value-per-point).
+        NaN se manca il rischio (entry/stop); 0 se il rischio monetario non è positivo.
+        """
+        risk = self.risk_points()
+        dollar_risk = risk * self.value_per_point()
+        out = np.full(len(self), np.nan, dtype=np.float64)
+        out[risk > 0] = 0.0
+        ok = (risk > 0) & (dollar_risk > 0)
+        out[ok] = self.pnl_filled()[ok] / dollar_risk[ok]
+        return out
@@ -0,0 +1,45 @@
+# app/Utils/serialization.py
+
+import hashlib
+import json
+import math
+from decimal import Decimal
+from typing import Optional
+
+import numpy as np
+
+
+def to_json_safe(value):
+    """
+    Converte ricorsivamente un payload di metriche in tipi JSON nativi:
+    Decimal / numpy -> float|int, valori non finiti (inf, NaN) -> None.
+    """
+    if isinstance(value, dict):
+        return {k: to_json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_safe(v) for v in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, Decimal, np.floating)):
+        value = float(value)
+        return value if math.isfinite(value) else None
+    return value
+
+
+def json_etag(value) -> str:
+    """
+    ETag forte di un payload JSON-safe: hash del JSON canonico (chiavi ordinate),
+    quindi stabile finché il contenuto non cambia.
+    """
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return '"' + hashlib.sha1(canonical.encode("utf-8")).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True se l'header If-None-Match contiene `etag` (o `*`); confronto debole (W/ ignorato)."""
+    if not if_none_match:
+        return False
+    candidates = {c.strip().removeprefix("W/") for c in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
@@ -44,6 +44,23 @@ class Settings(BaseSettings):
 
     AUTH_AUTO_CONFIRM_DEV: bool = True
 
+    # Cache risultati metriche (in-process)
+    METRICS_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    METRICS_CACHE_TTL_SECONDS: int = 300
+
+    # Pool di processi per i calcoli pesanti (0 = tutto inline)
+    METRICS_POOL_WORKERS: int = 2
+    METRICS_POOL_MIN_TRADES: int = 20_000  # sotto questa soglia si calcola inline
+
+    # Profiling per fase della pipeline metriche: con METRICS_PROFILING solo le fasi
+    # del controller (cache e pool restano attivi); l'header X-Metrics-Profile
+    # (calcolo completo senza cache, fasi interne) vale solo se abilitato qui
+    METRICS_PROFILING: bool = False
+    METRICS_PROFILING_ALLOW_HEADER: bool = False
+
+    # Simulazione Monte Carlo: memoria massima per blocco di percorsi
+    METRICS_SIMULATION_MEMORY_MB: int = 256
+
     def assemble_db_url(self) -> str:
         if self.DATABASE_URL:
             return self.DATABASE_URL
@@ -4,6 +4,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.Router.routes import router
 from app.config import settings
+from app.Services.metrics.compute_service import compute_service
 
 app = FastAPI(title=settings.APP_NAME)
 # ✅ Configurazione CORS
@@ -25,3 +26,8 @@ async def health():
 
 app.include_router(router)
 
+
+@app.on_event("shutdown")
+def shutdown_compute_pool() -> None:
+    compute_service.shutdown()
+
@@ -0,0 +1,32 @@
+-- db/sql/002_trade_daily_rollups.sql
+-- Aggregati giornalieri per utente (giorno UTC di created_at).
+-- Mantenuti dal TradeRepository nella stessa transazione di create/update/delete.
+-- Ricostruzione completa: python -m app.Services.metrics.rebuild_rollups [--user-id <uuid>]
+
+create table if not exists public.trade_daily_rollups (
+  user_id     uuid not null references auth.users(id) on delete cascade,
+  day         date not null,
+  pnl_sum     double precision not null default 0,
+  pnl_sq_sum  double precision not null default 0,
+  trade_count integer not null default 0,
+  win_count   integer not null default 0,
+  loss_count  integer not null default 0,
+  volume      double precision not null default 0,
+  constraint trade_daily_rollups_pkey primary key (user_id, day)
+);
+
+-- Backfill iniziale dai trade esistenti
+insert into public.trade_daily_rollups
+  (user_id, day, pnl_sum, pnl_sq_sum, trade_count, win_count, loss_count, volume)
+select
+  user_id,
+  (created_at at time zone 'UTC')::date as day,
+  sum(coalesce(p_l, 0)),
+  sum(coalesce(p_l, 0) * coalesce(p_l, 0)),
+  count(*),
+  count(*) filter (where p_l > 0),
+  count(*) filter (where p_l < 0),
+  sum(coalesce(position_size, 0))
+from public.trades
+group by user_id, (created_at at time zone 'UTC')::date
+on conflict (user_id, day) do nothing;
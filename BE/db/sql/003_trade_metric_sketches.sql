@@ -0,0 +1,19 @@
+-- db/sql/003_trade_metric_sketches.sql
+-- Sketch dei quantili (t-digest, JSON) per utente, mese UTC di created_at e metrica
+-- (pnl, realized_rr, hold_minutes). Mantenuti dal TradeRepository nella stessa
+-- transazione delle scritture: una create aggiunge i valori al digest del mese,
+-- update/delete marcano il mese `stale` (un digest non può togliere valori) e il
+-- mese viene ricostruito dai suoi soli trade alla lettura successiva.
+
+create table if not exists public.trade_metric_sketches (
+  user_id uuid not null references auth.users(id) on delete cascade,
+  month   date not null,
+  metric  varchar(32) not null,
+  sketch  jsonb not null default '{}'::jsonb,
+  stale   boolean not null default false,
+  constraint trade_metric_sketches_pkey primary key (user_id, month, metric)
+);
+
+-- Backfill: nessun mese viene creato `stale` (sarebbe ricostruito tutto dalla prima
+-- lettura). Dopo la migrazione eseguire:
+--   python -m app.Services.metrics.rebuild_sketches [--user-id <uuid>]
@@ -0,0 +1,18 @@
+-- db/sql/004_trades_user_created_at_idx.sql
+-- Indice (user_id, created_at) per i riepiloghi di un giorno / una settimana ISO:
+-- il filtro created_at >= inizio AND created_at < fine di un utente diventa un
+-- range scan già in ordine cronologico (nessuna lettura dello storico completo).
+--
+-- ATTENZIONE: `create index concurrently` non può girare dentro una transazione
+-- (ERROR: CREATE INDEX CONCURRENTLY cannot run inside a transaction block).
+-- Eseguire questo file da solo in autocommit, es.
+--   psql "$DATABASE_URL" -f db/sql/004_trades_user_created_at_idx.sql
+-- e NON con `psql -1` / `--single-transaction`, né dentro un BEGIN di una
+-- migrazione o nello stesso batch degli altri file. `concurrently` evita di
+-- bloccare le scritture su public.trades durante la costruzione.
+-- Se la costruzione si interrompe l'indice resta INVALID e `if not exists` lo
+-- salterebbe: eliminarlo (`drop index concurrently idx_trades_user_created_at;`)
+-- e rieseguire il file.
+
+create index concurrently if not exists idx_trades_user_created_at
+  on public.trades (user_id, created_at);
@@ -0,0 +1,11 @@
+-- db/sql/005_trade_data_versions.sql
+-- Versione dei dati di trading per utente: incrementata dal TradeRepository nella
+-- stessa transazione di ogni create/update/delete di un trade. Gli stati in-process
+-- (accumulatori del Vantage Score) la confrontano prima dell'uso, così una scrittura
+-- servita da un altro worker li invalida.
+
+create table if not exists public.trade_data_versions (
+  user_id uuid not null references auth.users(id) on delete cascade,
+  version bigint not null default 0,
+  constraint trade_data_versions_pkey primary key (user_id)
+);
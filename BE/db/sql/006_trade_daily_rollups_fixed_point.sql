@@ -0,0 +1,37 @@
+-- db/sql/006_trade_daily_rollups_fixed_point.sql
+-- P&L dei rollup giornalieri in punto fisso (unità di 1/10000 di valuta, come
+-- MONEY_SCALE in trade_frame): i delta interi si sommano senza errori di
+-- arrotondamento, quindi un giorno 0.1 + 0.2 - 0.3 resta in pareggio.
+--   pnl_sum    bigint  = somma di round(p_l * 10000)
+--   pnl_sq_sum numeric = somma dei quadrati delle stesse unità
+
+alter table public.trade_daily_rollups
+  alter column pnl_sum type bigint using round(pnl_sum * 10000)::bigint,
+  alter column pnl_sq_sum type numeric using round(pnl_sq_sum * 100000000);
+
+-- Le somme float accumulate finora possono contenere residui: si ricalcolano
+-- dai trade (equivalente a python -m app.Services.metrics.rebuild_rollups).
+with source as (
+  select
+    user_id,
+    (created_at at time zone 'UTC')::date as day,
+    round(coalesce(p_l, 0) * 10000)::bigint as pnl
+  from public.trades
+)
+update public.trade_daily_rollups r
+set pnl_sum = s.pnl_sum,
+    pnl_sq_sum = s.pnl_sq_sum,
+    win_count = s.win_count,
+    loss_count = s.loss_count
+from (
+  select
+    user_id,
+    day,
+    sum(pnl) as pnl_sum,
+    sum(pnl::numeric * pnl) as pnl_sq_sum,
+    count(*) filter (where pnl > 0) as win_count,
+    count(*) filter (where pnl < 0) as loss_count
+  from source
+  group by user_id, day
+) s
+where r.user_id = s.user_id and r.day = s.day;
@@ -0,0 +1,67 @@
+# tests/metrics/test_downsampling.py
+# LTTB vettoriale confrontato con la versione sequenziale (un bucket per volta)
+# e punti sempre conservati dal downsampling dei grafici.
+
+import numpy as np
+import pytest
+
+from app.Services.metrics.downsampling import downsample_equity_curve, lttb_indices
+
+
+def reference_lttb(y, max_points):
+    """LTTB sequenziale: il punto di ogni bucket dipende da quello scelto nel precedente."""
+    n = y.size
+    if n <= max_points:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1])[:max(max_points, 1)]
+    n_buckets = max_points - 2
+    edges = np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+    lengths = np.diff(edges)
+    avg_x = np.append(edges[:-1] + (lengths - 1) / 2, n - 1)
+    avg_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / lengths, y[-1])
+    selected = [0]
+    a = 0
+    for b in range(n_buckets):
+        lo, hi = edges[b], edges[b + 1]
+        xs = np.arange(lo, hi)
+        area = np.abs((a - avg_x[b + 1]) * (y[lo:hi] - y[a]) - (a - xs) * (avg_y[b + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected.append(a)
+    return np.array(selected + [n - 1])
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_lttb_matches_sequential(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(15):
+        n = int(rng.integers(3, 2000))
+        max_points = int(rng.integers(2, n + 2))
+        series = [
+            rng.normal(size=n).cumsum(),
+            rng.integers(-2, 3, size=n).astype(np.float64),  # molti pareggi nell'argmax
+            np.zeros(n),
+        ]
+        for y in series:
+            assert np.array_equal(lttb_indices(y, max_points), reference_lttb(y, max_points))
+
+
+def test_lttb_large_budget():
+    y = np.random.default_rng(1).normal(size=200_000).cumsum()
+    assert np.array_equal(lttb_indices(y, 100_000), reference_lttb(y, 100_000))
+
+
+def test_equity_curve_keeps_drawdown_extremes():
+    rng = np.random.default_rng(2)
+    equity = rng.normal(size=5000).cumsum()
+    peak = np.maximum.accumulate(equity)
+    points = [
+        {'date': str(i), 'pl': float(e), 'drawdown': float(p - e)}
+        for i, (e, p) in enumerate(zip(equity, peak))
+    ]
+    reduced = downsample_equity_curve(points, 200)
+    assert len(reduced) <= 200
+    kept = {p['date'] for p in reduced}
+    trough = int(np.argmax(peak - equity))
+    assert {str(trough), str(int(np.argmax(equity[:trough + 1]))), str(int(np.argmax(equity))),
+            str(int(np.argmin(equity)))} <= kept
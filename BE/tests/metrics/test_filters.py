@@ -0,0 +1,71 @@
+# tests/metrics/test_filters.py
+# Filtri calcolati (durata, R-multiple) con maschere booleane sul TradeFrame
+# confrontati con un filtro per-trade di riferimento: durata come nel calcolo
+# originale, R-multiple realizzato come nell'arricchimento per-trade (stesso
+# value-per-point dedotto, non più la sola position_size).
+
+import copy
+
+import pytest
+
+import baseline_enricher
+from trade_fixtures import make_trades
+from app.Services.metrics.metrics_calculator import MetricsCalculator
+from app.Services.metrics.trade_frame import TradeFrame
+
+FILTERS = [
+    {'min_duration': 60},
+    {'max_duration': 120},
+    {'min_duration': 30, 'max_duration': 240},
+    {'min_rr': 0},
+    {'max_rr': -0.5},
+    {'min_rr': -1, 'max_rr': 2},
+    {'min_duration': 15, 'max_rr': 1.5},
+]
+
+
+def reference_filter(trades, filters):
+    kept = []
+    for trade in trades:
+        min_dur, max_dur = filters.get('min_duration'), filters.get('max_duration')
+        if (min_dur is not None or max_dur is not None) and trade.get('entry_timestamp') and trade.get('exit_timestamp'):
+            minutes = (trade['exit_timestamp'] - trade['entry_timestamp']).total_seconds() / 60
+            if (min_dur is not None and minutes < min_dur) or (max_dur is not None and minutes > max_dur):
+                continue
+
+        min_rr, max_rr = filters.get('min_rr'), filters.get('max_rr')
+        has_risk = trade.get('entry_price') and trade.get('stop_loss_price') \
+            and trade['entry_price'] != trade['stop_loss_price']
+        if (min_rr is not None or max_rr is not None) and has_risk:
+            rr = float(baseline_enricher.enrich_trade_with_advanced_metrics(copy.deepcopy(trade))['realized_rr'])
+            if (min_rr is not None and rr < min_rr) or (max_rr is not None and rr > max_rr):
+                continue
+        kept.append(trade)
+    return kept
+
+
+@pytest.fixture(scope='module')
+def trades():
+    return make_trades(1000, seed=3)
+
+
+@pytest.mark.parametrize('filters', FILTERS, ids=str)
+def test_filter_trades_matches_reference(trades, filters):
+    expected = reference_filter(trades, filters)
+    actual = MetricsCalculator.filter_trades(trades, filters)
+    assert [t['id'] for t in actual] == [t['id'] for t in expected]
+    # stessi dict, non copie
+    assert all(a is e for a, e in zip(actual, expected))
+
+
+@pytest.mark.parametrize('filters', FILTERS, ids=str)
+def test_filter_trades_on_frame(trades, filters):
+    expected = reference_filter(trades, filters)
+    sub = MetricsCalculator.filter_trades(TradeFrame.from_records(trades), filters)
+    assert isinstance(sub, TradeFrame)
+    assert [row['id'] for row in sub.rows()] == [t['id'] for t in expected]
+
+
+@pytest.mark.parametrize('filters', [None, {}, {'min_duration': None, 'symbol': 'ES'}])
+def test_filter_trades_without_computed_filters_is_identity(trades, filters):
+    assert MetricsCalculator.filter_trades(trades, filters) is trades
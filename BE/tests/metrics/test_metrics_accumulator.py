@@ -0,0 +1,176 @@
+# tests/metrics/test_metrics_accumulator.py
+# Replay di una sequenza di scritture (create/update/delete) sull'accumulatore
+# incrementale: lo stato deve coincidere con un ricalcolo completo.
+
+import copy
+import math
+import random
+from datetime import timedelta
+
+import pytest
+
+from trade_fixtures import make_trades
+from app.Services.metrics.metrics_accumulator import MetricsAccumulator
+from app.Services.metrics.metrics_calculator import MetricsCalculator
+from app.Services.metrics.trade_frame import TradeFrame
+
+TOLERANCE = 1e-6
+
+
+def rebuild(trades):
+    return MetricsAccumulator.from_frame(TradeFrame.from_records(list(trades.values())))
+
+
+def assert_same_stats(acc, trades):
+    expected = rebuild(trades).stats()
+    actual = acc.stats()
+    assert set(actual) == set(expected)
+    for key, value in expected.items():
+        assert math.isclose(actual[key], value, rel_tol=TOLERANCE, abs_tol=TOLERANCE), (key, actual[key], value)
+
+
+def test_from_frame_vantage_matches_calculator():
+    trades = make_trades(800, seed=5)
+    acc = MetricsAccumulator.from_frame(TradeFrame.from_records(trades))
+    expected = MetricsCalculator(copy.deepcopy(trades)).calculate_vantage_score()
+    actual = acc.vantage_score()
+    assert set(actual) == set(expected)
+    for key, value in expected.items():
+        assert math.isclose(float(actual[key]), float(value), rel_tol=TOLERANCE, abs_tol=TOLERANCE), key
+
+
+def test_in_order_replay_stays_incremental():
+    trades = make_trades(600, seed=8)
+    initial, later = trades[:300], trades[300:]
+    state = {t['id']: t for t in initial}
+    acc = rebuild(state)
+    rnd = random.Random(8)
+
+    for trade in later:
+        acc.on_saved(trade['id'], trade['created_at'], trade['p_l'])
+        state[trade['id']] = trade
+        op = rnd.random()
+        if op < 0.15:
+            # modifica del P&L dell'ultimo trade
+            edited = dict(trade, p_l=round(rnd.uniform(-500, 500), 2))
+            acc.on_saved(edited['id'], edited['created_at'], edited['p_l'])
+            state[edited['id']] = edited
+        elif op < 0.25:
+            # cancellazione dell'ultimo trade
+            acc.on_deleted(trade['id'])
+            del state[trade['id']]
+        elif op < 0.3:
+            # update senza campi rilevanti: nessun effetto
+            acc.on_saved(trade['id'], trade['created_at'], trade['p_l'])
+        assert not acc.needs_rebuild
+        assert_same_stats(acc, state)
+
+
+def test_out_of_order_write_requires_rebuild():
+    trades = make_trades(200, seed=9)
+    state = {t['id']: t for t in trades}
+    acc = rebuild(state)
+
+    middle = trades[100]
+    edited = dict(middle, p_l=(middle['p_l'] or 0) + 100)
+    acc.on_saved(edited['id'], edited['created_at'], edited['p_l'])
+    state[edited['id']] = edited
+    assert acc.needs_rebuild
+    # la parte indipendente dall'ordine resta comunque esatta
+    expected = rebuild(state).stats()
+    for key in ('trade_count', 'total_pl', 'win_rate', 'profit_factor', 'consistency_score'):
+        assert math.isclose(acc.stats()[key], expected[key], rel_tol=TOLERANCE, abs_tol=TOLERANCE), key
+
+
+def test_backdated_insert_requires_rebuild():
+    trades = make_trades(50, seed=10)
+    acc = rebuild({t['id']: t for t in trades})
+    backdated = dict(trades[0], id='backdated', created_at=trades[0]['created_at'] - timedelta(days=1))
+    acc.on_saved(backdated['id'], backdated['created_at'], backdated['p_l'])
+    assert acc.needs_rebuild
+
+
+def test_delete_all_returns_empty_score():
+    trades = make_trades(20, seed=12)
+    state = {t['id']: t for t in trades}
+    acc = rebuild(state)
+    for trade in reversed(trades):
+        acc.on_deleted(trade['id'])
+    assert acc.trade_count == 0
+    assert acc.vantage_score() == MetricsCalculator([]).calculate_vantage_score()
+
+
+@pytest.mark.parametrize('n', [1, 2])
+def test_tiny_histories(n):
+    trades = make_trades(n, seed=n)
+    state = {t['id']: t for t in trades}
+    acc = rebuild(state)
+    acc.on_deleted(trades[-1]['id'])
+    del state[trades[-1]['id']]
+    assert not acc.needs_rebuild
+    assert_same_stats(acc, state)
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# REGISTRO (metrics_cache + versione persistita)
+# ──────────────────────────────────────────────────────────────────────────
+@pytest.fixture
+def registry():
+    from app.Services.metrics import metrics_accumulator
+    from app.Services.metrics.metrics_cache import metrics_cache
+
+    metrics_cache.clear()
+    yield metrics_accumulator
+    metrics_cache.clear()
+
+
+def test_registry_requires_matching_version(registry):
+    trades = make_trades(30, seed=13)
+    registry.store_accumulator('u', rebuild({t['id']: t for t in trades}), version=4)
+    assert registry.get_accumulator('u', 4) is not None
+    # scrittura servita da un altro worker: versione persistita avanzata
+    assert registry.get_accumulator('u', 5) is None
+
+
+def test_registry_follows_consecutive_writes(registry):
+    trades = make_trades(30, seed=14)
+    state = {t['id']: t for t in trades[:-1]}
+    registry.store_accumulator('u', rebuild(state), version=1)
+
+    last = trades[-1]
+    registry.on_trade_saved('u', 2, last['id'], last['created_at'], last['p_l'])
+    state[last['id']] = last
+    acc = registry.get_accumulator('u', 2)
+    assert acc is not None
+    assert_same_stats(acc, state)
+
+    registry.on_trade_deleted('u', 3, last['id'])
+    del state[last['id']]
+    acc = registry.get_accumulator('u', 3)
+    assert acc is not None
+    assert_same_stats(acc, state)
+
+
+def test_registry_drops_accumulator_after_missed_write(registry):
+    trades = make_trades(30, seed=15)
+    registry.store_accumulator('u', rebuild({t['id']: t for t in trades[:-1]}), version=1)
+    last = trades[-1]
+    # la versione 2 è stata scritta altrove: la 3 non può essere applicata
+    registry.on_trade_saved('u', 3, last['id'], last['created_at'], last['p_l'])
+    assert registry.get_accumulator('u', 3) is None
+    assert registry.get_accumulator('u', 1) is None
+
+
+def test_registry_memory_budget(registry, monkeypatch):
+    from app.Services.metrics.metrics_cache import metrics_cache
+
+    small = rebuild({t['id']: t for t in make_trades(50, seed=16)})
+    large = rebuild({t['id']: t for t in make_trades(2000, seed=17)})
+    assert large.__sizeof__() > 2000 * 200
+    monkeypatch.setattr(metrics_cache, 'max_bytes', large.__sizeof__() + small.__sizeof__() // 2)
+
+    registry.store_accumulator('a', small, version=1)
+    registry.store_accumulator('b', large, version=1)
+    # fuori budget: espulso il meno usato di recente
+    assert registry.get_accumulator('a', 1) is None
+    assert registry.get_accumulator('b', 1) is large
@@ -0,0 +1,28 @@
+# tests/metrics/test_metrics_cache.py
+# Cache dei risultati: chiave con la versione persistita dei trade.
+
+import pytest
+
+from app.Services.metrics.metrics_cache import get_or_compute, metrics_cache
+
+
+@pytest.fixture
+def cache():
+    metrics_cache.clear()
+    yield metrics_cache
+    metrics_cache.clear()
+
+
+async def test_version_in_key_invalidates(cache):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {'n': len(calls)}
+
+    assert await get_or_compute('kind', 'u', {'a': 1}, compute, 3) == {'n': 1}
+    assert await get_or_compute('kind', 'u', {'a': 1}, compute, 3) == {'n': 1}
+    # scrittura (anche servita da un altro worker): nuova versione persistita
+    assert await get_or_compute('kind', 'u', {'a': 1}, compute, 4) == {'n': 2}
+    assert await get_or_compute('kind', 'u', {'a': 2}, compute, 4) == {'n': 3}
+    assert len(calls) == 3
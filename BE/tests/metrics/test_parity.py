@@ -0,0 +1,96 @@
+# tests/metrics/test_parity.py
+# Parità del MetricsCalculator colonnare con l'implementazione di riferimento
+# (Decimal, cicli Python) su statistiche, grafici, equity curve e Vantage Score.
+
+import copy
+import math
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+import baseline_calculator
+from trade_fixtures import make_trades
+from app.Services.metrics.metrics_calculator import MetricsCalculator
+
+TOLERANCE = 1e-6
+
+# Chiavi introdotte dopo l'implementazione di riferimento (non confrontabili)
+NEW_KEYS = {
+    'drawdown', 'drawdown_episodes', 'max_drawdown_duration', 'average_drawdown_duration',
+    'streaks', 'average_consecutive_wins', 'average_consecutive_losses',
+    'average_consecutive_winning_days', 'average_consecutive_losing_days',
+}
+
+
+def assert_close(expected, actual, path='$'):
+    """Confronto ricorsivo: numeri entro TOLERANCE (relativa/assoluta), il resto uguale."""
+    if isinstance(expected, dict):
+        actual = {k: v for k, v in actual.items() if k not in NEW_KEYS}
+        assert set(expected) == set(actual), (path, set(expected) ^ set(actual))
+        for key in expected:
+            assert_close(expected[key], actual[key], f'{path}.{key}')
+    elif isinstance(expected, (list, tuple)):
+        assert len(expected) == len(actual), (path, len(expected), len(actual))
+        for i, (a, b) in enumerate(zip(expected, actual)):
+            assert_close(a, b, f'{path}[{i}]')
+    elif isinstance(expected, np.generic):
+        assert_close(expected.item(), actual, path)
+    elif isinstance(expected, (int, float, Decimal)) and not isinstance(expected, bool):
+        a, b = float(expected), float(actual)
+        if math.isinf(a) or math.isinf(b) or math.isnan(a):
+            assert a == b or (math.isnan(a) and math.isnan(b)), (path, expected, actual)
+        else:
+            assert math.isclose(a, b, rel_tol=TOLERANCE, abs_tol=TOLERANCE), (path, expected, actual)
+    else:
+        assert expected == actual, (path, expected, actual)
+
+
+@pytest.fixture(params=[50, 500, 3000], ids=lambda n: f'{n}_trades')
+def trades(request):
+    return make_trades(request.param, seed=request.param)
+
+
+def test_fixture_covers_edge_cases(trades):
+    assert any(t['p_l'] is None for t in trades)
+    assert any(t['entry_timestamp'] is None for t in trades)
+    assert any(t['entry_timestamp'] is not None and t['exit_timestamp'] is None for t in trades)
+    assert any(t['direction'] == 'Short' for t in trades)
+    assert any(t['direction'] is None for t in trades)
+
+
+def test_all_metrics_parity(trades):
+    expected = baseline_calculator.MetricsCalculator(copy.deepcopy(trades)).calculate_all_metrics()
+    actual = MetricsCalculator(copy.deepcopy(trades)).calculate_all_metrics()
+    expected_trades, actual_trades = expected.pop('trades'), actual.pop('trades')
+
+    # stats, equity curve, setup chart, R-multiple e grafici giorno/ora
+    assert_close(expected, actual)
+
+    assert [t['id'] for t in actual_trades] == [t['id'] for t in expected_trades]
+    for old, new in zip(expected_trades, actual_trades):
+        for key in ('mae_points', 'mfe_points', 'net_roi'):
+            assert_close(old[key], new[key], f"trade {old['id']}.{key}")
+        for key in ('created_at', 'entry_timestamp', 'exit_timestamp'):
+            assert old[key] == new[key]
+
+
+def test_all_metrics_parity_with_iso_strings():
+    trades = make_trades(500, seed=7, iso_strings=True)
+    expected = baseline_calculator.MetricsCalculator(copy.deepcopy(trades)).calculate_all_metrics()
+    actual = MetricsCalculator(copy.deepcopy(trades)).calculate_all_metrics()
+    expected.pop('trades'), actual.pop('trades')
+    assert_close(expected, actual)
+
+
+def test_vantage_score_parity(trades):
+    expected = baseline_calculator.MetricsCalculator(copy.deepcopy(trades)).calculate_vantage_score()
+    actual = MetricsCalculator(copy.deepcopy(trades)).calculate_vantage_score()
+    assert_close(expected, actual)
+
+
+def test_empty_input_parity():
+    expected = baseline_calculator.MetricsCalculator([])
+    actual = MetricsCalculator([])
+    assert_close(expected.calculate_vantage_score(), actual.calculate_vantage_score())
+    assert_close(expected.calculate_all_metrics(), actual.calculate_all_metrics())
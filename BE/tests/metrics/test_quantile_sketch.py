@@ -0,0 +1,69 @@
+# tests/metrics/test_quantile_sketch.py
+# t-digest (QuantileSketch): limite di peso per centroide, accuratezza nelle code
+# su distribuzioni a code pesanti, fusione e istogramma esatto senza compressione.
+
+import numpy as np
+import pytest
+
+from app.Services.metrics.quantile_sketch import QuantileSketch, describe
+
+TAIL_QUANTILES = np.array([0.001, 0.01, 0.99, 0.999])
+
+
+@pytest.fixture(scope='module')
+def heavy_tailed():
+    return np.random.default_rng(0).standard_t(2, 200_000) * 100
+
+
+def centroid_bound_ratio(sketch):
+    sketch._compress()
+    n = sketch.weights.sum()
+    q = (np.cumsum(sketch.weights) - sketch.weights / 2) / n
+    bound = np.maximum(4 * n * q * (1 - q) / sketch.compression, 1)
+    return (sketch.weights / bound).max()
+
+
+def test_streamed_tails_are_accurate(heavy_tailed):
+    sketch = QuantileSketch()
+    for chunk in np.array_split(heavy_tailed, 1000):
+        sketch.add(chunk)
+    assert sketch.count == heavy_tailed.size
+    assert centroid_bound_ratio(sketch) <= 1.0
+    estimated = sketch.quantile(TAIL_QUANTILES)
+    exact = np.quantile(heavy_tailed, TAIL_QUANTILES)
+    assert np.all(np.abs(estimated - exact) / np.abs(exact) < 0.02), (estimated, exact)
+
+
+def test_merged_tails_are_accurate(heavy_tailed):
+    parts = [QuantileSketch.from_values(part) for part in np.array_split(heavy_tailed, 12)]
+    merged = QuantileSketch.merge_all(parts)
+    assert merged.count == heavy_tailed.size
+    assert centroid_bound_ratio(merged) <= 1.0
+    estimated = merged.quantile(TAIL_QUANTILES)
+    exact = np.quantile(heavy_tailed, TAIL_QUANTILES)
+    assert np.all(np.abs(estimated - exact) / np.abs(exact) < 0.02), (estimated, exact)
+    assert merged.minimum == heavy_tailed.min() and merged.maximum == heavy_tailed.max()
+
+
+def test_small_sketch_matches_numpy():
+    values = np.random.default_rng(1).normal(size=90)
+    sketch = QuantileSketch.from_values(values)
+    qs = np.linspace(0, 1, 11)
+    np.testing.assert_allclose(sketch.quantile(qs), np.percentile(values, qs * 100))
+
+
+def test_uncompressed_histogram_counts_are_exact_integers():
+    values = np.random.default_rng(2).normal(size=80)
+    sketch = QuantileSketch.from_values(values)
+    edges = np.linspace(values.min(), values.max(), 9)
+    counts = sketch.histogram(edges)
+    assert counts.dtype.kind == 'i'
+    assert counts.tolist() == np.histogram(values, bins=edges)[0].tolist()
+    assert all(isinstance(c, int) for c in describe(sketch, bins=8)['histogram']['counts'])
+
+
+def test_serialization_roundtrip(heavy_tailed):
+    sketch = QuantileSketch.from_values(heavy_tailed[:5000])
+    restored = QuantileSketch.from_dict(sketch.to_dict())
+    np.testing.assert_array_equal(restored.quantile(TAIL_QUANTILES), sketch.quantile(TAIL_QUANTILES))
+    assert QuantileSketch.from_dict(QuantileSketch().to_dict()).count == 0
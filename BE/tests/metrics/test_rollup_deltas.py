@@ -0,0 +1,114 @@
+# tests/metrics/test_rollup_deltas.py
+# Delta giornalieri dei rollup: la somma dei delta di una sequenza di scritture
+# deve coincidere con l'aggregazione diretta dei trade rimasti.
+
+import math
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from trade_fixtures import make_trades
+from app.Repositories.trade_rollup_repository import rollup_day, rollup_deltas
+from app.Services.metrics.pnl_aggregates import PnlAggregates
+from app.Services.metrics.trade_frame import TradeFrame, money_to_fixed
+
+TOLERANCE = 1e-6
+
+
+def contribution(trade):
+    return trade['created_at'], trade['p_l'], trade['position_size']
+
+
+def aggregate(trades):
+    """Rollup attesi calcolati direttamente dai trade."""
+    return rollup_deltas([contribution(t) for t in trades])
+
+
+def apply(table, deltas):
+    for day, row in deltas.items():
+        current = table[day]
+        for column, value in row.items():
+            current[column] = current.get(column, 0) + value
+        if current['trade_count'] <= 0:
+            del table[day]
+
+
+def test_single_trade_delta():
+    created_at = datetime(2024, 3, 1, 23, 30, tzinfo=timezone(timedelta(hours=-2)))
+    deltas = rollup_deltas([(created_at, -12.5, 2)])
+    assert list(deltas) == [rollup_day(created_at)]
+    assert rollup_day(created_at).isoformat() == '2024-03-02'  # giorno UTC
+    assert deltas[rollup_day(created_at)] == {
+        'pnl_sum': -125_000, 'pnl_sq_sum': 125_000 ** 2, 'trade_count': 1,
+        'win_count': 0, 'loss_count': 1, 'volume': 2.0,
+    }
+
+
+def test_null_pnl_and_size_count_as_zero():
+    created_at = datetime(2024, 3, 1, 12, tzinfo=timezone.utc)
+    row = rollup_deltas([(created_at, None, None)])[created_at.date()]
+    assert row['trade_count'] == 1
+    assert row['win_count'] == row['loss_count'] == 0
+    assert row['pnl_sum'] == row['volume'] == 0
+
+
+def test_fixed_point_day_is_breakeven():
+    # in float 0.1 + 0.2 - 0.3 = 5.55e-17: il giorno risulterebbe vinto
+    created_at = datetime(2024, 3, 1, 12, tzinfo=timezone.utc)
+    table = defaultdict(dict)
+    for p_l in (0.1, 0.2, -0.3):
+        apply(table, rollup_deltas([(created_at, p_l, 1)]))
+    row = table[created_at.date()]
+    assert row['pnl_sum'] == 0
+    day_row = (created_at.date(), row['pnl_sum'], row['volume'], row['trade_count'])
+    aggregates = PnlAggregates.from_rows([day_row], [], [])
+    assert aggregates.daily_pnl.tolist() == [0.0]
+
+
+def test_from_rows_matches_frame():
+    trades = make_trades(800, seed=8)
+    expected = PnlAggregates.from_frame(TradeFrame.from_records(trades))
+    table = aggregate(trades)
+    daily_rows = [(d, row['pnl_sum'], row['volume'], row['trade_count']) for d, row in sorted(table.items())]
+    weekday_rows, hour_rows = defaultdict(int), defaultdict(int)
+    for trade in trades:
+        entry = trade.get('entry_timestamp')
+        if entry is not None:
+            weekday_rows[entry.isoweekday()] += money_to_fixed(trade['p_l'])
+            hour_rows[entry.hour] += money_to_fixed(trade['p_l'])
+    actual = PnlAggregates.from_rows(daily_rows, weekday_rows.items(), hour_rows.items())
+    assert actual.daily_pnl.tolist() == expected.daily_pnl.tolist()
+    assert actual.weekday_pnl.tolist() == expected.weekday_pnl.tolist()
+    assert actual.hour_pnl.tolist() == expected.hour_pnl.tolist()
+
+
+def test_update_without_relevant_changes_is_empty():
+    trade = make_trades(1, seed=4)[0]
+    assert rollup_deltas([contribution(trade)], [contribution(trade)]) == {}
+
+
+def test_replayed_deltas_match_direct_aggregation():
+    trades = make_trades(1500, seed=6)
+    rnd = random.Random(6)
+    state = {}
+    table = defaultdict(dict)
+    for trade in trades:
+        apply(table, rollup_deltas([contribution(trade)]))
+        state[trade['id']] = trade
+        op = rnd.random()
+        if op < 0.2:
+            # update: cambia P&L e giorno
+            old = state[trade['id']]
+            new = dict(old, p_l=round(rnd.uniform(-300, 300), 2),
+                       created_at=old['created_at'] + timedelta(days=rnd.randint(-3, 3)))
+            apply(table, rollup_deltas([contribution(new)], [contribution(old)]))
+            state[trade['id']] = new
+        elif op < 0.3:
+            victim = state.pop(rnd.choice(list(state)))
+            apply(table, rollup_deltas(removed=[contribution(victim)]))
+
+    expected = aggregate(state.values())
+    assert set(table) == set(expected)
+    for day, row in expected.items():
+        for column, value in row.items():
+            assert math.isclose(table[day][column], value, rel_tol=TOLERANCE, abs_tol=TOLERANCE), (day, column)
@@ -0,0 +1,82 @@
+# tests/metrics/test_trade_enricher.py
+# Arricchimento vettoriale (enrich_trades_batch) e per singolo trade confrontati
+# con l'implementazione scalare di riferimento.
+
+import copy
+import math
+
+import pytest
+
+import baseline_enricher
+from trade_fixtures import make_trades
+from app.Services.metrics.trade_enricher import (
+    ENRICHED_FIELDS,
+    enrich_trade,
+    enrich_trade_with_advanced_metrics,
+    enrich_trades_batch,
+)
+from app.Services.metrics.trade_frame import TradeFrame
+
+TOLERANCE = 1e-9
+
+
+@pytest.fixture(scope='module')
+def trades():
+    return make_trades(2000, seed=11)
+
+
+@pytest.fixture(scope='module')
+def expected(trades):
+    return [baseline_enricher.enrich_trade_with_advanced_metrics(copy.deepcopy(t)) for t in trades]
+
+
+def test_batch_matches_reference(trades, expected):
+    columns = enrich_trades_batch(trades)
+    assert set(columns) == set(ENRICHED_FIELDS)
+    for field in ENRICHED_FIELDS:
+        assert len(columns[field]) == len(trades)
+        for i, ref in enumerate(expected):
+            assert math.isclose(columns[field][i], float(ref[field]), rel_tol=TOLERANCE, abs_tol=TOLERANCE), (
+                field, trades[i]['id'], columns[field][i], ref[field]
+            )
+
+
+def test_batch_accepts_frame_and_does_not_mutate(trades):
+    before = copy.deepcopy(trades)
+    from_dicts = enrich_trades_batch(trades)
+    from_frame = enrich_trades_batch(TradeFrame.from_records(trades))
+    assert trades == before
+    for field in ENRICHED_FIELDS:
+        assert (from_dicts[field] == from_frame[field]).all()
+
+
+def test_single_trade_matches_reference(trades, expected):
+    for trade, ref in zip(trades[:300], expected):
+        actual = enrich_trade_with_advanced_metrics(copy.deepcopy(trade))
+        for field in ENRICHED_FIELDS:
+            assert math.isclose(float(actual[field]), float(ref[field]), rel_tol=TOLERANCE, abs_tol=TOLERANCE), (
+                field, trade['id'], actual[field], ref[field]
+            )
+
+
+def test_scalar_path_matches_batch(trades):
+    # casi limite: direzione assente / non riconosciuta, prezzi mancanti, P&L None
+    edge = [
+        {'direction': 'Flat', 'entry_price': 10, 'exit_price': 12, 'p_l': 5,
+         'lowest_price_during_trade': 9, 'highest_price_during_trade': 13, 'stop_loss_price': 8},
+        {'direction': None, 'entry_price': 10, 'exit_price': 12, 'p_l': 5, 'position_size': 3},
+        {'direction': 'Short', 'p_l': None, 'entry_price': 10, 'stop_loss_price': 10},
+        {'direction': 'Long', 'entry_price': 10, 'exit_price': 10, 'p_l': 0, 'stop_loss_price': 9,
+         'take_profit_price': 12, 'position_size': 0},
+    ]
+    sample = trades[:500] + edge
+    columns = enrich_trades_batch(sample)
+    for i, trade in enumerate(sample):
+        actual = enrich_trade(trade)
+        for field in ENRICHED_FIELDS:
+            assert actual[field] == columns[field][i], (field, i, actual[field], columns[field][i])
+
+
+def test_single_trade_empty():
+    assert enrich_trade_with_advanced_metrics({}) is None
+    assert enrich_trade_with_advanced_metrics(None) is None
@@ -0,0 +1,66 @@
+# tests/metrics/trade_fixtures.py
+# Trade sintetici deterministici per i test delle metriche: P&L None o zero,
+# timestamp di entrata/uscita mancanti, long/short/senza direzione, prezzi
+# e size mancanti. Ordinati per created_at (come li legge il repository).
+
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+USER_ID = uuid.UUID(int=1)
+
+
+def make_trades(n, seed=0, *, iso_strings=False):
+    rnd = random.Random(seed)
+    base = datetime(2023, 1, 2, tzinfo=timezone.utc)
+    trades = []
+    for i in range(n):
+        created_at = base + timedelta(minutes=rnd.randint(0, 60 * 24 * 400))
+        entry_ts = created_at - timedelta(minutes=rnd.randint(1, 300)) if rnd.random() > 0.1 else None
+        exit_ts = entry_ts + timedelta(minutes=rnd.randint(1, 600)) if entry_ts and rnd.random() > 0.1 else None
+        direction = rnd.choice(['Long', 'Short', 'Long', 'Short', None])
+        sign = -1 if direction == 'Short' else 1
+        entry = round(rnd.uniform(100, 200), 2)
+        exit_price = round(entry + rnd.uniform(-5, 5), 2) if rnd.random() > 0.05 else None
+        size = rnd.choice([1, 2, 3, None, 0.5])
+        value_per_point = rnd.choice([1, 5, 50])
+        pnl = round(((exit_price or entry) - entry) * sign * value_per_point * (size or 1), 2)
+        if rnd.random() < 0.03:
+            pnl = None
+        elif rnd.random() < 0.05:
+            pnl = 0.0
+        stop_loss = round(entry - rnd.uniform(1, 4) * sign, 2) if rnd.random() > 0.2 else None
+        take_profit = round(entry + rnd.uniform(1, 8) * sign, 2) if rnd.random() > 0.2 else None
+        lowest = round(min(entry, exit_price or entry) - rnd.uniform(0, 3), 2) if rnd.random() > 0.15 else None
+        highest = round(max(entry, exit_price or entry) + rnd.uniform(0, 3), 2) if rnd.random() > 0.15 else None
+        trade = {
+            'id': uuid.UUID(int=i + 1),
+            'user_id': USER_ID,
+            'created_at': created_at,
+            'symbol': rnd.choice(['ES', 'NQ', 'AAPL']),
+            'direction': direction,
+            'setup': rnd.choice(['A', 'B', 'C', None]),
+            'p_l': pnl,
+            'entry_price': entry,
+            'exit_price': exit_price,
+            'stop_loss_price': stop_loss,
+            'take_profit_price': take_profit,
+            'position_size': size,
+            'lowest_price_during_trade': lowest,
+            'highest_price_during_trade': highest,
+            'entry_timestamp': entry_ts,
+            'exit_timestamp': exit_ts,
+            'emotional_state': rnd.choice(['calm', 'fomo', None]),
+            'mistakes': rnd.choice([None, [], ['late'], ['late', 'size']]),
+            'tags': rnd.choice([[], ['x'], ['x', 'y']]),
+            'notes': None,
+            'notes_pre_trade': None,
+            'notes_post_trade': None,
+        }
+        if iso_strings:
+            for key in ('created_at', 'entry_timestamp', 'exit_timestamp'):
+                if trade[key] is not None:
+                    trade[key] = trade[key].isoformat()
+        trades.append(trade)
+    trades.sort(key=lambda t: t['created_at'])
+    return trades